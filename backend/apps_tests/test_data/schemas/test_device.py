@@ -1,3 +1,5 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from graphene_django.utils.testing import GraphQLTestCase
 
 from data.models import Snapshot
@@ -7,7 +9,7 @@ from apps_tests.test_data.utils import (
     create_test_package
 )
 
-from .utils import tear_down_objects
+from .utils import create_large_snapshot, tear_down_objects
 
 
 class DeviceSchemaQueryTest(GraphQLTestCase):
@@ -92,6 +94,75 @@ class DeviceSchemaQueryTest(GraphQLTestCase):
         self.assertEqual(op_result['snapshots'][0]['key'], '1')
         self.assertEqual(op_result['snapshots'][0]['date'], '2020-01-01')
 
+    def test_resolve_device_infos_queries_count(self):
+        """
+        Check if the GRAPHQL query "DeviceInfos" runs a constant number of SQL queries,
+        whatever the versions count of the snapshots
+        """
+        # Given
+        test_device = create_test_device(name="Mon objet!")
+        create_large_snapshot(test_device, versions_count=5000, save_date="2020-01-01")
+
+        # Acts
+        with CaptureQueriesContext(connection) as context:
+            response = self.query(
+                '''
+                query getDeviceInfos($deviceID:BigInt!){
+                    deviceInfos(deviceId:$deviceID){
+                        name,
+                        snapshots{
+                            key,
+                            date
+                        }
+                    }
+                }
+                ''',
+                variables={
+                    'deviceID': str(test_device.id)
+                }
+            )
+
+        op_result = response.json()['data']['deviceInfos']
+
+        # Asserts
+        self.assertEqual(len(op_result['snapshots']), 1)
+        self.assertEqual(len(context.captured_queries), 2)
+
+    def test_resolve_device_infos_lazy_snapshots(self):
+        """
+        Check if the snapshots of the GRAPHQL query "DeviceInfos" are only queried if selected
+        """
+        # Given
+        test_device = create_test_device(name="Mon objet!")
+        Snapshot.objects.bulk_create([
+            Snapshot(related_device=test_device, save_date="2020-01-01", operating_system="OS")
+            for _ in range(1000)
+        ])
+        query = '''
+            query getDeviceInfos($deviceID:BigInt!){
+                deviceInfos(deviceId:$deviceID){
+                    name%s
+                }
+            }
+        '''
+
+        # Acts
+        with CaptureQueriesContext(connection) as device_context:
+            device_response = self.query(
+                query % "", variables={'deviceID': str(test_device.id)})
+        # The queries log is reset by the next request
+        device_queries_count = len(device_context.captured_queries)
+        with CaptureQueriesContext(connection) as snapshots_context:
+            snapshots_response = self.query(
+                query % ", snapshots{ key, date }", variables={'deviceID': str(test_device.id)})
+
+        # Asserts
+        self.assertEqual(device_response.json()['data']['deviceInfos'], {'name': "Mon objet!"})
+        self.assertEqual(device_queries_count, 1)
+        self.assertEqual(
+            len(snapshots_response.json()['data']['deviceInfos']['snapshots']), 1000)
+        self.assertEqual(len(snapshots_context.captured_queries), 2)
+
     def test_resolve_device_infos_unkown_device(self):
         """
         Check if the GRAPHQL query "DeviceInfos" can be resolved in unusual conditions :
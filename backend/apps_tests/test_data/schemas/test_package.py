@@ -0,0 +1,99 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from graphene_django.utils.testing import GraphQLTestCase
+
+from data.models import DeviceLatestVersion, Snapshot
+from apps_tests.test_data.utils import (
+    create_test_chosen_version,
+    create_test_device,
+    create_test_package
+)
+
+from .utils import tear_down_objects
+
+
+class PackageSchemaQueryTest(GraphQLTestCase):
+    """
+    Package devices lookup schema test class
+    """
+
+    databases = '__all__'
+    GRAPHQL_URL = 'http://0.0.0.0:8000/api/v1/data/graphql/'
+
+    def setUp(self) -> None:
+        """
+        Before each test function : four devices run openssl, one of them as a snap
+        """
+        apt_package = create_test_package(name="openssl", package_type="apt",
+                                          pre_install_lines="")
+        snap_package = create_test_package(name="openssl", package_type="snap",
+                                           pre_install_lines="")
+        for index, (package, version) in enumerate([
+                (apt_package, "3.0.10"), (apt_package, "1.1.1"),
+                (apt_package, "3.0.2"), (snap_package, "3.0.1")]):
+            device = create_test_device(name=f"Device #{index}")
+            snapshot = Snapshot.objects.create(
+                related_device=device, save_date="2020-01-01", operating_system="My OS!")
+            snapshot.versions.add(
+                create_test_chosen_version(package=package, chosen_version=version))
+            DeviceLatestVersion.refresh(device.id)
+
+    def tearDown(self) -> None:
+        """After each test function
+        which flush database
+        """
+        tear_down_objects()
+
+    def query_package_devices(self, arguments: str) -> list:
+        """ Queries the devices running openssl
+
+        :type arguments: str
+        :param arguments: Additional query arguments (e.g. ``versionLt: "3.0.2"``)
+
+        :rtype: list
+        """
+        response = self.query(
+            '''
+            query {
+                packageDevices(name: "openssl", %s) {
+                    deviceName,
+                    installType,
+                    chosenVersion,
+                    date
+                }
+            }
+            ''' % arguments
+        )
+        return response.json()['data']['packageDevices']
+
+    def test_resolve_package_devices(self):
+        """
+        Check if the GRAPHQL query "packageDevices" returns the devices in a versions range,
+        sorted by version
+        """
+        # Acts
+        with CaptureQueriesContext(connection) as context:
+            lower_versions = self.query_package_devices('versionLt: "3.0.2"')
+        queries_count = len(context.captured_queries)
+        greater_versions = self.query_package_devices('versionGte: "3.0.2", first: 1')
+
+        # Asserts
+        self.assertEqual(
+            [(device['deviceName'], device['installType'], device['chosenVersion'])
+             for device in lower_versions],
+            [("Device #1", "apt", "1.1.1"), ("Device #3", "snap", "3.0.1")]
+        )
+        self.assertEqual(lower_versions[0]['date'], "2020-01-01")
+        self.assertEqual(queries_count, 1)
+        self.assertEqual([device['chosenVersion'] for device in greater_versions], ["3.0.2"])
+
+    def test_resolve_package_devices_install_type(self):
+        """
+        Check if the GRAPHQL query "packageDevices" filters the installation type
+        """
+        # Acts
+        op_result = self.query_package_devices('installType: "apt"')
+
+        # Asserts
+        self.assertEqual([device['chosenVersion'] for device in op_result],
+                         ["1.1.1", "3.0.2", "3.0.10"])
@@ -1,15 +1,20 @@
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
 from graphene_django.utils.testing import GraphQLTestCase
 
-from data.models import Snapshot
+from data.models import Package, Snapshot
 from apps_tests.test_data.utils import (
     create_test_chosen_version,
     create_test_device,
     create_test_package
 )
 
-from .utils import tear_down_objects
+from .utils import create_large_snapshot, tear_down_objects
 
 
+# The resolvers are tested without the responses cache
+@override_settings(GRAPHQL_CACHE={**settings.GRAPHQL_CACHE, 'ENABLED': False})
 class SnapshotSchemaQueryTest(GraphQLTestCase):
     """Schema test class from
     """
@@ -34,11 +39,7 @@ class SnapshotSchemaQueryTest(GraphQLTestCase):
 
         chosen_version = "1.0"
 
-        test_package = create_test_package(
-            package_type="package type",
-            name="My package!",
-            pre_install_lines=""
-        )
+        package_names = ["My package!", "My other package!"]
 
         save_date = "2020-01-01"
         test_save = Snapshot.objects.create(
@@ -47,7 +48,12 @@ class SnapshotSchemaQueryTest(GraphQLTestCase):
             operating_system=operating_system
         )
 
-        for _ in range(0, 2):
+        for package_name in package_names:
+            test_package = create_test_package(
+                package_type="package type",
+                name=package_name,
+                pre_install_lines=""
+            )
             new_version = create_test_chosen_version(
                 chosen_version=chosen_version,
                 package=test_package
@@ -84,10 +90,427 @@ class SnapshotSchemaQueryTest(GraphQLTestCase):
         for _, version in enumerate(op_result['versions']):
             self.assertEqual(
                 version['chosenVersion'], "1.0")
-            self.assertEqual(version['name'], 'My package!')
+            self.assertIn(version['name'], package_names)
             self.assertEqual(version['installType'], 'package type')
         self.assertEqual(len(op_result['repositories']), 0)
 
+    def test_resolve_snapshot_infos_queries_count(self):
+        """
+        Check if the GRAPHQL query "snapshotInfos" runs a constant number of SQL queries,
+        whatever the versions count
+        """
+        # Given
+        test_save = create_large_snapshot(
+            create_test_device(name="Mon objet!"), versions_count=5000, save_date="2020-01-01")
+
+        # Acts
+        with CaptureQueriesContext(connection) as context:
+            response = self.query(
+                '''
+                query getSaveInfos($snapshotID:BigInt!){
+                    snapshotInfos(snapshotId: $snapshotID) {
+                        versions{
+                            name,
+                            installType,
+                            chosenVersion
+                        },
+                        operatingSystem
+                    }
+                }
+                ''',
+                variables={
+                    'snapshotID': str(test_save.id)
+                }
+            )
+
+        op_result = response.json()['data']['snapshotInfos']
+
+        # Asserts
+        self.assertEqual(len(op_result['versions']), 5000)
+        self.assertEqual(op_result['versions'][0]['installType'], "package type")
+        self.assertEqual(len(context.captured_queries), 2)
+
+    def query_versions_page(self, snapshot_id: int, arguments: str) -> dict:
+        """ Queries a page of the versions connection of a snapshot
+
+        :type snapshot_id: int
+        :param snapshot_id: ID of the snapshot
+
+        :type arguments: str
+        :param arguments: Connection arguments (e.g. ``first: 10``)
+
+        :rtype: dict
+        """
+        response = self.query(
+            '''
+            query getVersions($snapshotID:BigInt!){
+                snapshotInfos(snapshotId: $snapshotID) {
+                    versionsConnection(%s) {
+                        edges { cursor, node { name, installType, chosenVersion } },
+                        pageInfo { hasNextPage, endCursor }
+                    }
+                }
+            }
+            ''' % arguments,
+            variables={'snapshotID': str(snapshot_id)}
+        )
+        return response.json()
+
+    def test_resolve_versions_connection_pages(self):
+        """
+        Check if the versions connection browses every version once, sorted by name,
+        with a constant number of SQL queries per page
+        """
+        # Given
+        test_save = create_large_snapshot(
+            create_test_device(name="Mon objet!"), versions_count=250, save_date="2020-01-01")
+        names = []
+        arguments = "first: 100"
+
+        # Acts
+        with CaptureQueriesContext(connection) as context:
+            page = self.query_versions_page(test_save.id, arguments)
+        first_page_queries = len(context.captured_queries)
+        while True:
+            connection_data = page['data']['snapshotInfos']['versionsConnection']
+            names.extend(edge['node']['name'] for edge in connection_data['edges'])
+            if not connection_data['pageInfo']['hasNextPage']:
+                break
+            arguments = f'first: 100, after: "{connection_data["pageInfo"]["endCursor"]}"'
+            page = self.query_versions_page(test_save.id, arguments)
+
+        # Asserts
+        self.assertEqual(names, sorted(f"package-{index}" for index in range(250)))
+        self.assertEqual(first_page_queries, 2)
+
+    def test_resolve_versions_connection_delta_snapshot(self):
+        """
+        Check if the versions connection pages a delta snapshot from the rows of its
+        checkpoint and its changes only
+        """
+        # Given
+        test_device = create_test_device(name="Mon objet!")
+        parent = create_large_snapshot(test_device, versions_count=250, save_date="2020-01-01")
+        removed_version, upgraded_version = parent.versions.order_by('package__name')[:2]
+        test_save = Snapshot.objects.create(
+            related_device=test_device,
+            save_date="2020-01-02",
+            operating_system="My OS!",
+            storage_mode="delta",
+            parent=parent,
+            chain_length=1
+        )
+        test_save.added_versions.add(create_test_chosen_version(
+            chosen_version="2.0", package=upgraded_version.package))
+        test_save.removed_versions.add(removed_version, upgraded_version)
+        versions = []
+        arguments = "first: 100"
+
+        # Acts
+        with CaptureQueriesContext(connection) as context:
+            page = self.query_versions_page(test_save.id, arguments)
+        first_page_queries = [query['sql'] for query in context.captured_queries]
+        while True:
+            connection_data = page['data']['snapshotInfos']['versionsConnection']
+            versions.extend((edge['node']['name'], edge['node']['chosenVersion'])
+                            for edge in connection_data['edges'])
+            if not connection_data['pageInfo']['hasNextPage']:
+                break
+            arguments = f'first: 100, after: "{connection_data["pageInfo"]["endCursor"]}"'
+            page = self.query_versions_page(test_save.id, arguments)
+
+        # Asserts
+        self.assertEqual(len(versions), 249)
+        self.assertNotIn(removed_version.package.name, [name for name, _ in versions])
+        self.assertIn((upgraded_version.package.name, "2.0"), versions)
+        self.assertEqual(versions, sorted(versions))
+        # The ids of the checkpoint versions are not sent to the database
+        self.assertLess(max(len(query) for query in first_page_queries), 1200)
+
+    def test_resolve_versions_connection_filters(self):
+        """
+        Check if the versions connection filters the versions by name prefix and install type
+        """
+        # Given
+        test_save = create_large_snapshot(
+            create_test_device(name="Mon objet!"), versions_count=30, save_date="2020-01-01")
+        other_package = create_test_package(
+            package_type="other type", name="package-1-other", pre_install_lines="")
+        test_save.versions.add(
+            create_test_chosen_version(chosen_version="1.0", package=other_package))
+
+        # Acts
+        prefixed = self.query_versions_page(test_save.id, 'namePrefix: "package-1"')
+        typed = self.query_versions_page(
+            test_save.id, 'namePrefix: "package-1", installType: "other type"')
+        invalid = self.query_versions_page(test_save.id, 'after: "not a cursor"')
+
+        # Asserts
+        self.assertEqual(
+            sorted(edge['node']['name'] for edge in
+                   prefixed['data']['snapshotInfos']['versionsConnection']['edges']),
+            ["package-1", "package-1-other"] + [f"package-1{index}" for index in range(10)]
+        )
+        self.assertEqual(
+            [edge['node']['installType'] for edge in
+             typed['data']['snapshotInfos']['versionsConnection']['edges']],
+            ["other type"]
+        )
+        self.assertIn('errors', invalid)
+
+    def query_snapshot_diff(self, base_id: int, target_id: int) -> dict:
+        """ Queries the difference between two snapshots
+
+        :type base_id: int
+        :param base_id: ID of the compared snapshot
+
+        :type target_id: int
+        :param target_id: ID of the snapshot compared to the base one
+
+        :rtype: dict
+        """
+        response = self.query(
+            '''
+            query getDiff($baseID:BigInt!, $targetID:BigInt!){
+                snapshotDiff(baseId: $baseID, targetId: $targetID) {
+                    added { name, chosenVersion },
+                    removed { name, chosenVersion },
+                    upgraded { name, installType, baseVersion, chosenVersion },
+                    downgraded { name, baseVersion, chosenVersion }
+                }
+            }
+            ''',
+            variables={'baseID': str(base_id), 'targetID': str(target_id)}
+        )
+        return response.json()['data']['snapshotDiff']
+
+    def create_diff_snapshots(self, storage_mode: str) -> tuple:
+        """ Creates two snapshots of a device : ``curl`` is upgraded, ``vim`` removed
+        and ``git`` installed in the second one
+
+        :type storage_mode: str
+        :param storage_mode: Storage mode of the second snapshot (``full`` or ``delta``)
+
+        :rtype: tuple
+        """
+        test_device = create_test_device(name="Mon objet!")
+        versions = {
+            (name, version): create_test_chosen_version(
+                chosen_version=version,
+                package=create_test_package(
+                    package_type="apt", name=name, pre_install_lines="")
+                if version == "1.0" or name == "git" else Package.objects.get(name=name)
+            )
+            for name, version in [("curl", "1.0"), ("vim", "1.0"), ("bash", "1.0"),
+                                  ("curl", "2.0"), ("git", "1.0")]
+        }
+        base = Snapshot.objects.create(
+            related_device=test_device, save_date="2020-01-01", operating_system="My OS!")
+        base.versions.add(*[versions[key] for key in [("curl", "1.0"), ("vim", "1.0"),
+                                                       ("bash", "1.0")]])
+        target = Snapshot.objects.create(
+            related_device=test_device, save_date="2020-01-02", operating_system="My OS!",
+            storage_mode=storage_mode, parent=base if storage_mode == "delta" else None,
+            chain_length=1 if storage_mode == "delta" else 0
+        )
+        if storage_mode == "delta":
+            target.added_versions.add(versions[("curl", "2.0")], versions[("git", "1.0")])
+            target.removed_versions.add(versions[("curl", "1.0")], versions[("vim", "1.0")])
+        else:
+            target.versions.add(*[versions[key] for key in [("curl", "2.0"), ("bash", "1.0"),
+                                                             ("git", "1.0")]])
+        return base, target
+
+    def test_resolve_snapshot_diff(self):
+        """
+        Check if the GRAPHQL query "snapshotDiff" returns the added, removed, upgraded
+        and downgraded (reverse comparison) softwares of full and delta snapshots
+        """
+        # Given
+        expected_diff = {
+            'added': [{'name': "git", 'chosenVersion': "1.0"}],
+            'removed': [{'name': "vim", 'chosenVersion': "1.0"}],
+            'upgraded': [{'name': "curl", 'installType': "apt",
+                          'baseVersion': "1.0", 'chosenVersion': "2.0"}],
+            'downgraded': []
+        }
+        results = {}
+
+        # Acts
+        for storage_mode in ("full", "delta"):
+            base, target = self.create_diff_snapshots(storage_mode)
+            results[storage_mode] = (
+                self.query_snapshot_diff(base.id, target.id),
+                self.query_snapshot_diff(target.id, base.id)
+            )
+            tear_down_objects()
+
+        # Asserts
+        for diff, reverse_diff in results.values():
+            self.assertEqual(diff, expected_diff)
+            self.assertEqual(reverse_diff['added'], expected_diff['removed'])
+            self.assertEqual(reverse_diff['removed'], expected_diff['added'])
+            self.assertEqual(reverse_diff['upgraded'], [])
+            self.assertEqual(reverse_diff['downgraded'], [
+                {'name': "curl", 'baseVersion': "2.0", 'chosenVersion': "1.0"}
+            ])
+
+    def test_resolve_snapshot_diff_cached(self):
+        """
+        Check if the GRAPHQL query "snapshotDiff" is cached, and returns nothing for
+        an unknown snapshot
+        """
+        # Given
+        base, target = self.create_diff_snapshots("full")
+        self.query_snapshot_diff(base.id, target.id)
+
+        # Acts
+        with CaptureQueriesContext(connection) as context:
+            diff = self.query_snapshot_diff(base.id, target.id)
+        # The queries log is reset by the next request
+        queries_count = len(context.captured_queries)
+        unknown_diff = self.query_snapshot_diff(base.id, target.id + 1)
+
+        # Asserts
+        self.assertEqual(len(diff['upgraded']), 1)
+        self.assertEqual(queries_count, 1)
+        self.assertIsNone(unknown_diff)
+
+    def test_resolve_snapshot_infos_delta_snapshot(self):
+        """
+        Check if the GRAPHQL query "snapshotInfos" rebuilds the versions of a delta snapshot
+        """
+        # Given
+        test_device = create_test_device(name="Mon objet!")
+        packages = [
+            create_test_package(package_type="package type", name=name, pre_install_lines="")
+            for name in ("My package!", "My other package!")
+        ]
+        parent_versions = [
+            create_test_chosen_version(chosen_version="1.0", package=package)
+            for package in packages
+        ]
+        upgraded_version = create_test_chosen_version(chosen_version="2.0", package=packages[0])
+        parent = Snapshot.objects.create(
+            related_device=test_device,
+            save_date="2020-01-01",
+            operating_system="My OS!"
+        )
+        parent.versions.add(*parent_versions)
+        test_save = Snapshot.objects.create(
+            related_device=test_device,
+            save_date="2020-01-02",
+            operating_system="My OS!",
+            storage_mode="delta",
+            parent=parent,
+            chain_length=1
+        )
+        test_save.added_versions.add(upgraded_version)
+        test_save.removed_versions.add(parent_versions[0])
+
+        # Acts
+        response = self.query(
+            '''
+            query getSaveInfos($snapshotID:BigInt!){
+                snapshotInfos(snapshotId: $snapshotID) {
+                    versions{
+                        name,
+                        chosenVersion
+                    }
+                }
+            }
+            ''',
+            variables={
+                'snapshotID': str(test_save.id)
+            }
+        )
+
+        op_result = response.json()['data']['snapshotInfos']
+
+        # Asserts
+        self.assertEqual(
+            sorted((version['name'], version['chosenVersion'])
+                   for version in op_result['versions']),
+            [("My other package!", "1.0"), ("My package!", "2.0")]
+        )
+
+    def query_snapshot_batch(self, snapshot_ids: list) -> list:
+        """ Queries the versions of many snapshots at once
+
+        :type snapshot_ids: list
+        :param snapshot_ids: IDs of the snapshots
+
+        :rtype: list
+        """
+        response = self.query(
+            '''
+            query getSaveInfosBatch($snapshotIDs:[BigInt]!){
+                snapshotInfosBatch(ids: $snapshotIDs) {
+                    versions{
+                        name,
+                        chosenVersion
+                    },
+                    operatingSystem
+                }
+            }
+            ''',
+            variables={'snapshotIDs': [str(snapshot_id) for snapshot_id in snapshot_ids]}
+        )
+        return response.json()['data']['snapshotInfosBatch']
+
+    def test_resolve_snapshot_infos_batch(self):
+        """
+        Check if the GRAPHQL query "snapshotInfosBatch" returns the snapshots in the requested
+        order, with null for the unknown ones
+        """
+        # Given
+        base, target = self.create_diff_snapshots("delta")
+
+        # Acts
+        op_result = self.query_snapshot_batch([target.id, target.id + 1, base.id])
+
+        # Asserts
+        self.assertEqual(len(op_result), 3)
+        self.assertIsNone(op_result[1])
+        self.assertEqual(
+            sorted((version['name'], version['chosenVersion'])
+                   for version in op_result[0]['versions']),
+            [("bash", "1.0"), ("curl", "2.0"), ("git", "1.0")]
+        )
+        self.assertEqual(
+            sorted((version['name'], version['chosenVersion'])
+                   for version in op_result[2]['versions']),
+            [("bash", "1.0"), ("curl", "1.0"), ("vim", "1.0")]
+        )
+
+    def test_resolve_snapshot_infos_batch_queries_count(self):
+        """
+        Check if the GRAPHQL query "snapshotInfosBatch" runs a constant number of SQL queries,
+        whatever the snapshots count
+        """
+        # Given
+        test_device = create_test_device(name="Mon objet!")
+        first_save = create_large_snapshot(test_device, versions_count=1000, save_date="2020-01-01")
+        test_saves = [first_save]
+        for save_date in ("2020-01-02", "2020-01-03", "2020-01-04"):
+            test_save = Snapshot.objects.create(
+                related_device=test_device,
+                save_date=save_date,
+                operating_system="My OS!"
+            )
+            test_save.versions.set(first_save.versions.all())
+            test_saves.append(test_save)
+
+        # Acts
+        with CaptureQueriesContext(connection) as context:
+            op_result = self.query_snapshot_batch([test_save.id for test_save in test_saves])
+        queries_count = len(context.captured_queries)
+
+        # Asserts
+        self.assertEqual([len(result['versions']) for result in op_result], [1000] * 4)
+        # Snapshots, linked versions, then chosen versions with their packages
+        self.assertEqual(queries_count, 3)
+
     def test_resolve_snapshot_infos_unknown_snapshot(self):
         """
         Check if the GRAPHQL query "DeviceInfos" can be resolved in unusual conditions :
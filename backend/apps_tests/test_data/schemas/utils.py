@@ -8,3 +8,36 @@ def tear_down_objects():
     ChosenVersion.objects.all().delete()
     Package.objects.all().delete()
     Device.objects.all().delete()
+
+
+def create_large_snapshot(device: Device, versions_count: int, save_date: str) -> Snapshot:
+    """ Creates a snapshot linked to many chosen versions (bulk inserted)
+
+    :type device: Device
+    :param device: Related device
+
+    :type versions_count: int
+    :param versions_count: How many versions are linked to the snapshot
+
+    :type save_date: str
+    :param save_date: Snapshot date (e.g. 2020-01-01)
+
+    :rtype: Snapshot
+    """
+    packages = Package.objects.bulk_create([
+        Package(name=f"package-{index}", type="package type", pre_install_lines="")
+        for index in range(versions_count)
+    ])
+    versions = ChosenVersion.objects.bulk_create([
+        ChosenVersion(package=package, chosen_version=save_date) for package in packages
+    ])
+    snapshot = Snapshot.objects.create(
+        related_device=device,
+        save_date=save_date,
+        operating_system="My OS!"
+    )
+    Snapshot.versions.through.objects.bulk_create([
+        Snapshot.versions.through(snapshot_id=snapshot.id, chosenversion_id=version.id)
+        for version in versions
+    ])
+    return snapshot
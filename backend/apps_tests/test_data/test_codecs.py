@@ -0,0 +1,125 @@
+import gzip
+import json
+
+from unittest import skipUnless
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+from data.codecs import (
+    PayloadDecodingError,
+    decode_payload,
+    negotiate_encoding,
+    supported_encodings,
+    zstandard
+)
+
+from apps_tests.test_data.utils import create_sample_snapshot_data, encode_payload
+
+
+class TestCodecs(SimpleTestCase):
+    """
+    Binary payloads codecs unit test class
+    """
+
+    def test_encode_decode_round_trip(self):
+        """
+        Check if a snapshot is decoded as sent for every supported encoding.
+        """
+        # Given
+        sample_data = create_sample_snapshot_data(packages_count=50)
+
+        for encoding in supported_encodings():
+            with self.subTest(encoding=encoding):
+                # Acts
+                op_result = decode_payload(encode_payload(sample_data, encoding), encoding)
+
+                # Asserts
+                self.assertEqual(op_result, sample_data)
+
+    def test_default_encoding_is_gzip_json(self):
+        """
+        Check if a payload is decoded as gzip compressed JSON without any negotiation.
+        """
+        # Given
+        payload = gzip.compress(b'{"hostname": "my-computer"}')
+
+        # Acts
+        op_result = decode_payload(payload)
+
+        # Asserts
+        self.assertEqual(op_result, {'hostname': 'my-computer'})
+
+    @override_settings(BACKUP_IMPORT={**settings.BACKUP_IMPORT, 'MAX_PAYLOAD_SIZE': 1024})
+    def test_decode_payload_too_large(self):
+        """
+        Check if a payload exceeding the maximum size once decompressed is rejected.
+        """
+        # Given
+        payload = encode_payload({'padding': 'a' * 4096})
+
+        # Acts & Asserts
+        self.assertLess(len(payload), 1024)
+        with self.assertRaises(PayloadDecodingError):
+            decode_payload(payload)
+
+    def test_decode_corrupted_payload(self):
+        """
+        Check if corrupted or truncated payloads raise a decoding error.
+        """
+        # Given
+        payload = encode_payload(create_sample_snapshot_data(packages_count=10))
+
+        for corrupted_payload in (b'not compressed', payload[:len(payload) // 2]):
+            with self.subTest(corrupted_payload=corrupted_payload[:10]):
+                # Acts & Asserts
+                with self.assertRaises(PayloadDecodingError):
+                    decode_payload(corrupted_payload)
+
+    @skipUnless(zstandard, "zstandard is not installed")
+    def test_decode_truncated_zstd_payload(self):
+        """
+        Check if a truncated zstd payload raises a decoding error,
+        with or without the content size in the frame header.
+        """
+        # Given
+        raw = json.dumps(create_sample_snapshot_data(packages_count=10)).encode()
+        compressor = zstandard.ZstdCompressor().compressobj()
+        payloads = [
+            zstandard.ZstdCompressor().compress(raw),
+            compressor.compress(raw) + compressor.flush()
+        ]
+
+        for payload in payloads:
+            with self.subTest(content_size=zstandard.frame_content_size(payload)):
+                # Acts & Asserts
+                with self.assertRaisesMessage(PayloadDecodingError, "Invalid zstd payload!"):
+                    decode_payload(payload[:-8], 'json+zstd')
+
+    def test_decode_unsupported_encoding(self):
+        """
+        Check if an unknown encoding raises a decoding error.
+        """
+        # Acts & Asserts
+        with self.assertRaises(PayloadDecodingError):
+            decode_payload(b'{}', 'xml+identity')
+        with self.assertRaises(PayloadDecodingError):
+            decode_payload(b'{}', 'json+brotli')
+
+    def test_negotiate_encoding(self):
+        """
+        Check if the first encoding supported by both sides is chosen.
+        """
+        # Acts
+        op_result = negotiate_encoding(['json+brotli', 'json+gzip', 'json+identity'])
+
+        # Asserts
+        self.assertEqual(op_result, 'json+gzip')
+
+    def test_negotiate_encoding_without_common_encoding(self):
+        """
+        Check if the negotiation fails if no encoding is supported by the server.
+        """
+        # Acts & Asserts
+        with self.assertRaises(PayloadDecodingError):
+            negotiate_encoding(['xml+brotli'])
@@ -0,0 +1,58 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from data.models import ChosenVersion, DeviceLatestVersion, Snapshot
+from tools.versions import version_key
+from apps_tests.test_data.schemas.utils import tear_down_objects
+from apps_tests.test_data.utils import (
+    create_test_chosen_version,
+    create_test_device,
+    create_test_package
+)
+
+
+class TestBackfillVersionKeys(TestCase):
+    """
+    ``backfill_version_keys`` management command test class
+    """
+
+    databases = '__all__'
+
+    def tearDown(self) -> None:
+        tear_down_objects()
+
+    def test_backfill_version_keys(self):
+        """
+        Check if the missing keys are computed by batches and copied into the lookup rows
+        """
+        # Given
+        package = create_test_package(name="openssl", package_type="apt", pre_install_lines="")
+        versions = [
+            create_test_chosen_version(package=package, chosen_version=version)
+            for version in ["3.0.2-0ubuntu1", "1:1.1.1", "3.0.10"]
+        ]
+        device = create_test_device(name="Device")
+        snapshot = Snapshot.objects.create(
+            related_device=device, save_date="2020-01-01", operating_system="My OS!")
+        snapshot.versions.add(versions[0])
+        DeviceLatestVersion.refresh(device.id)
+        ChosenVersion.objects.filter(id__in=[versions[0].id, versions[1].id]).update(
+            version_key=b"")
+        DeviceLatestVersion.objects.update(version_key=b"")
+        output = StringIO()
+
+        # Acts
+        call_command("backfill_version_keys", batch_size=1, stdout=output)
+
+        # Asserts
+        self.assertIn("2 version keys updated", output.getvalue())
+        self.assertEqual(
+            {version: bytes(key) for version, key
+             in ChosenVersion.objects.values_list('chosen_version', 'version_key')},
+            {version: version_key(version)
+             for version in ["3.0.2-0ubuntu1", "1:1.1.1", "3.0.10"]}
+        )
+        self.assertEqual(bytes(DeviceLatestVersion.objects.get().version_key),
+                         version_key("3.0.2-0ubuntu1"))
@@ -1,15 +1,32 @@
+import asyncio
+import copy
 import json
+import threading
 
-from typing import Tuple
+from io import StringIO
+from typing import List, Tuple
+from unittest.mock import patch
 
-from channels.testing import WebsocketCommunicator
+from channels.layers import get_channel_layer
+from channels.testing import ApplicationCommunicator, WebsocketCommunicator
 
-from django.test import SimpleTestCase
+from django.conf import settings
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
 import pytest
 
-from data.consumers import BackupImportConsumer
-from data.models import Device, Package, ChosenVersion, Repository, Snapshot
+from data.consumers import (
+    AsyncBackupImportConsumer,
+    BackupImportConsumer,
+    SnapshotImportWorker
+)
+from data.models import (DEVICE_CACHE, Device, DeviceLatestVersion, Package, ChosenVersion,
+                         Repository, Snapshot)
+
+from apps_tests.test_data.utils import create_sample_snapshot_data, encode_payload
 
 class TestConsumers(SimpleTestCase):
     """
@@ -40,6 +57,35 @@ class TestConsumers(SimpleTestCase):
 
         return connected, communicator
 
+    def receive_with_captured_queries(self, sample_data: dict) -> List[dict]:
+        """ Runs the ``receive`` function of the websocket consumer without any client.
+        Returns the SQL queries performed during the import.
+
+        :type sample_data: dict
+        :param sample_data: Snapshot data sent by the client
+
+        :rtype: List[dict]
+        """
+        test_object = BackupImportConsumer()
+        with patch.object(test_object, 'send'), patch.object(test_object, 'close'),\
+                CaptureQueriesContext(connection) as context:
+            test_object.receive(text_data=json.dumps(sample_data))
+        return context.captured_queries
+
+    @staticmethod
+    def count_library_queries(queries: List[dict]) -> int:
+        """ Counts the queries performed on the packages and chosen versions tables
+
+        :type queries: List[dict]
+        :param queries: Captured SQL queries
+
+        :rtype: int
+        """
+        return len([
+            query for query in queries
+            if 'data_package' in query['sql'] or 'data_chosenversion' in query['sql']
+        ])
+
     def test_append_new_device(self):
         """
         Check if the websocket creates a new device if not already set.
@@ -66,6 +112,171 @@ class TestConsumers(SimpleTestCase):
         # Asserts
         self.assertEqual(op_result, expected_op_result)
 
+    def test_receive_library_queries_count_does_not_grow_with_packages(self):
+        """
+        Check if the packages import cost does not depend on the packages count.
+        """
+        # Given
+        small_snapshot = create_sample_snapshot_data(packages_count=10)
+        large_snapshot = create_sample_snapshot_data(
+            packages_count=300, library_type="second_type")
+
+        # Acts
+        small_queries = self.receive_with_captured_queries(small_snapshot)
+        large_queries = self.receive_with_captured_queries(large_snapshot)
+
+        # Asserts
+        self.assertEqual(
+            self.count_library_queries(small_queries),
+            self.count_library_queries(large_queries)
+        )
+        self.assertEqual(Package.objects.count(), 310)
+        self.assertEqual(ChosenVersion.objects.count(), 310)
+
+    @override_settings(BACKUP_IMPORT={**settings.BACKUP_IMPORT, 'INGESTION_BACKEND': 'orm'})
+    def test_receive_library_queries_count_already_set_packages(self):
+        """
+        Check if importing already set packages only performs lookups.
+        """
+        # Given
+        sample_data = create_sample_snapshot_data(packages_count=500)
+        self.receive_with_captured_queries(sample_data)
+        # Another repositories set : the snapshot is not deduplicated
+        sample_data['repositories'] = [{'name': 'My repo', 'lines': ''}]
+        # Another worker process : nothing has been interned
+        ChosenVersion.clear_cache()
+
+        # Acts
+        queries = self.receive_with_captured_queries(sample_data)
+
+        # Asserts
+        self.assertEqual(self.count_library_queries(queries), 2)
+        self.assertEqual(Package.objects.count(), 500)
+        self.assertEqual(ChosenVersion.objects.count(), 500)
+
+    def test_receive_library_queries_count_interned_packages(self):
+        """
+        Check if importing already interned packages does not query the packages
+        and chosen versions tables.
+        """
+        # Given
+        sample_data = create_sample_snapshot_data(packages_count=500)
+        self.receive_with_captured_queries(sample_data)
+        sample_data['repositories'] = [{'name': 'My repo', 'lines': ''}]
+
+        # Acts
+        queries = self.receive_with_captured_queries(sample_data)
+
+        # Asserts
+        self.assertFalse([
+            query for query in queries
+            if query['sql'].startswith('SELECT') and (
+                'data_package' in query['sql'] or 'data_chosenversion' in query['sql'])
+        ])
+        self.assertEqual(Snapshot.objects.count(), 2)
+
+    def test_receive_refreshes_latest_versions(self):
+        """
+        Check if the devices latest versions follow the imported snapshots
+        """
+        # Given
+        self.receive_with_captured_queries(create_sample_snapshot_data(packages_count=10))
+        upgraded_snapshot = create_sample_snapshot_data(packages_count=5, version="2.0")
+
+        # Acts
+        self.receive_with_captured_queries(upgraded_snapshot)
+
+        # Asserts
+        latest_snapshot = Snapshot.objects.latest('id')
+        self.assertEqual(
+            sorted(DeviceLatestVersion.objects.values_list(
+                'package__name', 'chosen_version__chosen_version', 'device__latest_snapshot_id')),
+            [(f"my_package_{index}", "2.0", latest_snapshot.id) for index in range(5)]
+        )
+
+    def test_reimport_keeps_latest_versions(self):
+        """
+        Check if re-importing the same snapshot does not write the devices latest versions
+        """
+        # Given
+        sample_data = create_sample_snapshot_data(packages_count=10)
+        self.receive_with_captured_queries(sample_data)
+        row_ids = sorted(DeviceLatestVersion.objects.values_list('id', flat=True))
+
+        # Acts
+        queries = self.receive_with_captured_queries(sample_data)
+
+        # Asserts
+        table = DeviceLatestVersion._meta.db_table
+        self.assertFalse([
+            query for query in queries
+            if table in query['sql'] and not query['sql'].startswith('SELECT')
+        ])
+        self.assertEqual(sorted(DeviceLatestVersion.objects.values_list('id', flat=True)), row_ids)
+        self.assertEqual(Device.objects.get().latest_snapshot_id, Snapshot.objects.latest('id').id)
+
+    def test_receive_queries_count_does_not_grow_with_versions(self):
+        """
+        Check if the snapshot versions and repositories are linked with bulk inserts.
+        """
+        # Given
+        small_snapshot = create_sample_snapshot_data(packages_count=10)
+        large_snapshot = create_sample_snapshot_data(
+            packages_count=300, library_type="second_type")
+        for sample_data in (small_snapshot, large_snapshot):
+            sample_data['repositories'] = [
+                {'name': f'My repo #{index}', 'lines': ''} for index in range(3)
+            ]
+        # Device and repositories are created once
+        self.receive_with_captured_queries({
+            **create_sample_snapshot_data(packages_count=1, library_type="warm_up"),
+            'repositories': small_snapshot['repositories']
+        })
+
+        # Acts
+        small_queries = self.receive_with_captured_queries(small_snapshot)
+        large_queries = self.receive_with_captured_queries(large_snapshot)
+
+        # Asserts
+        self.assertEqual(len(small_queries), len(large_queries))
+        self.assertFalse([
+            query for query in large_queries
+            if query['sql'].startswith('UPDATE "data_snapshot"')
+        ])
+        snapshot = Snapshot.objects.latest('id')
+        self.assertEqual(snapshot.versions.count(), 300)
+        self.assertEqual(snapshot.repositories.count(), 3)
+
+    def test_receive_progress_frames_are_throttled(self):
+        """
+        Check if the packages import progress is sent with a bounded count of single
+        encoded frames.
+        """
+        # Given
+        sample_data = create_sample_snapshot_data(packages_count=3000)
+        test_object = BackupImportConsumer()
+
+        # Acts
+        with patch.object(test_object, 'send') as send, patch.object(test_object, 'close'):
+            test_object.receive(text_data=json.dumps(sample_data))
+        messages = [json.loads(call.args[0]) for call in send.call_args_list]
+        progress_messages = [
+            message['infos'] for message in messages if message['type'] == 'progress_bar'
+        ]
+
+        # Asserts
+        self.assertLessEqual(len(progress_messages), 5)
+        self.assertEqual(progress_messages[0], {
+            'state': 'init',
+            'total': 3000,
+            'desc': 'first_type packages import'
+        })
+        self.assertEqual(progress_messages[-1], {
+            'state': 'update',
+            'index': 3000,
+            'total': 3000
+        })
+
     @pytest.mark.django_db(transaction=True)
     @pytest.mark.asyncio
     async def test_connect(self):
@@ -390,3 +601,1303 @@ class TestConsumers(SimpleTestCase):
                         )
 
         await communicator.disconnect()
+
+
+class TestAsyncConsumers(SimpleTestCase):
+    """
+    Asynchronous websocket unit test class
+    """
+
+    databases = '__all__'
+
+    def tearDown(self):
+        Snapshot.objects.all().delete()
+        Device.objects.all().delete()
+        ChosenVersion.objects.all().delete()
+        Package.objects.all().delete()
+        Repository.objects.all().delete()
+
+        return super().tearDown()
+
+    async def init_ws_communication(self) -> Tuple[bool, WebsocketCommunicator]:
+        """ Construct a web socket client for unit test. Returns with it the status of communication
+
+        :rtype: (bool, WebsocketCommunicator)
+        """
+        communicator = WebsocketCommunicator(
+            AsyncBackupImportConsumer.as_asgi(),
+            "/backup/import/async"
+        )
+        connected, _ = await communicator.connect()
+
+        return connected, communicator
+
+    @staticmethod
+    async def receive_until_end(name: int, communicator: WebsocketCommunicator, events: list):
+        """ Receives every message sent by the server until the end of the import.
+        Each message is appended alongside the communicator name in the events list.
+
+        :type name: int
+        :param name: Name of the communicator
+
+        :type communicator: WebsocketCommunicator
+        :param communicator: Websocket client
+
+        :type events: list
+        :param events: Received messages, shared between every communicator
+        """
+        response = {'type': None}
+        while response['type'] != 'end':
+            response = json.loads(await communicator.receive_from(timeout=10))
+            events.append((name, response))
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.asyncio
+    async def test_connect_expect_msg(self):
+        """
+        Check if a websocket client can connect and receive the message "Connected!".
+        """
+        # Acts
+        op_result, communicator = await self.init_ws_communication()
+        received_msg = await communicator.receive_from()
+
+        # Asserts
+        self.assertTrue(op_result)
+        self.assertEqual(received_msg, "Connected!")
+
+        # After test
+        await communicator.disconnect()
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.asyncio
+    async def test_transmit_data_repository(self):
+        """
+        Check if the transmission of a simple data is successful
+        """
+        # Given
+        sample_data = create_sample_snapshot_data(packages_count=3)
+        sample_data['repositories'] = [
+            {
+                'name': 'My repo name!',
+                'lines': ''
+            }
+        ]
+        _, communicator = await self.init_ws_communication()
+        await communicator.receive_from()
+
+        # Acts
+        await communicator.send_to(text_data=json.dumps(sample_data))
+        events = []
+        await self.receive_until_end(0, communicator, events)
+
+        # Asserts
+        messages = [event[1] for event in events]
+        self.assertEqual(messages[0], {
+            'status': 'info',
+            'message': 'Fetching the device...',
+            'type': 'message'
+        })
+        self.assertEqual(messages[1], {
+            'status': 'info',
+            'type': 'message',
+            'message': 'No device found! Adding a new one!'
+        })
+        self.assertEqual(messages[-1], {
+            'status': 'info',
+            'type': 'end',
+            'message': 'End of data added!'
+        })
+        snapshot = await Snapshot.objects.aget()
+        self.assertEqual(await snapshot.versions.acount(), 3)
+        self.assertEqual(await snapshot.repositories.acount(), 1)
+
+        await communicator.disconnect()
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.asyncio
+    async def test_concurrent_imports_interleave_progress(self):
+        """
+        Load test : every concurrent import should start streaming its progress
+        before the first one ends (see ``test_concurrent_imports_run_in_parallel``).
+        """
+        # Given
+        imports_count = 8
+        communicators = []
+        for _ in range(imports_count):
+            _, communicator = await self.init_ws_communication()
+            await communicator.receive_from()
+            communicators.append(communicator)
+
+        # Acts
+        for index, communicator in enumerate(communicators):
+            sample_data = create_sample_snapshot_data(packages_count=200)
+            sample_data['hostname'] = f"my-computer-{index}"
+            await communicator.send_to(text_data=json.dumps(sample_data))
+
+        events = []
+        await asyncio.gather(*[
+            self.receive_until_end(index, communicator, events)
+            for index, communicator in enumerate(communicators)
+        ])
+
+        # Asserts
+        first_end_index = [
+            index for index, (_, message) in enumerate(events) if message['type'] == 'end'
+        ][0]
+        started_imports = {name for name, _ in events[:first_end_index]}
+        self.assertEqual(started_imports, set(range(imports_count)))
+        self.assertEqual(await Snapshot.objects.acount(), imports_count)
+        self.assertEqual(await Package.objects.acount(), 200)
+
+        for communicator in communicators:
+            await communicator.disconnect()
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.asyncio
+    async def test_concurrent_imports_run_in_parallel(self):
+        """
+        Check if the database units of two concurrent imports run at the same time
+        (each import waits in its first unit until the other one reaches it).
+        """
+        # Given
+        barrier = threading.Barrier(2, timeout=5)
+        init_device = AsyncBackupImportConsumer.init_device
+
+        def wait_other_import(consumer, snapshot_data):
+            barrier.wait()
+            return init_device(consumer, snapshot_data)
+
+        communicators = []
+        for _ in range(2):
+            _, communicator = await self.init_ws_communication()
+            await communicator.receive_from()
+            communicators.append(communicator)
+
+        # Acts
+        with patch.object(AsyncBackupImportConsumer, 'init_device', wait_other_import):
+            for index, communicator in enumerate(communicators):
+                sample_data = create_sample_snapshot_data(packages_count=10)
+                sample_data['hostname'] = f"my-computer-{index}"
+                await communicator.send_to(text_data=json.dumps(sample_data))
+            events = []
+            await asyncio.gather(*[
+                self.receive_until_end(index, communicator, events)
+                for index, communicator in enumerate(communicators)
+            ])
+
+        # Asserts
+        self.assertFalse(barrier.broken)
+        self.assertEqual(
+            [message['status'] for _, message in events if message['type'] == 'end'],
+            ['info', 'info']
+        )
+        self.assertEqual(await Snapshot.objects.acount(), 2)
+
+        for communicator in communicators:
+            await communicator.disconnect()
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.asyncio
+    async def test_chunked_upload(self):
+        """
+        Check if the asynchronous consumer follows the chunked upload protocol.
+        """
+        # Given
+        sample_data = create_sample_snapshot_data(packages_count=15)
+        header, chunks = TestChunkedUpload.split_snapshot_data(sample_data, chunk_size=10)
+        _, communicator = await self.init_ws_communication()
+        await communicator.receive_from()
+
+        # Acts
+        await communicator.send_to(text_data=json.dumps(header))
+        upload = await TestChunkedUpload.receive_typed_message(communicator)
+        for chunk in chunks:
+            await communicator.send_to(
+                text_data=json.dumps({**chunk, 'upload_id': upload['upload_id']}))
+            await TestChunkedUpload.receive_typed_message(communicator)
+        await communicator.send_to(text_data=json.dumps({
+            'action': 'commit',
+            'upload_id': upload['upload_id'],
+            'chunks': len(chunks)
+        }))
+        end = await TestChunkedUpload.receive_typed_message(communicator)
+
+        # Asserts
+        self.assertEqual(end['type'], 'end')
+        snapshot = await Snapshot.objects.aget()
+        self.assertTrue(snapshot.is_complete)
+        self.assertEqual(await snapshot.versions.acount(), 15)
+
+        await communicator.disconnect()
+
+
+@override_settings(
+    BACKUP_IMPORT={**settings.BACKUP_IMPORT, 'MODE': 'worker'},
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+)
+class TestQueuedImport(SimpleTestCase):
+    """
+    Queued import (websocket consumer and import worker) unit test class
+    """
+
+    databases = '__all__'
+
+    def tearDown(self):
+        Snapshot.objects.all().delete()
+        Device.objects.all().delete()
+        ChosenVersion.objects.all().delete()
+        Package.objects.all().delete()
+        Repository.objects.all().delete()
+
+        return super().tearDown()
+
+    async def init_ws_communication(self) -> WebsocketCommunicator:
+        """ Construct a web socket client for unit test, connected to the server
+
+        :rtype: WebsocketCommunicator
+        """
+        communicator = WebsocketCommunicator(
+            BackupImportConsumer.as_asgi(),
+            "/backup/import"
+        )
+        await communicator.connect()
+        await communicator.receive_from()
+
+        return communicator
+
+    @staticmethod
+    async def start_worker_job() -> Tuple[dict, ApplicationCommunicator]:
+        """ Starts the next job queued on the import worker channel (as ``runworker`` does).
+        Returns the job alongside the running worker.
+
+        :rtype: (dict, ApplicationCommunicator)
+        """
+        channel_layer = get_channel_layer()
+        job = await channel_layer.receive('snapshot-import')
+        worker = ApplicationCommunicator(
+            SnapshotImportWorker.as_asgi(),
+            {'type': 'channel', 'channel': 'snapshot-import'}
+        )
+        await worker.send_input(job)
+        return job, worker
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.asyncio
+    async def test_queue_import(self):
+        """
+        Check if the snapshot import is queued and its events forwarded to the client.
+        """
+        # Given
+        sample_data = create_sample_snapshot_data(packages_count=3)
+        communicator = await self.init_ws_communication()
+
+        # Acts
+        await communicator.send_to(text_data=json.dumps(sample_data))
+        job_message = json.loads(await communicator.receive_from())
+        job, worker = await self.start_worker_job()
+
+        responses = [json.loads(await communicator.receive_from())]
+        while responses[-1]['type'] != 'end':
+            responses.append(json.loads(await communicator.receive_from()))
+        worker.stop()
+
+        # Asserts
+        self.assertEqual(job_message['type'], 'job')
+        self.assertEqual(job_message['job_id'], job['job_id'])
+        self.assertEqual(job['snapshot_data'], sample_data)
+        self.assertEqual(responses[0]['message'], 'Fetching the device...')
+        self.assertEqual(responses[-1], {
+            'status': 'info',
+            'type': 'end',
+            'message': 'End of data added!'
+        })
+        self.assertEqual((await communicator.receive_output())['type'], 'websocket.close')
+        snapshot = await Snapshot.objects.aget()
+        self.assertEqual(await snapshot.versions.acount(), 3)
+
+        await communicator.disconnect()
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.asyncio
+    async def test_queue_import_malformed_data(self):
+        """
+        Check if a malformed snapshot is rejected before being queued.
+        """
+        # Given
+        sample_data = create_sample_snapshot_data(packages_count=3)
+        del sample_data['specs']['cores']
+        communicator = await self.init_ws_communication()
+
+        # Acts
+        await communicator.send_to(text_data=json.dumps(sample_data))
+        response = json.loads(await communicator.receive_from())
+
+        # Asserts
+        self.assertEqual(response, {
+            'status': 'error',
+            'type': 'end',
+            'message': "The device specification 'cores' is missing."
+        })
+        self.assertEqual(await Snapshot.objects.acount(), 0)
+
+        await communicator.disconnect()
+
+
+class TestChunkedUpload(SimpleTestCase):
+    """
+    Chunked snapshot upload protocol unit test class
+    """
+
+    databases = '__all__'
+
+    def tearDown(self):
+        Snapshot.objects.all().delete()
+        Device.objects.all().delete()
+        ChosenVersion.objects.all().delete()
+        Package.objects.all().delete()
+        Repository.objects.all().delete()
+
+        return super().tearDown()
+
+    async def init_ws_communication(self) -> WebsocketCommunicator:
+        """ Construct a web socket client for unit test, connected to the server
+
+        :rtype: WebsocketCommunicator
+        """
+        communicator = WebsocketCommunicator(
+            BackupImportConsumer.as_asgi(),
+            "/backup/import"
+        )
+        await communicator.connect()
+        await communicator.receive_from()
+
+        return communicator
+
+    @staticmethod
+    def split_snapshot_data(snapshot_data: dict, chunk_size: int) -> Tuple[dict, List[dict]]:
+        """ Splits the snapshot data into the upload header and the libraries chunks
+        (without the upload id)
+
+        :type snapshot_data: dict
+        :param snapshot_data: Snapshot data sent by the client
+
+        :type chunk_size: int
+        :param chunk_size: Maximum packages count in a chunk
+
+        :rtype: (dict, List[dict])
+        """
+        header = {
+            key: value for key, value in snapshot_data.items() if key != 'libraries'
+        }
+        header['action'] = 'header'
+        chunks = []
+        for library_name, packages in snapshot_data['libraries'].items():
+            package_items = list(packages.items())
+            for start in range(0, len(package_items), chunk_size):
+                chunks.append({
+                    'action': 'chunk',
+                    'index': len(chunks),
+                    'library': library_name,
+                    'packages': dict(package_items[start:start+chunk_size])
+                })
+        return header, chunks
+
+    @staticmethod
+    async def receive_typed_message(communicator: WebsocketCommunicator) -> dict:
+        """ Receives the next protocol message (informative messages are skipped)
+
+        :type communicator: WebsocketCommunicator
+        :param communicator: Websocket client
+
+        :rtype: dict
+        """
+        response = json.loads(await communicator.receive_from())
+        while response['type'] == 'message':
+            response = json.loads(await communicator.receive_from())
+        return response
+
+    async def send_chunk(self, communicator: WebsocketCommunicator,
+                         chunk: dict, upload_id: str) -> dict:
+        """ Sends an upload chunk, then returns the server answer
+
+        :type communicator: WebsocketCommunicator
+        :param communicator: Websocket client
+
+        :type chunk: dict
+        :param chunk: Libraries chunk
+
+        :type upload_id: str
+        :param upload_id: ID of the upload
+
+        :rtype: dict
+        """
+        await communicator.send_to(text_data=json.dumps({**chunk, 'upload_id': upload_id}))
+        return await self.receive_typed_message(communicator)
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.asyncio
+    async def test_chunked_upload(self):
+        """
+        Check if a snapshot sent by chunks is ingested chunk by chunk then committed.
+        """
+        # Given
+        sample_data = create_sample_snapshot_data(packages_count=25)
+        sample_data['repositories'] = [{'name': 'My repo name!', 'lines': ''}]
+        header, chunks = self.split_snapshot_data(sample_data, chunk_size=10)
+        communicator = await self.init_ws_communication()
+
+        # Acts
+        await communicator.send_to(text_data=json.dumps(header))
+        upload = await self.receive_typed_message(communicator)
+        acks = []
+        for chunk in chunks:
+            acks.append(await self.send_chunk(communicator, chunk, upload['upload_id']))
+            snapshot = await Snapshot.objects.aget(upload_id=upload['upload_id'])
+            self.assertFalse(snapshot.is_complete)
+        await communicator.send_to(text_data=json.dumps({
+            'action': 'commit',
+            'upload_id': upload['upload_id'],
+            'chunks': len(chunks)
+        }))
+        end = await self.receive_typed_message(communicator)
+
+        # Asserts
+        self.assertEqual(upload['type'], 'upload')
+        self.assertEqual(upload['last_chunk'], -1)
+        self.assertEqual(acks, [
+            {'status': 'info', 'type': 'ack', 'index': index} for index in range(3)
+        ])
+        self.assertEqual(end['type'], 'end')
+        snapshot = await Snapshot.objects.aget()
+        self.assertTrue(snapshot.is_complete)
+        self.assertEqual(snapshot.last_chunk, 2)
+        self.assertEqual(await snapshot.versions.acount(), 25)
+        self.assertEqual(await snapshot.repositories.acount(), 1)
+
+        await communicator.disconnect()
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.asyncio
+    async def test_chunked_upload_resume(self):
+        """
+        Check if an upload can be resumed from the last acknowledged chunk after a reconnection.
+        """
+        # Given
+        sample_data = create_sample_snapshot_data(packages_count=30)
+        header, chunks = self.split_snapshot_data(sample_data, chunk_size=10)
+        communicator = await self.init_ws_communication()
+        await communicator.send_to(text_data=json.dumps(header))
+        upload_id = (await self.receive_typed_message(communicator))['upload_id']
+        await self.send_chunk(communicator, chunks[0], upload_id)
+        await communicator.disconnect()
+
+        # Acts
+        communicator = await self.init_ws_communication()
+        await communicator.send_to(text_data=json.dumps({
+            'action': 'resume',
+            'upload_id': upload_id
+        }))
+        resume = await self.receive_typed_message(communicator)
+        replayed_chunk = await self.send_chunk(communicator, chunks[0], upload_id)
+        early_chunk = await self.send_chunk(communicator, chunks[2], upload_id)
+        for chunk in chunks[resume['last_chunk'] + 1:]:
+            await self.send_chunk(communicator, chunk, upload_id)
+        await communicator.send_to(text_data=json.dumps({
+            'action': 'commit',
+            'upload_id': upload_id,
+            'chunks': len(chunks)
+        }))
+        await self.receive_typed_message(communicator)
+
+        # Asserts
+        self.assertEqual(resume['last_chunk'], 0)
+        self.assertEqual(replayed_chunk['type'], 'upload')
+        self.assertEqual(replayed_chunk['last_chunk'], 0)
+        self.assertEqual(early_chunk['type'], 'upload')
+        snapshot = await Snapshot.objects.aget()
+        self.assertTrue(snapshot.is_complete)
+        self.assertEqual(await snapshot.versions.acount(), 30)
+
+        await communicator.disconnect()
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.asyncio
+    async def test_chunked_upload_unknown_upload(self):
+        """
+        Check if resuming an unknown upload sends an error.
+        """
+        # Given
+        communicator = await self.init_ws_communication()
+
+        # Acts
+        await communicator.send_to(text_data=json.dumps({
+            'action': 'resume',
+            'upload_id': 'not-an-upload'
+        }))
+        response = await self.receive_typed_message(communicator)
+
+        # Asserts
+        self.assertEqual(response, {
+            'status': 'error',
+            'type': 'end',
+            'message': 'Unknown upload not-an-upload!'
+        })
+
+        await communicator.disconnect()
+
+    def test_chunked_upload_incomplete_commit(self):
+        """
+        Check if committing an upload with missing chunks sends an error
+        and keeps the upload incomplete.
+        """
+        # Given
+        sample_data = create_sample_snapshot_data(packages_count=30)
+        header, chunks = self.split_snapshot_data(sample_data, chunk_size=10)
+        test_object = BackupImportConsumer()
+
+        # Acts
+        with patch.object(test_object, 'send') as send, patch.object(test_object, 'close'):
+            test_object.receive(text_data=json.dumps(header))
+            upload_id = json.loads(send.call_args.args[0])['upload_id']
+            for frame in (chunks[0], {'action': 'commit', 'chunks': len(chunks)}):
+                test_object.receive(text_data=json.dumps({**frame, 'upload_id': upload_id}))
+
+        # Asserts
+        self.assertEqual(json.loads(send.call_args.args[0]), {
+            'status': 'error',
+            'type': 'end',
+            'message': f"The upload {upload_id} is incomplete : 1 of 3 chunks received!"
+        })
+        self.assertFalse(Snapshot.objects.get().is_complete)
+
+    def test_chunked_upload_repeated_commit(self):
+        """
+        Check if a commit repeated after a resume is answered without storing
+        the versions again.
+        """
+        # Given
+        sample_data = create_sample_snapshot_data(packages_count=30)
+        header, chunks = self.split_snapshot_data(sample_data, chunk_size=10)
+        test_object = BackupImportConsumer()
+
+        # Acts
+        with patch.object(test_object, 'send') as send, patch.object(test_object, 'close'):
+            test_object.receive(text_data=json.dumps(header))
+            upload_id = json.loads(send.call_args.args[0])['upload_id']
+            for frame in (*chunks, {'action': 'commit', 'chunks': len(chunks)},
+                          {'action': 'resume'}, {'action': 'commit', 'chunks': len(chunks)}):
+                test_object.receive(text_data=json.dumps({**frame, 'upload_id': upload_id}))
+
+        # Asserts
+        self.assertEqual(json.loads(send.call_args.args[0]), {
+            'status': 'info',
+            'type': 'end',
+            'message': 'End of data added!'
+        })
+        snapshot = Snapshot.objects.get()
+        self.assertTrue(snapshot.is_complete)
+        self.assertIsNone(snapshot.shared_snapshot_id)
+        self.assertEqual(len(snapshot.get_version_ids()), 30)
+
+    def test_chunked_upload_malformed_chunk(self):
+        """
+        Check if a malformed chunk sends an error frame instead of failing.
+        """
+        # Given
+        sample_data = create_sample_snapshot_data(packages_count=10)
+        header, _ = self.split_snapshot_data(sample_data, chunk_size=10)
+        test_object = BackupImportConsumer()
+
+        # Acts
+        with patch.object(test_object, 'send') as send, patch.object(test_object, 'close'):
+            test_object.receive(text_data=json.dumps(header))
+            upload_id = json.loads(send.call_args.args[0])['upload_id']
+            test_object.receive(text_data=json.dumps({
+                'action': 'chunk', 'upload_id': upload_id, 'library': 'first_type'
+            }))
+            test_object.receive(text_data=json.dumps({'action': 'commit'}))
+            op_result = [json.loads(call.args[0]) for call in send.call_args_list[-2:]]
+
+        # Asserts
+        self.assertEqual(op_result, [
+            {'status': 'error', 'type': 'end',
+             'message': "The chunk index or library is missing."},
+            {'status': 'error', 'type': 'end', 'message': "The upload ID is missing."}
+        ])
+
+    def test_purge_stale_uploads(self):
+        """
+        Check if the uploads never committed are deleted once stale.
+        """
+        # Given
+        sample_data = create_sample_snapshot_data(packages_count=10)
+        header, chunks = self.split_snapshot_data(sample_data, chunk_size=10)
+        test_object = BackupImportConsumer()
+        with patch.object(test_object, 'send') as send, patch.object(test_object, 'close'):
+            test_object.receive(text_data=json.dumps(sample_data))
+            test_object.receive(text_data=json.dumps(header))
+            upload_id = json.loads(send.call_args.args[0])['upload_id']
+            test_object.receive(text_data=json.dumps({**chunks[0], 'upload_id': upload_id}))
+        Snapshot.objects.update(save_date="2020-01-01")
+        output = StringIO()
+
+        # Acts
+        call_command("purge_stale_uploads", days=2, stdout=output)
+
+        # Asserts
+        self.assertIn("1 stale uploads deleted", output.getvalue())
+        self.assertTrue(Snapshot.objects.get().is_complete)
+
+
+class TestBinaryPayloads(SimpleTestCase):
+    """
+    Compressed binary frames unit test class
+    """
+
+    databases = '__all__'
+
+    def tearDown(self):
+        Snapshot.objects.all().delete()
+        Device.objects.all().delete()
+        ChosenVersion.objects.all().delete()
+        Package.objects.all().delete()
+        Repository.objects.all().delete()
+
+        return super().tearDown()
+
+    @staticmethod
+    def receive_frames(frames: List[dict]) -> List[dict]:
+        """ Sends frames to the websocket consumer without any client.
+        Returns the messages sent back by the consumer.
+
+        :type frames: List[dict]
+        :param frames: Frames sent by the client (``text_data`` or ``bytes_data``)
+
+        :rtype: List[dict]
+        """
+        test_object = BackupImportConsumer()
+        with patch.object(test_object, 'send') as send, patch.object(test_object, 'close'):
+            for frame in frames:
+                test_object.receive(**frame)
+        return [json.loads(call.args[0]) for call in send.call_args_list]
+
+    def test_receive_gzip_json_frame(self):
+        """
+        Check if a gzip compressed JSON frame is imported without any negotiation.
+        """
+        # Given
+        sample_data = create_sample_snapshot_data(packages_count=20)
+
+        # Acts
+        messages = self.receive_frames([{'bytes_data': encode_payload(sample_data)}])
+
+        # Asserts
+        self.assertEqual(messages[-1]['type'], 'end')
+        self.assertEqual(messages[-1]['status'], 'info')
+        self.assertEqual(Snapshot.objects.get().versions.count(), 20)
+
+    def test_receive_negotiated_frame(self):
+        """
+        Check if the binary frames are decoded with the negotiated encoding.
+        """
+        # Given
+        sample_data = create_sample_snapshot_data(packages_count=20)
+
+        # Acts
+        messages = self.receive_frames([
+            {'text_data': json.dumps({
+                'action': 'negotiate',
+                'encodings': ['msgpack+brotli', 'msgpack+gzip']
+            })},
+            {'bytes_data': encode_payload(sample_data, 'msgpack+gzip')}
+        ])
+
+        # Asserts
+        self.assertEqual(messages[0], {
+            'status': 'info',
+            'type': 'encoding',
+            'encoding': 'msgpack+gzip'
+        })
+        self.assertEqual(messages[-1]['type'], 'end')
+        self.assertEqual(messages[-1]['status'], 'info')
+        self.assertEqual(Snapshot.objects.get().versions.count(), 20)
+
+    def test_receive_corrupted_frame(self):
+        """
+        Check if a corrupted binary frame sends an error without importing anything.
+        """
+        # Acts
+        messages = self.receive_frames([{'bytes_data': b'not compressed'}])
+
+        # Asserts
+        self.assertEqual(messages, [{
+            'status': 'error',
+            'type': 'end',
+            'message': 'Invalid gzip payload!'
+        }])
+        self.assertFalse(Snapshot.objects.exists())
+
+    def test_negotiate_unsupported_encodings(self):
+        """
+        Check if the negotiation sends an error if no encoding is supported.
+        """
+        # Acts
+        messages = self.receive_frames([{'text_data': json.dumps({
+            'action': 'negotiate',
+            'encodings': ['xml+brotli']
+        })}])
+
+        # Asserts
+        self.assertEqual(messages[0]['status'], 'error')
+        self.assertEqual(messages[0]['type'], 'end')
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.asyncio
+    async def test_async_receive_gzip_json_frame(self):
+        """
+        Check if the asynchronous consumer imports compressed binary frames.
+        """
+        # Given
+        sample_data = create_sample_snapshot_data(packages_count=20)
+        communicator = WebsocketCommunicator(
+            AsyncBackupImportConsumer.as_asgi(),
+            "/backup/import/async"
+        )
+        await communicator.connect()
+        await communicator.receive_from()
+
+        # Acts
+        await communicator.send_to(bytes_data=encode_payload(sample_data))
+        events = []
+        await TestAsyncConsumers.receive_until_end(0, communicator, events)
+
+        # Asserts
+        self.assertEqual(events[-1][1]['type'], 'end')
+        self.assertEqual(events[-1][1]['status'], 'info')
+        snapshot = await Snapshot.objects.aget()
+        self.assertEqual(await snapshot.versions.acount(), 20)
+
+        await communicator.disconnect()
+
+
+class TestSnapshotDeduplication(SimpleTestCase):
+    """
+    Identical snapshots deduplication unit test class
+    """
+
+    databases = '__all__'
+
+    def tearDown(self):
+        Snapshot.objects.all().delete()
+        Device.objects.all().delete()
+        ChosenVersion.objects.all().delete()
+        Package.objects.all().delete()
+        Repository.objects.all().delete()
+
+        return super().tearDown()
+
+    @staticmethod
+    def receive_frames(frames: List[dict]) -> List[dict]:
+        """ Sends JSON frames to the websocket consumer without any client.
+        Returns the messages sent back by the consumer.
+
+        :type frames: List[dict]
+        :param frames: Frames sent by the client
+
+        :rtype: List[dict]
+        """
+        test_object = BackupImportConsumer()
+        with patch.object(test_object, 'send') as send, patch.object(test_object, 'close'):
+            for frame in frames:
+                test_object.receive(text_data=json.dumps(frame))
+        return [json.loads(call.args[0]) for call in send.call_args_list]
+
+    def test_identical_snapshot_shares_content(self):
+        """
+        Check if an identical snapshot of the device shares the rows of the previous one.
+        """
+        # Given
+        sample_data = create_sample_snapshot_data(packages_count=30)
+        sample_data['repositories'] = [{'name': 'My repo', 'lines': ''}]
+        self.receive_frames([sample_data])
+        through_rows = Snapshot.versions.through.objects.count()
+
+        # Acts
+        messages = self.receive_frames([sample_data])
+
+        # Asserts
+        first_snapshot, second_snapshot = Snapshot.objects.order_by('id')
+        self.assertEqual(second_snapshot.shared_snapshot, first_snapshot)
+        self.assertEqual(second_snapshot.content_hash, first_snapshot.content_hash)
+        self.assertEqual(Snapshot.versions.through.objects.count(), through_rows)
+        self.assertEqual(second_snapshot.get_versions().count(), 30)
+        self.assertEqual(list(second_snapshot.get_repositories()),
+                         list(first_snapshot.repositories.all()))
+        self.assertNotIn('progress_bar', [message['type'] for message in messages])
+        self.assertEqual(messages[-1]['type'], 'end')
+
+    def test_delete_shared_content_owner(self):
+        """
+        Check if the snapshots sharing the rows of a deleted snapshot keep their content,
+        then if every snapshot can be deleted at once.
+        """
+        # Given
+        sample_data = create_sample_snapshot_data(packages_count=30)
+        sample_data['repositories'] = [{'name': 'My repo', 'lines': ''}]
+        self.receive_frames([sample_data, sample_data, sample_data])
+        owner, first_sharer, second_sharer = Snapshot.objects.order_by('id')
+
+        # Acts
+        owner.delete()
+
+        # Asserts
+        first_sharer.refresh_from_db()
+        second_sharer.refresh_from_db()
+        self.assertIsNone(first_sharer.shared_snapshot)
+        self.assertEqual(second_sharer.shared_snapshot, first_sharer)
+        self.assertEqual(first_sharer.versions.count(), 30)
+        self.assertEqual(first_sharer.repositories.count(), 1)
+        self.assertEqual(second_sharer.get_versions().count(), 30)
+        Snapshot.objects.all().delete()
+        self.assertFalse(Snapshot.versions.through.objects.exists())
+
+    def test_different_snapshot_is_not_shared(self):
+        """
+        Check if a snapshot with another package version creates its own rows.
+        """
+        # Given
+        self.receive_frames([create_sample_snapshot_data(packages_count=30)])
+
+        # Acts
+        self.receive_frames([create_sample_snapshot_data(packages_count=30, version="2.0")])
+
+        # Asserts
+        snapshot = Snapshot.objects.latest('id')
+        self.assertIsNone(snapshot.shared_snapshot)
+        self.assertEqual(snapshot.versions.count(), 30)
+
+    def test_shared_snapshot_references_the_owner(self):
+        """
+        Check if every identical snapshot references the snapshot owning the rows.
+        """
+        # Given
+        sample_data = create_sample_snapshot_data(packages_count=5)
+
+        # Acts
+        for _ in range(3):
+            self.receive_frames([sample_data])
+
+        # Asserts
+        owner, *shared_snapshots = Snapshot.objects.order_by('id')
+        self.assertEqual(
+            [snapshot.shared_snapshot_id for snapshot in shared_snapshots],
+            [owner.id, owner.id]
+        )
+
+    def test_committed_upload_shares_content(self):
+        """
+        Check if a chunked upload identical to a previous snapshot drops its rows once committed.
+        """
+        # Given
+        sample_data = create_sample_snapshot_data(packages_count=10)
+        self.receive_frames([sample_data])
+        header = {key: value for key, value in sample_data.items() if key != 'libraries'}
+        test_object = BackupImportConsumer()
+
+        # Acts
+        with patch.object(test_object, 'send') as send, patch.object(test_object, 'close'):
+            test_object.receive(text_data=json.dumps({**header, 'action': 'header'}))
+            upload_id = json.loads(send.call_args.args[0])['upload_id']
+            for frame in (
+                {'action': 'chunk', 'index': 0, 'library': 'first_type',
+                 'packages': sample_data['libraries']['first_type']},
+                {'action': 'commit', 'chunks': 1}
+            ):
+                test_object.receive(text_data=json.dumps({**frame, 'upload_id': upload_id}))
+
+        # Asserts
+        owner, snapshot = Snapshot.objects.order_by('id')
+        self.assertTrue(snapshot.is_complete)
+        self.assertEqual(snapshot.shared_snapshot, owner)
+        self.assertEqual(snapshot.versions.count(), 0)
+        self.assertEqual(snapshot.get_versions().count(), 10)
+
+
+@override_settings(BACKUP_IMPORT={
+    **settings.BACKUP_IMPORT,
+    'STORAGE_MODE': 'delta',
+    'CHECKPOINT_INTERVAL': 3
+})
+class TestDeltaStorage(SimpleTestCase):
+    """
+    Delta snapshot storage unit test class
+    """
+
+    databases = '__all__'
+
+    def tearDown(self):
+        Snapshot.objects.all().delete()
+        Device.objects.all().delete()
+        ChosenVersion.objects.all().delete()
+        Package.objects.all().delete()
+        Repository.objects.all().delete()
+
+        return super().tearDown()
+
+    @staticmethod
+    def receive_snapshot(sample_data: dict) -> Snapshot:
+        """ Imports a snapshot with the websocket consumer (without any client)
+
+        :type sample_data: dict
+        :param sample_data: Snapshot data sent by the client
+
+        :rtype: Snapshot
+        """
+        test_object = BackupImportConsumer()
+        with patch.object(test_object, 'send'), patch.object(test_object, 'close'):
+            test_object.receive(text_data=json.dumps(sample_data))
+        return Snapshot.objects.latest('id')
+
+    @staticmethod
+    def upgrade_packages(sample_data: dict, indexes: List[int], version: str) -> dict:
+        """ Returns a copy of the snapshot data with some packages upgraded
+
+        :type sample_data: dict
+        :param sample_data: Snapshot data sent by the client
+
+        :type indexes: List[int]
+        :param indexes: Indexes of the upgraded packages
+
+        :type version: str
+        :param version: New version of the packages
+
+        :rtype: dict
+        """
+        upgraded_data = copy.deepcopy(sample_data)
+        for index in indexes:
+            upgraded_data['libraries']['first_type'][str(index)]['Version'] = version
+        return upgraded_data
+
+    @staticmethod
+    def get_packages(snapshot: Snapshot) -> List[Tuple[str, str]]:
+        """ Returns the sorted packages names and versions of a snapshot
+
+        :type snapshot: Snapshot
+        :param snapshot: Snapshot object
+
+        :rtype: List[Tuple[str, str]]
+        """
+        return sorted(snapshot.get_versions().values_list('package__name', 'chosen_version'))
+
+    def test_delta_snapshot_stores_changes(self):
+        """
+        Check if a snapshot only stores the versions changed since the previous snapshot.
+        """
+        # Given
+        sample_data = create_sample_snapshot_data(packages_count=30)
+        parent = self.receive_snapshot(sample_data)
+        upgraded_data = self.upgrade_packages(sample_data, [0, 1], "2.0")
+        del upgraded_data['libraries']['first_type']['29']
+
+        # Acts
+        snapshot = self.receive_snapshot(upgraded_data)
+
+        # Asserts
+        self.assertEqual(parent.storage_mode, 'full')
+        self.assertEqual(snapshot.storage_mode, 'delta')
+        self.assertEqual(snapshot.parent, parent)
+        self.assertEqual(snapshot.versions.count(), 0)
+        self.assertEqual(snapshot.added_versions.count(), 2)
+        self.assertEqual(snapshot.removed_versions.count(), 3)
+        self.assertEqual(self.get_packages(snapshot), sorted(
+            (data['Package'], data['Version'])
+            for data in upgraded_data['libraries']['first_type'].values()
+        ))
+
+    def test_committed_upload_stores_delta(self):
+        """
+        Check if a committed chunked upload stores its versions as a delta.
+        """
+        # Given
+        sample_data = create_sample_snapshot_data(packages_count=20)
+        parent = self.receive_snapshot(sample_data)
+        upgraded_data = self.upgrade_packages(sample_data, [0], "2.0")
+        header, chunks = TestChunkedUpload.split_snapshot_data(upgraded_data, chunk_size=10)
+        test_object = BackupImportConsumer()
+
+        # Acts
+        with patch.object(test_object, 'send') as send, patch.object(test_object, 'close'):
+            test_object.receive(text_data=json.dumps(header))
+            upload_id = json.loads(send.call_args.args[0])['upload_id']
+            for frame in chunks + [{'action': 'commit', 'chunks': len(chunks)}]:
+                test_object.receive(text_data=json.dumps({**frame, 'upload_id': upload_id}))
+
+        # Asserts
+        snapshot = Snapshot.objects.get(upload_id=upload_id)
+        self.assertTrue(snapshot.is_complete)
+        self.assertEqual(snapshot.storage_mode, 'delta')
+        self.assertEqual(snapshot.parent, parent)
+        self.assertEqual(snapshot.versions.count(), 0)
+        self.assertEqual(snapshot.added_versions.count(), 1)
+        self.assertEqual(self.get_packages(snapshot), sorted(
+            (data['Package'], data['Version'])
+            for data in upgraded_data['libraries']['first_type'].values()
+        ))
+
+    def test_delta_chain_checkpoint(self):
+        """
+        Check if a full checkpoint is stored once the deltas chain reaches the interval,
+        and if every snapshot of the chain is rebuilt.
+        """
+        # Given
+        sample_data = create_sample_snapshot_data(packages_count=10)
+        snapshots_data = [sample_data] + [
+            self.upgrade_packages(sample_data, range(index + 1), f"{index + 2}.0")
+            for index in range(4)
+        ]
+
+        # Acts
+        snapshots = [self.receive_snapshot(data) for data in snapshots_data]
+
+        # Asserts
+        self.assertEqual(
+            [snapshot.storage_mode for snapshot in snapshots],
+            ['full', 'delta', 'delta', 'full', 'delta']
+        )
+        self.assertEqual([snapshot.chain_length for snapshot in snapshots], [0, 1, 2, 0, 1])
+        for snapshot, data in zip(snapshots, snapshots_data):
+            self.assertEqual(self.get_packages(snapshot), sorted(
+                (package['Package'], package['Version'])
+                for package in data['libraries']['first_type'].values()
+            ))
+
+    def test_identical_delta_snapshot_is_shared(self):
+        """
+        Check if a snapshot identical to a delta snapshot shares its rebuilt content.
+        """
+        # Given
+        sample_data = create_sample_snapshot_data(packages_count=10)
+        upgraded_data = self.upgrade_packages(sample_data, [0], "2.0")
+        self.receive_snapshot(sample_data)
+        delta_snapshot = self.receive_snapshot(upgraded_data)
+
+        # Acts
+        snapshot = self.receive_snapshot(upgraded_data)
+
+        # Asserts
+        self.assertEqual(snapshot.shared_snapshot, delta_snapshot)
+        self.assertEqual(self.get_packages(snapshot), self.get_packages(delta_snapshot))
+
+    def test_delete_delta_parent(self):
+        """
+        Check if the delta children of a deleted snapshot store every version beforehand,
+        and if the rest of the chain is still rebuilt.
+        """
+        # Given
+        sample_data = create_sample_snapshot_data(packages_count=10)
+        snapshots_data = [sample_data] + [
+            self.upgrade_packages(sample_data, range(index + 1), f"{index + 2}.0")
+            for index in range(2)
+        ]
+        parent, child, grandchild = [self.receive_snapshot(data) for data in snapshots_data]
+
+        # Acts
+        parent.delete()
+
+        # Asserts
+        child.refresh_from_db()
+        grandchild.refresh_from_db()
+        self.assertEqual(child.storage_mode, 'full')
+        self.assertIsNone(child.parent)
+        self.assertEqual(child.added_versions.count(), 0)
+        self.assertEqual(grandchild.parent, child)
+        for snapshot, data in zip((child, grandchild), snapshots_data[1:]):
+            self.assertEqual(self.get_packages(snapshot), sorted(
+                (package['Package'], package['Version'])
+                for package in data['libraries']['first_type'].values()
+            ))
+
+
+class TestAtomicImport(SimpleTestCase):
+    """
+    Transactional snapshot import unit test class
+    """
+
+    databases = '__all__'
+
+    def tearDown(self):
+        Snapshot.objects.all().delete()
+        Device.objects.all().delete()
+        ChosenVersion.objects.all().delete()
+        Package.objects.all().delete()
+        Repository.objects.all().delete()
+
+        return super().tearDown()
+
+    @staticmethod
+    def receive_with_captured_queries(sample_data: dict) -> Tuple[List[dict], List[dict]]:
+        """ Runs the ``receive`` function of the websocket consumer without any client.
+        Returns the messages sent back by the consumer alongside the SQL queries performed.
+
+        :type sample_data: dict
+        :param sample_data: Snapshot data sent by the client
+
+        :rtype: (List[dict], List[dict])
+        """
+        test_object = BackupImportConsumer()
+        with patch.object(test_object, 'send') as send, patch.object(test_object, 'close'),\
+                CaptureQueriesContext(connection) as context:
+            test_object.receive(text_data=json.dumps(sample_data))
+        return [json.loads(call.args[0]) for call in send.call_args_list], \
+            context.captured_queries
+
+    @staticmethod
+    def count_commits(queries: List[dict]) -> int:
+        """ Counts the committed transactions
+
+        :type queries: List[dict]
+        :param queries: Captured SQL queries
+
+        :rtype: int
+        """
+        return len([query for query in queries if query['sql'] == 'COMMIT'])
+
+    def test_import_single_transaction(self):
+        """
+        Check if the whole import is committed once.
+        """
+        # Given
+        sample_data = create_sample_snapshot_data(packages_count=300)
+        sample_data['repositories'] = [{'name': 'My repo', 'lines': ''}]
+
+        # Acts
+        messages, queries = self.receive_with_captured_queries(sample_data)
+
+        # Asserts
+        self.assertEqual(self.count_commits(queries), 1)
+        self.assertEqual(messages[-1]['type'], 'end')
+        self.assertEqual(Snapshot.objects.get().versions.count(), 300)
+
+    def test_import_failure_rolls_back(self):
+        """
+        Check if a failed import leaves nothing behind and sends a structured error frame.
+        """
+        # Given
+        sample_data = create_sample_snapshot_data(packages_count=30)
+        sample_data['repositories'] = [{'name': 'My repo', 'lines': ''}]
+        DEVICE_CACHE.set('my-fingerprint', {'id': 1})
+
+        # Acts
+        with patch.object(Snapshot, 'link_repositories', side_effect=DatabaseError("Disk full")),\
+                self.assertLogs(level='ERROR'):
+            messages, _ = self.receive_with_captured_queries(sample_data)
+
+        # Asserts
+        self.assertEqual(messages[-1]['status'], 'error')
+        self.assertEqual(messages[-1]['type'], 'end')
+        self.assertEqual(messages[-1]['error'], {
+            'code': 'database_error',
+            'exception': 'DatabaseError',
+            'retryable': True
+        })
+        for model in (Snapshot, Device, Package, ChosenVersion, Repository):
+            self.assertFalse(model.objects.exists())
+        self.assertEqual(len(DEVICE_CACHE), 0)
+
+    def test_import_malformed_data(self):
+        """
+        Check if malformed frames are answered with the same error frames
+        as the queued imports, without importing anything.
+        """
+        # Given
+        sample_data = create_sample_snapshot_data(packages_count=3)
+        del sample_data['specs']['cores']
+        test_object = BackupImportConsumer()
+
+        # Acts
+        with patch.object(test_object, 'send') as send, patch.object(test_object, 'close'):
+            for text_data in (json.dumps(sample_data), '{"hostname": ', '[]'):
+                test_object.receive(text_data=text_data)
+            op_result = [json.loads(call.args[0]) for call in send.call_args_list]
+
+        # Asserts
+        self.assertEqual(op_result, [
+            {'status': 'error', 'type': 'end',
+             'message': "The device specification 'cores' is missing."},
+            {'status': 'error', 'type': 'end', 'message': "Invalid JSON frame!"},
+            {'status': 'error', 'type': 'end', 'message': "The frame must be an object."}
+        ])
+        self.assertFalse(Device.objects.exists())
+
+    def test_import_retry_after_failure(self):
+        """
+        Check if a snapshot can be sent again once its import has failed.
+        """
+        # Given
+        sample_data = create_sample_snapshot_data(packages_count=30)
+        with patch.object(Snapshot, 'store_versions', side_effect=DatabaseError("Disk full")),\
+                self.assertLogs(level='ERROR'):
+            self.receive_with_captured_queries(sample_data)
+
+        # Acts
+        messages, _ = self.receive_with_captured_queries(sample_data)
+
+        # Asserts
+        self.assertEqual(messages[-1]['message'], 'End of data added!')
+        self.assertEqual(Snapshot.objects.get().versions.count(), 30)
+        self.assertEqual(Device.objects.count(), 1)
+
+    @override_settings(BACKUP_IMPORT={
+        **settings.BACKUP_IMPORT,
+        'ATOMIC_MAX_PACKAGES': 100,
+        'INGESTION_BACKEND': 'orm'
+    })
+    def test_batched_import_failure(self):
+        """
+        Check if a large snapshot commits its packages by batches, and if a failure
+        does not leave any snapshot behind.
+        """
+        # Given
+        sample_data = create_sample_snapshot_data(packages_count=2500)
+
+        # Acts
+        with patch.object(Snapshot, 'store_versions', side_effect=DatabaseError("Disk full")),\
+                self.assertLogs(level='ERROR'):
+            messages, queries = self.receive_with_captured_queries(sample_data)
+
+        # Asserts
+        self.assertEqual(messages[-1]['status'], 'error')
+        self.assertGreaterEqual(self.count_commits(queries), 3)
+        self.assertFalse(Snapshot.objects.exists())
+        self.assertEqual(ChosenVersion.objects.count(), 2500)
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.asyncio
+    async def test_async_import_failure(self):
+        """
+        Check if the asynchronous consumer rolls back the snapshot rows and sends
+        a structured error frame.
+        """
+        # Given
+        sample_data = create_sample_snapshot_data(packages_count=30)
+        sample_data['repositories'] = [{'name': 'My repo', 'lines': ''}]
+        communicator = WebsocketCommunicator(
+            AsyncBackupImportConsumer.as_asgi(),
+            "/backup/import/async"
+        )
+        await communicator.connect()
+        await communicator.receive_from()
+
+        # Acts
+        with patch.object(Snapshot, 'link_repositories', side_effect=DatabaseError("Disk full")),\
+                self.assertLogs(level='ERROR'):
+            await communicator.send_to(text_data=json.dumps(sample_data))
+            events = []
+            await TestAsyncConsumers.receive_until_end(0, communicator, events)
+
+        # Asserts
+        self.assertEqual(events[-1][1]['status'], 'error')
+        self.assertTrue(events[-1][1]['error']['retryable'])
+        self.assertFalse(await Snapshot.objects.aexists())
+
+        await communicator.disconnect()
@@ -0,0 +1,117 @@
+import unittest
+
+from django.conf import settings
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+
+from data.ingestion import copy_enabled, format_copy_rows
+from data.models import ChosenVersion, Device, Package, Snapshot
+from tools.versions import version_key
+
+from apps_tests.test_data.utils import create_test_device
+
+
+class TestCopyFormat(SimpleTestCase):
+    """
+    ``COPY`` text format unit test class
+    """
+
+    def test_format_copy_rows(self):
+        """
+        Check if the special characters are escaped, ``None`` is written as ``NULL``
+        and ``bytes`` as hex ``bytea``.
+        """
+        # Given
+        rows = [
+            (0, "my_package", "1.0"),
+            (1, "tab\tand\\backslash", None),
+            (2, "new\nline\r", b"\x01\xff")
+        ]
+
+        # Acts
+        op_result = format_copy_rows(rows).read()
+
+        # Asserts
+        self.assertEqual(
+            op_result,
+            "0\tmy_package\t1.0\n"
+            "1\ttab\\tand\\\\backslash\t\\N\n"
+            "2\tnew\\nline\\r\t\\\\x01ff\n"
+        )
+
+    @override_settings(BACKUP_IMPORT={**settings.BACKUP_IMPORT, 'INGESTION_BACKEND': 'orm'})
+    def test_copy_disabled_by_default(self):
+        """
+        Check if the ORM is used unless the copy backend is set.
+        """
+        # Acts & Asserts
+        self.assertFalse(copy_enabled())
+
+
+@override_settings(BACKUP_IMPORT={**settings.BACKUP_IMPORT, 'INGESTION_BACKEND': 'copy'})
+class TestCopyIngestion(SimpleTestCase):
+    """
+    Postgres ``COPY`` ingestion unit test class (the ORM is used by the other databases)
+    """
+
+    databases = '__all__'
+
+    def tearDown(self):
+        Snapshot.objects.all().delete()
+        Device.objects.all().delete()
+        ChosenVersion.objects.all().delete()
+        Package.objects.all().delete()
+
+        return super().tearDown()
+
+    def test_copy_fallback(self):
+        """
+        Check if the copy backend is only used on Postgres.
+        """
+        # Acts & Asserts
+        self.assertEqual(copy_enabled(), connection.vendor == 'postgresql')
+
+    def test_resolve_library(self):
+        """
+        Check if the chosen versions are resolved in order, only the missing ones being inserted.
+        """
+        # Given
+        libraries = [(f"my_package_{index}", "1.0") for index in range(50)]
+        known_ids = ChosenVersion.resolve_library(libraries[:10], "apt")
+
+        # Acts
+        op_result = ChosenVersion.resolve_library(
+            libraries + [("my_package_0", "2.0"), ("my_package_0", "1.0")], "apt")
+
+        # Asserts
+        self.assertEqual(op_result[:10], known_ids)
+        self.assertEqual(op_result[-1], op_result[0])
+        self.assertEqual(
+            [str(version) for version in ChosenVersion.objects.filter(id__in=op_result[49:51])
+             .order_by('chosen_version', 'package__name')],
+            ["my_package_49 - 1.0", "my_package_0 - 2.0"]
+        )
+        self.assertEqual(Package.objects.count(), 50)
+        self.assertEqual(ChosenVersion.objects.count(), 51)
+        self.assertEqual(
+            {bytes(key) for key in ChosenVersion.objects.values_list('version_key', flat=True)},
+            {version_key("1.0"), version_key("2.0")}
+        )
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', "COPY is only available on Postgres")
+    def test_link_versions(self):
+        """
+        Check if the links are copied, already set links being ignored.
+        """
+        # Given
+        version_ids = ChosenVersion.resolve_library(
+            [(f"my_package_{index}", "1.0") for index in range(20)], "apt")
+        snapshot = Snapshot.objects.create(
+            related_device=create_test_device(name="Mon objet!"), save_date="2020-01-01")
+        snapshot.link_versions(version_ids[:5])
+
+        # Acts
+        snapshot.link_versions(version_ids + version_ids[:3])
+
+        # Asserts
+        self.assertEqual(snapshot.versions.count(), 20)
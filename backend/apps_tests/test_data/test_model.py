@@ -1,10 +1,19 @@
+from django.conf import settings
+from django.db import connection, transaction
 from django.utils import timezone
 
 from django.test import SimpleTestCase
-from data.models import (ChosenVersion, Command, CommandHistory,
-                         Device, Package, Repository, Snapshot, Shell)
+from django.test.utils import CaptureQueriesContext, override_settings
+from data.models import (DEVICE_CACHE, PACKAGE_CACHE, VERSION_CACHE, ChosenVersion, Command,
+                         CommandHistory, Device, DeviceLatestVersion, Package, Repository,
+                         Snapshot, Shell)
 
-from apps_tests.test_data.utils import create_test_package, create_test_device
+from apps_tests.test_data.schemas.utils import create_large_snapshot
+from apps_tests.test_data.utils import (
+    create_test_chosen_version,
+    create_test_device,
+    create_test_package
+)
 
 
 class TestChosenVersion(SimpleTestCase):
@@ -40,6 +49,68 @@ class TestChosenVersion(SimpleTestCase):
         # Asserts
         self.assertEqual(op_result, expected_result)
 
+    @override_settings(BACKUP_IMPORT={**settings.BACKUP_IMPORT, 'INGESTION_BACKEND': 'orm'})
+    def test_resolve_library_interned(self):
+        """
+        Check if already resolved versions are served by the interning cache,
+        and if only the new version of a known package is looked up.
+        """
+        # Given
+        ChosenVersion.resolve_library([("curl", "1.0"), ("vim", "9.0")], "apt")
+        hits = VERSION_CACHE.hits
+
+        # Acts
+        with CaptureQueriesContext(connection) as cached_context:
+            cached_ids = ChosenVersion.resolve_library([("curl", "1.0"), ("vim", "9.0")], "apt")
+        with CaptureQueriesContext(connection) as new_version_context:
+            ChosenVersion.resolve_library([("curl", "1.0"), ("curl", "2.0")], "apt")
+
+        # Asserts
+        self.assertEqual(cached_ids, [
+            ChosenVersion.objects.get(package__name=name, chosen_version=version).id
+            for name, version in [("curl", "1.0"), ("vim", "9.0")]
+        ])
+        self.assertEqual(len(cached_context.captured_queries), 0)
+        self.assertEqual(VERSION_CACHE.hits, hits + 3)
+        self.assertFalse([
+            query for query in new_version_context.captured_queries
+            if 'data_package' in query['sql']
+        ])
+        self.assertEqual(ChosenVersion.objects.count(), 3)
+
+    def test_resolve_library_rollback(self):
+        """
+        Check if the rows inserted by a rolled back transaction are not interned.
+        """
+        # Given
+        libraries = [("curl", "1.0")]
+
+        # Acts
+        with transaction.atomic():
+            ChosenVersion.resolve_library(libraries, "apt")
+            transaction.set_rollback(True)
+
+        # Asserts
+        self.assertEqual(ChosenVersion.cached_ids(libraries, "apt"), {})
+        self.assertIsNone(PACKAGE_CACHE.get(("curl", "apt")))
+        self.assertEqual(Package.objects.count(), 0)
+
+    def test_delete_uncaches(self):
+        """
+        Check if the deleted packages and chosen versions are removed from the interning cache.
+        """
+        # Given
+        version_id = ChosenVersion.resolve_library([("curl", "1.0")], "apt")[0]
+        package_id = ChosenVersion.objects.get(id=version_id).package_id
+
+        # Acts
+        ChosenVersion.objects.all().delete()
+        Package.objects.all().delete()
+
+        # Asserts
+        self.assertIsNone(VERSION_CACHE.get((package_id, "1.0")))
+        self.assertIsNone(PACKAGE_CACHE.get(("curl", "apt")))
+
 
 class TestDevice(SimpleTestCase):
     """Template model test class
@@ -48,6 +119,7 @@ class TestDevice(SimpleTestCase):
 
     def tearDown(self):
         Device.objects.all().delete()
+        DEVICE_CACHE.clear()
 
     def test_str(self):
         """
@@ -67,6 +139,111 @@ class TestDevice(SimpleTestCase):
         # Asserts
         self.assertEqual(op_result, expected_result)
 
+    def test_get_device_infos_fingerprint(self):
+        """
+        Check if the fingerprint is computed by the server if not sent by the client
+        (the client computes it the same way).
+        """
+        # Given
+        device_data = {
+            'hostname': 'my-computer',
+            'specs': {'cores': 1, 'virtual_memory': 16, 'processor': 'My processor'}
+        }
+        expected_fingerprint = "d423fb5186b9807c6fe6e9e6cee809878d0f0f2ae6e702f6eb3a0c5ae368ee0d"
+
+        # Acts
+        op_result = Device.get_device_infos(device_data)
+        sent_fingerprint = Device.get_device_infos({
+            **device_data, 'specs': {**device_data['specs'], 'fingerprint': 'sent'}
+        })['fingerprint']
+
+        # Asserts
+        self.assertEqual(op_result['fingerprint'], expected_fingerprint)
+        self.assertEqual(sent_fingerprint, 'sent')
+
+    def test_find_or_create_memory_change(self):
+        """
+        Check if a device is found by its fingerprint even if its memory size has changed.
+        """
+        # Given
+        device_infos = {
+            'name': 'my-computer', 'cores': 1, 'memory': 16, 'processor': 'My processor',
+            'fingerprint': Device.compute_fingerprint('my-computer', 'My processor', 1)
+        }
+        device, _ = Device.find_or_create(device_infos)
+        DEVICE_CACHE.clear()
+
+        # Acts
+        op_result, created = Device.find_or_create({**device_infos, 'memory': 15})
+
+        # Asserts
+        self.assertFalse(created)
+        self.assertEqual(op_result.id, device.id)
+        self.assertEqual(Device.objects.get().memory, 15)
+
+    def test_find_or_create_legacy_device(self):
+        """
+        Check if a device imported before the fingerprint is found and fingerprinted.
+        """
+        # Given
+        device = create_test_device(name="Mon objet!")
+        fingerprint = Device.compute_fingerprint(device.name, device.processor, device.cores)
+
+        # Acts
+        op_result, created = Device.find_or_create({
+            'name': device.name, 'cores': device.cores, 'memory': device.memory,
+            'processor': device.processor, 'fingerprint': fingerprint
+        })
+
+        # Asserts
+        self.assertFalse(created)
+        self.assertEqual(op_result.id, device.id)
+        self.assertEqual(Device.objects.get().fingerprint, fingerprint)
+
+    def test_find_or_create_cached_device(self):
+        """
+        Check if a repeated lookup is served by the cache, and if deleting the device
+        removes it from the cache.
+        """
+        # Given
+        device_infos = {
+            'name': 'my-computer', 'cores': 1, 'memory': 16, 'processor': 'My processor',
+            'fingerprint': 'my-fingerprint'
+        }
+        device, _ = Device.find_or_create(device_infos)
+
+        # Acts
+        with CaptureQueriesContext(connection) as context:
+            op_result, created = Device.find_or_create(device_infos)
+        Device.objects.all().delete()
+
+        # Asserts
+        self.assertFalse(created)
+        self.assertEqual(op_result.id, device.id)
+        self.assertEqual(len(context.captured_queries), 0)
+        self.assertIsNone(DEVICE_CACHE.get('my-fingerprint'))
+
+    def test_find_or_create_cached_device_memory_change(self):
+        """
+        Check if a memory change is stored even if the device is served by the cache.
+        """
+        # Given
+        device_infos = {
+            'name': 'my-computer', 'cores': 1, 'memory': 16, 'processor': 'My processor',
+            'fingerprint': 'my-fingerprint'
+        }
+        device, _ = Device.find_or_create(device_infos)
+
+        # Acts
+        op_result, created = Device.find_or_create({**device_infos, 'memory': 15})
+        cached_result, _ = Device.find_or_create({**device_infos, 'memory': 15})
+
+        # Asserts
+        self.assertFalse(created)
+        self.assertEqual(op_result.id, device.id)
+        self.assertEqual(Device.objects.get().memory, 15)
+        self.assertEqual(cached_result.memory, 15)
+
 
 class TestPackage(SimpleTestCase):
     """
@@ -132,6 +309,87 @@ class TestRepository(SimpleTestCase):
         # Asserts
         self.assertEqual(op_result, expected_op_result)
 
+    def test_compute_digest_normalization(self):
+        """
+        Check if whitespace and ordering variants of the sources.list lines share a digest
+        """
+        # Given
+        lines = "deb http://my.repo stable main\ndeb-src http://my.repo stable main"
+        variant_lines = "\n  deb-src http://my.repo   stable main \n\n" \
+            "deb\thttp://my.repo stable main\n"
+
+        # Acts
+        op_result = Repository.compute_digest("My repo", lines)
+
+        # Asserts
+        self.assertEqual(op_result, Repository.compute_digest(" My repo ", variant_lines))
+        self.assertNotEqual(op_result, Repository.compute_digest("My other repo", lines))
+        self.assertNotEqual(op_result, Repository.compute_digest("My repo", lines + " contrib"))
+
+    def test_resolve_all_collapses_variants(self):
+        """
+        Check if the variants of a repository are resolved to a single row
+        """
+        # Given
+        repositories = [
+            {'name': 'My repo', 'lines': 'deb http://my.repo stable main'},
+            {'name': 'My other repo', 'lines': ''},
+            {'name': 'My repo', 'lines': 'deb  http://my.repo stable main\n'}
+        ]
+
+        # Acts
+        op_result = Repository.resolve_all(repositories)
+
+        # Asserts
+        self.assertEqual(op_result[0], op_result[2])
+        self.assertNotEqual(op_result[0], op_result[1])
+        self.assertEqual(Repository.objects.count(), 2)
+        self.assertEqual(Repository.resolve_all(repositories[::-1]), op_result[::-1])
+
+    def test_resolve_all_queries_count(self):
+        """
+        Check if the repositories are resolved with a constant count of queries
+        """
+        # Given
+        repositories = [
+            {'name': f'My repo #{index}', 'lines': f'deb http://my.repo/{index} stable main'}
+            for index in range(300)
+        ]
+        Repository.resolve_all(repositories[:10])
+
+        # Acts
+        with CaptureQueriesContext(connection) as inserting:
+            Repository.resolve_all(repositories)
+        with CaptureQueriesContext(connection) as resolving:
+            op_result = Repository.resolve_all(repositories)
+
+        # Asserts
+        self.assertEqual(len([
+            query for query in inserting.captured_queries if 'data_repository' in query['sql']
+        ]), 4)
+        self.assertEqual(len(resolving.captured_queries), 1)
+        self.assertEqual(len(set(op_result)), 300)
+
+    def test_resolve_all_legacy_repository(self):
+        """
+        Check if a repository stored before the digest is found and digested
+        """
+        # Given
+        repository = Repository.objects.create(
+            name="My repo", sources_lines="deb http://my.repo stable main")
+
+        # Acts
+        op_result = Repository.resolve_all([
+            {'name': 'My repo', 'lines': 'deb http://my.repo  stable main'}
+        ])
+
+        # Asserts
+        self.assertEqual(op_result, [repository.id])
+        self.assertEqual(
+            Repository.objects.get().digest,
+            Repository.compute_digest("My repo", "deb http://my.repo stable main")
+        )
+
 
 class TestSave(SimpleTestCase):
     """
@@ -141,6 +399,8 @@ class TestSave(SimpleTestCase):
 
     def tearDown(self) -> None:
         Snapshot.objects.all().delete()
+        ChosenVersion.objects.all().delete()
+        Package.objects.all().delete()
         Device.objects.all().delete()
 
     def test_str(self):
@@ -164,6 +424,245 @@ class TestSave(SimpleTestCase):
         # Asserts
         self.assertEqual(op_result, expected_result)
 
+    def test_hash_libraries(self):
+        """
+        Check if the content hash ignores the packages order and changes with the versions
+        """
+        # Given
+        libraries = {
+            "first_type": {
+                "0": {"Package": "first_package", "Version": "1.0"},
+                "1": {"Package": "second_package", "Version": "2.0"}
+            }
+        }
+        shuffled_libraries = {
+            "first_type": {
+                "0": {"Package": "second_package", "Version": "2.0"},
+                "1": {"Package": "first_package", "Version": "1.0"}
+            }
+        }
+        updated_libraries = {
+            "first_type": {
+                "0": {"Package": "first_package", "Version": "1.1"},
+                "1": {"Package": "second_package", "Version": "2.0"}
+            }
+        }
+
+        # Acts
+        op_result = Snapshot.hash_libraries(libraries)
+
+        # Asserts
+        self.assertEqual(len(op_result), 64)
+        self.assertEqual(op_result, Snapshot.hash_libraries(shuffled_libraries))
+        self.assertNotEqual(op_result, Snapshot.hash_libraries(updated_libraries))
+
+    def test_hash_repositories(self):
+        """
+        Check if the repositories hash ignores the repositories order
+        """
+        # Given
+        repositories = [
+            {"name": "first_repository", "lines": ""},
+            {"name": "second_repository", "lines": "deb http://my.repo stable main"}
+        ]
+
+        # Acts
+        op_result = Snapshot.hash_repositories(repositories)
+
+        # Asserts
+        self.assertEqual(op_result, Snapshot.hash_repositories(repositories[::-1]))
+        self.assertNotEqual(op_result, Snapshot.hash_repositories(repositories[:1]))
+
+    def test_update_hashes_never_shares_itself(self):
+        """
+        Check if hashing a complete snapshot again keeps its rows, and only shares
+        the rows of another identical snapshot
+        """
+        # Given
+        device = create_test_device(name="Mon objet!")
+        package = create_test_package(name="curl", package_type="apt", pre_install_lines="")
+        version = create_test_chosen_version(package=package, chosen_version="1.0")
+        snapshot = Snapshot.objects.create(
+            related_device=device, save_date=timezone.now(), operating_system="My OS!")
+        snapshot.versions.add(version)
+        snapshot.update_hashes()
+
+        # Acts
+        snapshot.update_hashes()
+        identical = Snapshot.objects.create(
+            related_device=device, save_date=timezone.now(), operating_system="My OS!",
+            is_complete=False)
+        identical.versions.add(version)
+        identical.is_complete = True
+        identical.save()
+        identical.update_hashes()
+        snapshot.update_hashes()
+
+        # Asserts
+        snapshot.refresh_from_db()
+        self.assertIsNone(snapshot.shared_snapshot_id)
+        self.assertEqual(list(snapshot.versions.all()), [version])
+        self.assertEqual(Snapshot.objects.get(id=identical.id).shared_snapshot_id, snapshot.id)
+
+    def test_diff_compares_version_keys(self):
+        """
+        Check if the replaced versions are sorted into upgrades and downgrades
+        with the Debian version order
+        """
+        # Given
+        device = create_test_device(name="Mon objet!")
+        snapshots = []
+        for versions in (("1.9", "1.0", "2.0"), ("1.10", "1.0~rc1", "1:1.0")):
+            snapshot = Snapshot.objects.create(
+                related_device=device, save_date=timezone.now(), operating_system="My OS!")
+            snapshot.versions.add(*[
+                create_test_chosen_version(
+                    package=Package.objects.get_or_create(
+                        name=name, type="apt", defaults={'pre_install_lines': ""})[0],
+                    chosen_version=version)
+                for name, version in zip(("curl", "vim", "git"), versions)
+            ])
+            snapshots.append(snapshot)
+
+        # Acts
+        op_result = Snapshot.diff(*snapshots)
+
+        # Asserts
+        self.assertEqual(op_result['upgraded'], [("curl", "apt", "1.9", "1.10"),
+                                                 ("git", "apt", "2.0", "1:1.0")])
+        self.assertEqual(op_result['downgraded'], [("vim", "apt", "1.0", "1.0~rc1")])
+
+
+class TestDeviceLatestVersion(SimpleTestCase):
+    """
+    Device latest versions lookup table unit test class
+    """
+    databases = '__all__'
+
+    def tearDown(self) -> None:
+        Snapshot.objects.all().delete()
+        ChosenVersion.objects.all().delete()
+        Package.objects.all().delete()
+        Device.objects.all().delete()
+
+    def create_snapshot(self, device: Device, versions: list) -> Snapshot:
+        """ Creates a complete snapshot of a device, then refreshes its latest versions
+
+        :type device: Device
+        :param device: Related device
+
+        :type versions: list
+        :param versions: Chosen versions of the snapshot
+
+        :rtype: Snapshot
+        """
+        snapshot = Snapshot.objects.create(
+            related_device=device, save_date=timezone.now(), operating_system="My OS!")
+        snapshot.versions.add(*versions)
+        DeviceLatestVersion.refresh(device.id)
+        return snapshot
+
+    def test_refresh(self):
+        """
+        Check if only the changed versions rows are written once a new snapshot is imported
+        """
+        # Given
+        device = create_test_device(name="Mon objet!")
+        curl, vim = (create_test_package(name=name, package_type="apt", pre_install_lines="")
+                     for name in ("curl", "vim"))
+        versions = {
+            (package.name, version): create_test_chosen_version(
+                package=package, chosen_version=version)
+            for package, version in ((curl, "1.0"), (vim, "1.0"), (curl, "2.0"))
+        }
+        self.create_snapshot(device, [versions[("curl", "1.0")], versions[("vim", "1.0")]])
+        vim_row_id = DeviceLatestVersion.objects.get(package=vim).id
+
+        # Acts
+        snapshot = self.create_snapshot(
+            device, [versions[("curl", "2.0")], versions[("vim", "1.0")]])
+
+        # Asserts
+        rows = DeviceLatestVersion.objects.filter(device=device)
+        self.assertEqual(
+            sorted(rows.values_list('chosen_version__package__name',
+                                    'chosen_version__chosen_version')),
+            [("curl", "2.0"), ("vim", "1.0")]
+        )
+        self.assertEqual(rows.get(package=vim).id, vim_row_id)
+        self.assertEqual(Device.objects.get(id=device.id).latest_snapshot_id, snapshot.id)
+
+    def test_refresh_unchanged_versions(self):
+        """
+        Check if re-importing the same versions only points the device at its new snapshot
+        """
+        # Given
+        device = create_test_device(name="Mon objet!")
+        package = create_test_package(name="curl", package_type="apt", pre_install_lines="")
+        versions = [create_test_chosen_version(package=package, chosen_version="1.0")]
+        self.create_snapshot(device, versions)
+        row_ids = list(DeviceLatestVersion.objects.values_list('id', flat=True))
+        snapshot = Snapshot.objects.create(
+            related_device=device, save_date=timezone.now(), operating_system="My OS!")
+        snapshot.versions.add(*versions)
+
+        # Acts
+        with CaptureQueriesContext(connection) as context:
+            DeviceLatestVersion.refresh(device.id)
+
+        # Asserts
+        table = DeviceLatestVersion._meta.db_table
+        self.assertFalse([
+            query for query in context.captured_queries
+            if table in query['sql'] and not query['sql'].startswith('SELECT')
+        ])
+        self.assertEqual(list(DeviceLatestVersion.objects.values_list('id', flat=True)), row_ids)
+        self.assertEqual(Device.objects.get(id=device.id).latest_snapshot_id, snapshot.id)
+
+    def test_refresh_queries_count(self):
+        """
+        Check if the refresh queries count does not grow with the versions count
+        """
+        # Given
+        large_snapshot = create_large_snapshot(
+            create_test_device(name="Large"), versions_count=300, save_date="2020-01-01")
+        small_snapshot = Snapshot.objects.create(related_device=create_test_device(
+            name="Small"), save_date="2020-01-01", operating_system="My OS!")
+        small_snapshot.versions.add(*large_snapshot.versions.all()[:10])
+        queries_counts = []
+
+        # Acts
+        for snapshot in (small_snapshot, large_snapshot):
+            with CaptureQueriesContext(connection) as context:
+                DeviceLatestVersion.refresh(snapshot.related_device_id)
+            queries_counts.append(len(context.captured_queries))
+
+        # Asserts
+        self.assertEqual(queries_counts[0], queries_counts[1])
+        self.assertEqual(DeviceLatestVersion.objects.count(), 310)
+
+    def test_latest_snapshot_deleted(self):
+        """
+        Check if the rows point at the previous snapshot once the latest one is deleted
+        """
+        # Given
+        device = create_test_device(name="Mon objet!")
+        package = create_test_package(name="curl", package_type="apt", pre_install_lines="")
+        first_version, second_version = (
+            create_test_chosen_version(package=package, chosen_version=version)
+            for version in ("1.0", "2.0")
+        )
+        first_snapshot = self.create_snapshot(device, [first_version])
+        second_snapshot = self.create_snapshot(device, [second_version])
+
+        # Acts
+        second_snapshot.delete()
+
+        # Asserts
+        row = DeviceLatestVersion.objects.get(device=device)
+        self.assertEqual(row.chosen_version_id, first_version.id)
+        self.assertEqual(Device.objects.get(id=device.id).latest_snapshot_id, first_snapshot.id)
+
 
 class TestShell(SimpleTestCase):
     """
@@ -0,0 +1,173 @@
+import json
+import tempfile
+
+from unittest import mock
+
+import graphene
+
+from django.conf import settings
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from data import persisted_queries
+from apps_tests.test_data.schemas.utils import tear_down_objects
+from apps_tests.test_data.utils import create_test_device
+
+DEVICE_QUERY = 'query getDevice($deviceID:BigInt!){ deviceInfos(deviceId: $deviceID) { name } }'
+
+
+@override_settings(GRAPHQL_CACHE={**settings.GRAPHQL_CACHE, 'ENABLED': False})
+class TestPersistedQueries(TestCase):
+    """
+    GraphQL persisted queries test class
+    """
+
+    databases = '__all__'
+    GRAPHQL_URL = 'http://0.0.0.0:8000/api/v1/data/graphql/'
+
+    def setUp(self) -> None:
+        persisted_queries.DOCUMENTS.clear()
+        self.device = create_test_device(name="Mon objet!")
+
+    def tearDown(self) -> None:
+        tear_down_objects()
+        persisted_queries.DOCUMENTS.clear()
+
+    def query_device(self, query: str = None, sha256_hash: str = None) -> dict:
+        """ Queries the name of the test device, with a persisted query hash if set
+
+        :type query: str
+        :param query: GraphQL query document (not sent if not set)
+
+        :type sha256_hash: str
+        :param sha256_hash: Persisted query hash (not sent if not set)
+
+        :rtype: dict
+        """
+        body = {'variables': {'deviceID': str(self.device.id)}}
+        if query is not None:
+            body['query'] = query
+        if sha256_hash is not None:
+            body['extensions'] = {'persistedQuery': {'version': 1, 'sha256Hash': sha256_hash}}
+        return self.client.post(
+            self.GRAPHQL_URL, json.dumps(body), content_type="application/json").json()
+
+    def test_persisted_query(self):
+        """
+        Check if an unknown hash is rejected, then found once its query has been sent
+        """
+        # Given
+        sha256_hash = persisted_queries.query_hash(DEVICE_QUERY)
+
+        # Acts
+        not_found = self.query_device(sha256_hash=sha256_hash)
+        registered = self.query_device(query=DEVICE_QUERY, sha256_hash=sha256_hash)
+        persisted = self.query_device(sha256_hash=sha256_hash)
+
+        # Asserts
+        self.assertEqual(not_found['errors'][0]['message'], "PersistedQueryNotFound")
+        self.assertEqual(
+            not_found['errors'][0]['extensions']['code'], "PERSISTED_QUERY_NOT_FOUND")
+        self.assertEqual(registered['data']['deviceInfos']['name'], "Mon objet!")
+        self.assertEqual(persisted, registered)
+
+    def test_mismatched_hash(self):
+        """
+        Check if a query sent with the hash of another query is rejected
+        """
+        # Acts
+        result = self.query_device(query=DEVICE_QUERY, sha256_hash="0" * 64)
+
+        # Asserts
+        self.assertNotIn('data', result)
+        self.assertEqual(result['errors'][0]['extensions']['code'], "BAD_PERSISTED_QUERY")
+
+    def test_cached_document(self):
+        """
+        Check if a document is only parsed and validated once
+        """
+        # Acts
+        with mock.patch('data.persisted_queries.parse', wraps=persisted_queries.parse) as parse, \
+                mock.patch('data.persisted_queries.validate',
+                           wraps=persisted_queries.validate) as validate:
+            results = [self.query_device(query=DEVICE_QUERY) for _ in range(3)]
+
+        # Asserts
+        self.assertEqual(parse.call_count, 1)
+        self.assertEqual(validate.call_count, 1)
+        for result in results:
+            self.assertEqual(result['data']['deviceInfos']['name'], "Mon objet!")
+
+    def test_warm_document_not_parsed(self):
+        """
+        Check if a known document is executed without being parsed again
+        """
+        # Given
+        self.query_device(query=DEVICE_QUERY)
+
+        # Acts
+        with mock.patch('graphql.parse') as graphql_parse, \
+                mock.patch('graphene_django.views.parse') as view_parse, \
+                mock.patch('data.persisted_queries.parse') as parse:
+            result = self.query_device(query=DEVICE_QUERY)
+
+        # Asserts
+        graphql_parse.assert_not_called()
+        view_parse.assert_not_called()
+        parse.assert_not_called()
+        self.assertEqual(result['data']['deviceInfos']['name'], "Mon objet!")
+
+    def test_invalid_document(self):
+        """
+        Check if the syntax and validation errors are still sent once the document is cached
+        """
+        # Acts
+        syntax_errors = [self.query_device(query="query {") for _ in range(2)]
+        validation_errors = [self.query_device(query="query { unknownField }") for _ in range(2)]
+
+        # Asserts
+        for result in syntax_errors + validation_errors:
+            self.assertNotIn('data', result)
+            self.assertEqual(len(result['errors']), 1)
+        self.assertEqual(len(persisted_queries.DOCUMENTS), 0)
+
+    def test_document_schema(self):
+        """
+        Check if a document is validated against the given schema
+        """
+        # Given
+        schema = graphene.Schema(query=type(
+            "Query", (graphene.ObjectType,), {'hello': graphene.String()})).graphql_schema
+
+        # Acts
+        _, project_errors = persisted_queries.get_document("query { hello }")
+        document, errors = persisted_queries.get_document("query { hello }", schema=schema)
+
+        # Asserts
+        self.assertEqual(len(project_errors), 1)
+        self.assertIsNotNone(document)
+        self.assertEqual(errors, [])
+
+    def test_strict_allow_list(self):
+        """
+        Check if only the queries of the allow-list are executed in strict mode
+        """
+        # Given
+        sha256_hash = persisted_queries.query_hash(DEVICE_QUERY)
+        with tempfile.NamedTemporaryFile("w", suffix=".json") as manifest:
+            json.dump({'operations': [{'id': sha256_hash, 'body': DEVICE_QUERY}]}, manifest)
+            manifest.flush()
+
+            # Acts
+            with override_settings(GRAPHQL_PERSISTED_QUERIES={
+                **settings.GRAPHQL_PERSISTED_QUERIES, 'ALLOW_LIST': manifest.name, 'STRICT': True
+            }):
+                allowed = self.query_device(sha256_hash=sha256_hash)
+                allowed_query = self.query_device(query=DEVICE_QUERY)
+                rejected = self.query_device(query=DEVICE_QUERY.replace("name", "name, cores"))
+
+        # Asserts
+        self.assertEqual(allowed['data']['deviceInfos']['name'], "Mon objet!")
+        self.assertEqual(allowed_query, allowed)
+        self.assertNotIn('data', rejected)
+        self.assertEqual(rejected['errors'][0]['extensions']['code'], "PERSISTED_QUERY_NOT_ALLOWED")
@@ -0,0 +1,115 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+
+from data.progress import ProgressReporter
+
+
+class TestProgressReporter(SimpleTestCase):
+    """
+    Import progress reporter unit test class
+    """
+
+    def test_start(self):
+        """
+        Check if the initialisation infos are set with the total and the description.
+        """
+        # Given
+        test_object = ProgressReporter(total=10, desc="My library packages import")
+
+        # Acts
+        op_result = test_object.start()
+
+        # Asserts
+        self.assertEqual(op_result, {
+            'state': 'init',
+            'total': 10,
+            'desc': "My library packages import"
+        })
+
+    def test_advance_without_throttling(self):
+        """
+        Check if every update is emitted when both intervals are disabled.
+        """
+        # Given
+        test_object = ProgressReporter(total=3, desc="")
+        test_object.start()
+
+        # Acts
+        op_result = [test_object.advance() for _ in range(3)]
+
+        # Asserts
+        self.assertEqual([infos['index'] for infos in op_result], [1, 2, 3])
+        self.assertEqual(op_result[-1], {'state': 'update', 'index': 3, 'total': 3})
+
+    def test_advance_percent_interval(self):
+        """
+        Check if the updates are only emitted once the percent interval is reached.
+        The last update should always be emitted.
+        """
+        # Given
+        test_object = ProgressReporter(total=1000, desc="", interval_percent=10)
+        test_object.start()
+
+        # Acts
+        op_result = [test_object.advance() for _ in range(1000)]
+
+        # Asserts
+        emitted = [infos['index'] for infos in op_result if infos]
+        self.assertEqual(emitted, list(range(100, 1001, 100)))
+
+    def test_advance_time_interval(self):
+        """
+        Check if the updates are only emitted once the time interval is elapsed.
+        """
+        # Given
+        test_object = ProgressReporter(total=10, desc="", interval_seconds=1)
+        with patch('data.progress.time.monotonic', return_value=0):
+            test_object.start()
+
+        # Acts
+        with patch('data.progress.time.monotonic', side_effect=[0.5, 1.2, 1.5, 2.3]):
+            op_result = [test_object.advance() for _ in range(4)]
+
+        # Asserts
+        self.assertEqual(op_result[0], None)
+        self.assertEqual(op_result[1]['index'], 2)
+        self.assertEqual(op_result[2], None)
+        self.assertEqual(op_result[3]['index'], 4)
+
+    def test_advance_time_or_percent_interval(self):
+        """
+        Check if an update is emitted once either the time or the percent interval
+        is reached : slow steps are reported by time, fast ones by percent.
+        """
+        # Given
+        test_object = ProgressReporter(total=100, desc="", interval_seconds=1,
+                                       interval_percent=50)
+        with patch('data.progress.time.monotonic', return_value=0):
+            test_object.start()
+
+        # Acts
+        with patch('data.progress.time.monotonic', side_effect=[0.5, 1.2, 1.4, 1.5]):
+            op_result = [test_object.advance(count) for count in (1, 1, 10, 50)]
+
+        # Asserts
+        self.assertEqual(op_result[0], None)
+        self.assertEqual(op_result[1]['index'], 2)
+        self.assertEqual(op_result[2], None)
+        self.assertEqual(op_result[3]['index'], 62)
+
+    @override_settings(BACKUP_IMPORT={
+        'PROGRESS_INTERVAL_SECONDS': 2,
+        'PROGRESS_INTERVAL_PERCENT': 5
+    })
+    def test_from_settings(self):
+        """
+        Check if the intervals are loaded from the project settings.
+        """
+        # Acts
+        test_object = ProgressReporter.from_settings(total=5, desc="My description")
+
+        # Asserts
+        self.assertEqual(test_object.interval_seconds, 2)
+        self.assertEqual(test_object.interval_percent, 5)
+        self.assertEqual(test_object.total, 5)
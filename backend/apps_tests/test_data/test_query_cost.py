@@ -0,0 +1,247 @@
+import json
+
+from django.conf import settings
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from graphene_django.settings import graphene_settings
+from graphql import get_operation_ast, parse
+
+from data.models import Snapshot
+from data.query_cost import QueryCost
+from apps_tests.test_data.schemas.utils import create_large_snapshot, tear_down_objects
+from apps_tests.test_data.utils import create_test_device
+
+TWO_SNAPSHOTS_QUERY = '''
+    query getSnapshots($snapshotID:BigInt!){
+        first: snapshotInfos(snapshotId: $snapshotID) { operatingSystem }
+        second: snapshotInfos(snapshotId: $snapshotID) { versions { name } }
+    }
+'''
+
+
+class TestQueryCostEstimation(SimpleTestCase):
+    """
+    GraphQL query cost estimation test class
+    """
+
+    def test_estimated_cost(self):
+        """
+        Check if the list fields cost scales with their list argument, their page size
+        or their estimated rows count
+        """
+        # Given
+        document = parse('''
+            query getSnapshots($ids:[BigInt]!){
+                snapshotInfosBatch(ids: $ids) {
+                    versionsConnection(first: 20) { edges { node { name } } }
+                }
+                deviceInfos(deviceId: 1) { name, snapshots { key } }
+                timeline: deviceInfos(deviceId: 1) { snapshots(first: 1000) { key } }
+            }
+        ''')
+        cost_analysis = QueryCost(
+            graphene_settings.SCHEMA.graphql_schema, document, {'ids': ["1", "2", "3"]})
+        field_costs = settings.GRAPHQL_COST['FIELD_COSTS']
+
+        # Acts
+        costs = cost_analysis.root_costs(get_operation_ast(document))
+
+        # Asserts
+        self.assertEqual(
+            costs['snapshotInfosBatch'],
+            field_costs['Query.snapshotInfosBatch'] + 3 * (
+                1 + field_costs['SnapshotData.versionsConnection'] + 1 + 20 * (1 + 1)
+            )
+        )
+        self.assertEqual(
+            costs['deviceInfos'],
+            field_costs['Query.deviceInfos'] + 1 + field_costs['DeviceInfos.snapshots']
+            + settings.GRAPHQL_COST['LIST_SIZES']['DeviceInfos.snapshots']
+        )
+        self.assertEqual(
+            costs['timeline'],
+            field_costs['Query.deviceInfos'] + 1 + field_costs['DeviceInfos.snapshots'] + 1000
+        )
+
+    def test_actual_cost(self):
+        """
+        Check if the actual cost is computed from the response rows count
+        """
+        # Given
+        document = parse(TWO_SNAPSHOTS_QUERY)
+        cost_analysis = QueryCost(
+            graphene_settings.SCHEMA.graphql_schema, document, {'snapshotID': "1"})
+        data = {
+            'first': None,
+            'second': {'versions': [{'name': "curl"}, {'name': "vim"}]}
+        }
+        field_costs = settings.GRAPHQL_COST['FIELD_COSTS']
+
+        # Acts
+        costs = cost_analysis.root_costs(get_operation_ast(document), data)
+
+        # Asserts
+        self.assertEqual(costs['first'], field_costs['Query.snapshotInfos'])
+        self.assertEqual(
+            costs['second'],
+            field_costs['Query.snapshotInfos'] + 1 + field_costs['SnapshotData.versions'] + 2
+        )
+
+
+@override_settings(GRAPHQL_CACHE={**settings.GRAPHQL_CACHE, 'ENABLED': False})
+class TestQueryCostBudget(TestCase):
+    """
+    GraphQL query cost budget test class
+    """
+
+    databases = '__all__'
+    GRAPHQL_URL = 'http://0.0.0.0:8000/api/v1/data/graphql/'
+
+    def setUp(self) -> None:
+        self.snapshot = create_large_snapshot(
+            create_test_device(name="Mon objet!"), versions_count=10, save_date="2020-01-01")
+
+    def tearDown(self) -> None:
+        tear_down_objects()
+
+    def query_snapshots(self) -> tuple:
+        """ Queries the test snapshot twice. Returns the response with its queries count
+
+        :rtype: tuple
+        """
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(self.GRAPHQL_URL, json.dumps({
+                'query': TWO_SNAPSHOTS_QUERY,
+                'variables': {'snapshotID': str(self.snapshot.id)}
+            }), content_type="application/json")
+        return response, len(context.captured_queries)
+
+    def test_rejected_query(self):
+        """
+        Check if a query over budget is rejected without any database query
+        """
+        # Acts
+        with override_settings(GRAPHQL_COST={**settings.GRAPHQL_COST, 'BUDGET': 100}):
+            response, queries_count = self.query_snapshots()
+
+        # Asserts
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(queries_count, 0)
+        self.assertEqual(response.json()['errors'][0]['extensions']['code'], "QUERY_TOO_EXPENSIVE")
+
+    def test_truncated_query(self):
+        """
+        Check if the root fields over budget are skipped in truncate mode
+        """
+        # Acts
+        with override_settings(GRAPHQL_COST={
+            **settings.GRAPHQL_COST, 'BUDGET': 100, 'MODE': 'truncate'
+        }):
+            response, _ = self.query_snapshots()
+
+        # Asserts
+        result = response.json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(result['data']['first']['operatingSystem'], "My OS!")
+        self.assertIsNone(result['data']['second'])
+        self.assertEqual(result['errors'][0]['path'], ['second'])
+
+    def test_timeline_query(self):
+        """
+        Check if the default budget accepts the versions of a 100 snapshots timeline,
+        but still rejects a batch twice as large
+        """
+        # Given
+        Snapshot.objects.bulk_create(
+            Snapshot(related_device=self.snapshot.related_device,
+                     save_date=f"2020-{month:02}-{day:02}", operating_system="My OS!")
+            for month in range(2, 6) for day in range(1, 26)
+        )
+        ids = list(Snapshot.objects.order_by('save_date').values_list('id', flat=True)[:100])
+
+        # Acts
+        timeline_response = self.client.post(self.GRAPHQL_URL, json.dumps({
+            'query': '''
+                query getTimeline($ids:[BigInt]!){
+                    snapshotInfosBatch(ids: $ids) {
+                        operatingSystem,
+                        versions { name, chosenVersion, installType },
+                        repositories { sourcesLines }
+                    }
+                }
+            ''',
+            'variables': {'ids': [str(snapshot_id) for snapshot_id in ids]}
+        }), content_type="application/json")
+        batch_response = self.client.post(self.GRAPHQL_URL, json.dumps({
+            'query': 'query { snapshotInfosBatch(ids: [%s]) { versions { name } } }'
+                     % ", ".join(str(snapshot_id) for snapshot_id in range(1, 201))
+        }), content_type="application/json")
+
+        # Asserts
+        result = timeline_response.json()
+        self.assertNotIn('errors', result)
+        self.assertEqual(len(result['data']['snapshotInfosBatch']), 100)
+        self.assertEqual(len(result['data']['snapshotInfosBatch'][0]['versions']), 10)
+        self.assertEqual(
+            batch_response.json()['errors'][0]['extensions']['code'], "QUERY_TOO_EXPENSIVE")
+
+    def test_device_timeline_query(self):
+        """
+        Check if the device snapshots cost grows with their requested count : the largest
+        timeline is skipped in truncate mode, the smallest one only returns its snapshots
+        """
+        # Given
+        Snapshot.objects.bulk_create(
+            Snapshot(related_device=self.snapshot.related_device,
+                     save_date=f"2020-{month:02}-{day:02}", operating_system="My OS!")
+            for month in range(2, 6) for day in range(1, 26)
+        )
+
+        # Acts
+        with override_settings(GRAPHQL_COST={**settings.GRAPHQL_COST, 'MODE': 'truncate'}):
+            response = self.client.post(self.GRAPHQL_URL, json.dumps({
+                'query': '''
+                    query getTimelines($deviceID:BigInt!, $first:Int!){
+                        recent: deviceInfos(deviceId: $deviceID) {
+                            snapshots(first: 50) { key, date }
+                        }
+                        whole: deviceInfos(deviceId: $deviceID) {
+                            snapshots(first: $first) { key, date }
+                        }
+                    }
+                ''',
+                'variables': {
+                    'deviceID': str(self.snapshot.related_device_id),
+                    'first': settings.GRAPHQL_COST['BUDGET']
+                }
+            }), content_type="application/json")
+
+        # Asserts
+        result = response.json()
+        snapshots = result['data']['recent']['snapshots']
+        self.assertEqual(len(snapshots), 50)
+        self.assertEqual(snapshots[0]['date'], "2020-01-01")
+        self.assertEqual(snapshots[1]['date'], "2020-02-01")
+        self.assertIsNone(result['data']['whole'])
+        self.assertEqual(result['errors'][0]['path'], ['whole'])
+        self.assertEqual(result['errors'][0]['extensions']['code'], "QUERY_TOO_EXPENSIVE")
+
+    def test_recorded_cost(self):
+        """
+        Check if the estimated and actual costs of an executed query are logged
+        """
+        # Acts
+        with self.assertLogs(level='INFO') as logs:
+            response, _ = self.query_snapshots()
+
+        # Asserts
+        self.assertEqual(len(response.json()['data']['second']['versions']), 10)
+        cost = json.loads(logs.records[-1].getMessage().split(": ", 1)[1])
+        self.assertEqual(cost['operation'], None)
+        self.assertGreater(cost['estimated'], cost['actual'])
+        self.assertEqual(
+            cost['actual'],
+            2 * settings.GRAPHQL_COST['FIELD_COSTS']['Query.snapshotInfos'] + 2
+            + settings.GRAPHQL_COST['FIELD_COSTS']['SnapshotData.versions'] + 10
+        )
@@ -0,0 +1,201 @@
+import time
+
+from unittest.mock import patch
+
+from django.conf import settings
+from django.db import connection
+from django.core.cache.backends.locmem import LocMemCache
+from django.test.utils import CaptureQueriesContext, override_settings
+from graphene_django.utils.testing import GraphQLTestCase
+
+from data.response_cache import (
+    LOCAL_CACHE,
+    RESPONSE_KEYS,
+    SNAPSHOT_DEVICES,
+    SharedCacheAvailability
+)
+from apps_tests.test_data.schemas.utils import create_large_snapshot, tear_down_objects
+from apps_tests.test_data.utils import create_test_device
+
+SNAPSHOT_QUERY = '''
+    query getSaveInfos($snapshotID:BigInt!){
+        snapshotInfos(snapshotId: $snapshotID) {
+            versions { name, chosenVersion },
+            operatingSystem
+        }
+    }
+'''
+
+
+@override_settings(
+    CACHES={
+        **settings.CACHES,
+        'graphql': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+    },
+    GRAPHQL_CACHE={**settings.GRAPHQL_CACHE, 'ENABLED': True}
+)
+class TestResponseCache(GraphQLTestCase):
+    """
+    GraphQL responses cache test class
+    """
+
+    databases = '__all__'
+    GRAPHQL_URL = 'http://0.0.0.0:8000/api/v1/data/graphql/'
+
+    def tearDown(self) -> None:
+        tear_down_objects()
+        LOCAL_CACHE.clear()
+        RESPONSE_KEYS.clear()
+        SNAPSHOT_DEVICES.clear()
+
+    def query_snapshot(self, snapshot_id: int, query: str = SNAPSHOT_QUERY, **kwargs):
+        """ Queries the versions of a snapshot. Returns the response with its queries count
+
+        :type snapshot_id: int
+        :param snapshot_id: ID of the snapshot
+
+        :type query: str
+        :param query: GraphQL query document
+
+        :rtype: tuple
+        """
+        with CaptureQueriesContext(connection) as context:
+            response = self.query(query, variables={'snapshotID': str(snapshot_id)}, **kwargs)
+        # The queries log is reset by the next request
+        return response, len(context.captured_queries)
+
+    def test_cached_response(self):
+        """
+        Check if a snapshot query is answered from the cache (whatever the document
+        formatting), with an ETag
+        """
+        # Given
+        snapshot = create_large_snapshot(
+            create_test_device(name="Mon objet!"), versions_count=10, save_date="2020-01-01")
+        first_response, _ = self.query_snapshot(snapshot.id)
+
+        # Acts
+        cached_response, queries_count = self.query_snapshot(
+            snapshot.id, query=" ".join(SNAPSHOT_QUERY.split()))
+
+        # Asserts
+        self.assertEqual(queries_count, 0)
+        self.assertEqual(cached_response.content, first_response.content)
+        self.assertEqual(len(cached_response.json()['data']['snapshotInfos']['versions']), 10)
+        self.assertEqual(cached_response['ETag'], first_response['ETag'])
+
+    def test_cached_batch_response(self):
+        """
+        Check if a snapshots batch query (IDs list literal) is answered from the cache
+        """
+        # Given
+        snapshot = create_large_snapshot(
+            create_test_device(name="Mon objet!"), versions_count=10, save_date="2020-01-01")
+        query = 'query { snapshotInfosBatch(ids: [%d]) { versions { name } } }' % snapshot.id
+        first_response, _ = self.query_snapshot(snapshot.id, query=query)
+
+        # Acts
+        cached_response, queries_count = self.query_snapshot(snapshot.id, query=query)
+
+        # Asserts
+        self.assertEqual(queries_count, 0)
+        self.assertEqual(cached_response.content, first_response.content)
+        self.assertEqual(cached_response['ETag'], first_response['ETag'])
+
+    def test_cached_response_key(self):
+        """
+        Check if a repeated request reuses its cache key, without reading the snapshots
+        nor the generations again
+        """
+        # Given
+        snapshot = create_large_snapshot(
+            create_test_device(name="Mon objet!"), versions_count=10, save_date="2020-01-01")
+        first_response, _ = self.query_snapshot(snapshot.id)
+        SNAPSHOT_DEVICES.clear()
+
+        # Acts
+        with patch.object(LocMemCache, 'get_many') as get_many:
+            cached_response, queries_count = self.query_snapshot(snapshot.id)
+
+        # Asserts
+        get_many.assert_not_called()
+        self.assertEqual(queries_count, 0)
+        self.assertEqual(cached_response['ETag'], first_response['ETag'])
+
+    def test_not_modified(self):
+        """
+        Check if a request with a matching If-None-Match header gets a 304 response
+        """
+        # Given
+        snapshot = create_large_snapshot(
+            create_test_device(name="Mon objet!"), versions_count=10, save_date="2020-01-01")
+        etag = self.query_snapshot(snapshot.id)[0]['ETag']
+
+        # Acts
+        response, _ = self.query_snapshot(snapshot.id, headers={'If-None-Match': etag})
+
+        # Asserts
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_device_edit_invalidation(self):
+        """
+        Check if editing the device of a snapshot invalidates its cached responses
+        """
+        # Given
+        device = create_test_device(name="Mon objet!")
+        snapshot = create_large_snapshot(device, versions_count=10, save_date="2020-01-01")
+        etag = self.query_snapshot(snapshot.id)[0]['ETag']
+
+        # Acts
+        device.memory = 64
+        device.save()
+        response, queries_count = self.query_snapshot(snapshot.id)
+
+        # Asserts
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertGreater(queries_count, 0)
+
+    def test_invalidation_during_outage(self):
+        """
+        Check if the invalidations missed while the shared cache is unavailable
+        are applied once it is reachable again
+        """
+        # Given
+        device = create_test_device(name="Mon objet!")
+        snapshot = create_large_snapshot(device, versions_count=10, save_date="2020-01-01")
+        etag = self.query_snapshot(snapshot.id)[0]['ETag']
+        SharedCacheAvailability.unavailable_until = time.monotonic() + 60
+
+        # Acts
+        device.memory = 64
+        device.save()
+        # Another process : its local cache is empty
+        LOCAL_CACHE.clear()
+        SharedCacheAvailability.unavailable_until = 0.0
+        response, queries_count = self.query_snapshot(snapshot.id)
+
+        # Asserts
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertGreater(queries_count, 0)
+        self.assertEqual(SharedCacheAvailability.pending_keys, set())
+
+    def test_not_cacheable_query(self):
+        """
+        Check if the queries reading other objects than snapshots are not cached
+        """
+        # Given
+        device = create_test_device(name="Mon objet!")
+
+        # Acts
+        response = self.query(
+            'query { deviceInfos(deviceId: %d) { name } }' % device.id)
+        incomplete_snapshot = create_large_snapshot(
+            device, versions_count=1, save_date="2020-01-01")
+        incomplete_snapshot.is_complete = False
+        incomplete_snapshot.save()
+        incomplete_response, _ = self.query_snapshot(incomplete_snapshot.id)
+
+        # Asserts
+        self.assertNotIn('ETag', response)
+        self.assertNotIn('ETag', incomplete_response)
@@ -1,3 +1,7 @@
+import gzip
+import json
+
+from data.codecs import DEFAULT_ENCODING, msgpack, zstandard
 from data.models import ChosenVersion, Device, Package
 
 
@@ -50,3 +54,60 @@ def create_test_device(name: str) -> Device:
         memory=32,
         processor="My processor!"
     )
+
+
+def create_sample_snapshot_data(packages_count: int, version: str = "1.0",
+                                library_type: str = "first_type") -> dict:
+    """ Creates a snapshot payload as sent by the client. It will be used for unit test
+
+    :type packages_count: int
+    :param packages_count: How many packages are set in the library
+
+    :type version: str
+    :param version: Chosen version of every package (e.g 1.0)
+
+    :type library_type: str
+    :param library_type: Name of the library (e.g. apt, snap)
+
+    :rtype: dict
+    """
+    return {
+        "hostname": "my-computer",
+        "specs": {
+            "cores": 1,
+            "virtual_memory": 16,
+            "processor": "My processor"
+        },
+        "os": "My OS",
+        "libraries": {
+            library_type: {
+                str(index): {
+                    "Package": f"my_package_{index}",
+                    "Version": version,
+                    "Repository": "my_repo"
+                }
+                for index in range(packages_count)
+            }
+        }
+    }
+
+
+def encode_payload(data: dict, encoding: str = DEFAULT_ENCODING) -> bytes:
+    """ Encodes data as a binary frame, as the client does
+
+    :type data: dict
+    :param data: Data to encode
+
+    :type encoding: str
+    :param encoding: Negotiated encoding (``<serialisation>+<compression>``)
+
+    :rtype: bytes
+    """
+    serialisation, _, compression = encoding.partition("+")
+    raw = msgpack.packb(data) if serialisation == "msgpack" else json.dumps(data).encode()
+    match compression:
+        case "gzip":
+            return gzip.compress(raw)
+        case "zstd":
+            return zstandard.ZstdCompressor().compress(raw)
+    return raw
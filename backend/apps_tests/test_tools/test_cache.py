@@ -0,0 +1,99 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from tools.cache import TTLCache
+
+
+class TestTTLCache(SimpleTestCase):
+    """
+    In-process TTL cache test class
+    """
+
+    def test_get_set(self):
+        """
+        Check if a cached value is returned, and the default value if the key is not set
+        """
+        # Given
+        test_object = TTLCache(max_size=2, ttl_seconds=10)
+
+        # Acts
+        test_object.set("key", 1)
+
+        # Asserts
+        self.assertEqual(test_object.get("key"), 1)
+        self.assertEqual(test_object.get("unknown", "default"), "default")
+
+    def test_expired_entry(self):
+        """
+        Check if an entry is removed once its lifetime is elapsed
+        """
+        # Given
+        test_object = TTLCache(max_size=2, ttl_seconds=10)
+        with patch('tools.cache.time.monotonic', return_value=0):
+            test_object.set("key", 1)
+
+        # Acts
+        with patch('tools.cache.time.monotonic', return_value=9):
+            still_cached = test_object.get("key")
+        with patch('tools.cache.time.monotonic', return_value=10):
+            expired = test_object.get("key")
+
+        # Asserts
+        self.assertEqual(still_cached, 1)
+        self.assertIsNone(expired)
+        self.assertEqual(len(test_object), 0)
+
+    def test_least_recently_used_eviction(self):
+        """
+        Check if the least recently used entry is evicted once the cache is full
+        """
+        # Given
+        test_object = TTLCache(max_size=2, ttl_seconds=10)
+        test_object.set("first", 1)
+        test_object.set("second", 2)
+        test_object.get("first")
+
+        # Acts
+        test_object.set("third", 3)
+
+        # Asserts
+        self.assertIsNone(test_object.get("second"))
+        self.assertEqual(test_object.get("first"), 1)
+        self.assertEqual(test_object.get("third"), 3)
+
+    def test_delete_clear(self):
+        """
+        Check if entries can be removed one by one or all at once
+        """
+        # Given
+        test_object = TTLCache(max_size=3, ttl_seconds=10)
+        for key in ("first", "second", "third"):
+            test_object.set(key, key)
+
+        # Acts
+        test_object.delete("first")
+        test_object.delete("unknown")
+        remaining = len(test_object)
+        test_object.clear()
+
+        # Asserts
+        self.assertEqual(remaining, 2)
+        self.assertEqual(len(test_object), 0)
+
+    def test_stats_without_expiry(self):
+        """
+        Check if the hits and misses are counted, and if entries never expire without lifetime
+        """
+        # Given
+        test_object = TTLCache(max_size=2)
+        with patch('tools.cache.time.monotonic', return_value=0):
+            test_object.set("key", 1)
+
+        # Acts
+        with patch('tools.cache.time.monotonic', return_value=10 ** 9):
+            test_object.get("key")
+        test_object.get("unknown")
+
+        # Asserts
+        self.assertEqual(test_object.stats(), {'size': 1, 'max_size': 2, 'hits': 1, 'misses': 1})
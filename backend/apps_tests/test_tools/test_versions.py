@@ -0,0 +1,77 @@
+from django.test import SimpleTestCase
+from tools.versions import split_version, version_key
+
+
+class TestVersions(SimpleTestCase):
+    """
+    Sortable version keys test class
+    """
+
+    def test_version_key_order(self):
+        """
+        Check if the version keys sort the numeric parts by value
+        """
+        # Given
+        versions = ["1.0", "1.0a", "1.0.1", "1.2", "1.10", "3.0.2", "3.0.10", "10.0"]
+
+        # Acts
+        op_result = sorted(versions[::-1], key=version_key)
+
+        # Asserts
+        self.assertEqual(op_result, versions)
+        self.assertEqual(version_key("1.01"), version_key("1.1"))
+
+    def test_debian_version_key_order(self):
+        """
+        Check if the version keys sort the Debian versions as dpkg does
+        (``~`` first, then the epoch, the upstream version and the revision)
+        """
+        # Given
+        versions = [
+            "1.0~rc1", "1.0", "1.0-1~bpo1", "1.0-1", "1.0-1ubuntu1", "1.0+dfsg-1",
+            "2.4.1-3", "2.4.1-3ubuntu1", "2.4.1-3ubuntu1.1", "2.4.1-10", "1:0.9"
+        ]
+
+        # Acts
+        op_result = sorted(versions[::-1], key=version_key)
+
+        # Asserts
+        self.assertEqual(op_result, versions)
+        self.assertEqual(version_key("0:1.0-0"), version_key("1.0"))
+        self.assertLess(version_key("1.0~~"), version_key("1.0~"))
+
+    def test_documented_version_key_order(self):
+        """
+        Check if the versions are sorted as documented : the upstream version is compared
+        before the revision
+        """
+        # Given
+        versions = ["1.0~rc1", "1.0", "1.0-1", "1.0a", "1:0.9"]
+
+        # Acts
+        op_result = sorted(versions[::-1], key=version_key)
+
+        # Asserts
+        self.assertEqual(op_result, versions)
+
+    def test_long_numeric_run(self):
+        """
+        Check if the numeric runs longer than 255 digits are still sorted by value
+        """
+        # Given
+        versions = ["9" * 254, "1" + "0" * 254, "1" + "0" * 300, "2" + "0" * 300, "1" + "0" * 301]
+
+        # Acts
+        op_result = sorted(versions[::-1], key=version_key)
+
+        # Asserts
+        self.assertEqual(op_result, versions)
+
+    def test_split_version(self):
+        """
+        Check if the epoch and the revision are split from the upstream version
+        """
+        # Acts & Asserts
+        self.assertEqual(split_version("1:2.4.1-3ubuntu1"), ("1", "2.4.1", "3ubuntu1"))
+        self.assertEqual(split_version("1.2-beta-3"), ("0", "1.2-beta", "3"))
+        self.assertEqual(split_version("latest/stable"), ("0", "latest/stable", ""))
@@ -0,0 +1,333 @@
+"""
+Synthetic fleet import benchmark.
+Generates the nightly snapshots of a fleet of devices (a shared packages catalogue,
+with upgrades, installs and removals between two snapshots of a device), then sends them
+to ``BackupImportConsumer`` through a ``WebsocketCommunicator``. For each import :
+
+* ``wall_s`` : time elapsed between the snapshot frame and the end frame
+* ``queries`` : SQL queries performed
+* ``rows_written`` : rows inserted, updated or deleted
+* ``peak_rss_kib`` : peak resident memory of the process during the import
+
+Usage : ``python -m benchmarks.fleet --devices 20 --packages 2000 --snapshots 3 --churn 0.05``
+"""
+import argparse
+import random
+import resource
+import statistics
+import time
+
+from typing import Iterator, List
+
+from asgiref.sync import async_to_sync
+
+from benchmarks.utils import benchmark_database, setup_django, write_results
+
+LIBRARY_TYPES = {"apt": 0.9, "snap": 0.1}
+"""
+Share of the installed packages of each library type
+"""
+
+
+class FleetGenerator:
+    """
+    Realistic snapshots generator. The devices install packages from a shared catalogue,
+    each new snapshot of a device upgrades, installs and removes a few packages.
+    """
+
+    def __init__(self, devices_count: int, packages_count: int, churn: float, seed: int = 0):
+        """ Generator initialisation
+
+        :type devices_count: int
+        :param devices_count: How many devices are in the fleet
+
+        :type packages_count: int
+        :param packages_count: How many packages are installed on each device
+
+        :type churn: float
+        :param churn: Share of the packages upgraded between two snapshots (e.g. ``0.05``)
+
+        :type seed: int
+        :param seed: Random generator seed (same seed, same fleet)
+        """
+        self.devices_count = devices_count
+        self.packages_count = packages_count
+        self.churn = churn
+        self.rng = random.Random(seed)
+        self.catalogue = {
+            library_type: [
+                f"{library_type}-package-{index}"
+                for index in range(max(1, int(2 * packages_count * share)))
+            ]
+            for library_type, share in LIBRARY_TYPES.items()
+        }
+        self.devices = [self.init_device(index) for index in range(devices_count)]
+
+    def init_device(self, index: int) -> dict:
+        """ Returns the first installed packages of a device
+
+        :type index: int
+        :param index: Device index in the fleet
+
+        :rtype: dict
+        """
+        libraries = {}
+        for library_type, packages in self.catalogue.items():
+            installed_count = max(1, int(self.packages_count * LIBRARY_TYPES[library_type]))
+            libraries[library_type] = {
+                name: f"1.{self.rng.randrange(10)}"
+                for name in self.rng.sample(packages, min(len(packages), installed_count))
+            }
+        return {
+            'hostname': f"fleet-device-{index}",
+            'processor': f"Processor #{index % 4}",
+            'libraries': libraries
+        }
+
+    def evolve(self, device: dict):
+        """ Applies the changes of a night to the installed packages of a device
+
+        :type device: dict
+        :param device: Device state (see ``init_device``)
+        """
+        for library_type, installed in device['libraries'].items():
+            names = list(installed)
+            for name in self.rng.sample(names, int(len(names) * self.churn)):
+                major, minor = installed[name].split(".")
+                installed[name] = f"{major}.{int(minor) + 1}"
+            changes = max(0, int(len(names) * self.churn / 5))
+            for name in self.rng.sample(names, min(changes, len(names) - 1)):
+                del installed[name]
+            available = [name for name in self.catalogue[library_type] if name not in installed]
+            for name in self.rng.sample(available, min(changes, len(available))):
+                installed[name] = "1.0"
+
+    @staticmethod
+    def to_snapshot(device: dict) -> dict:
+        """ Returns the snapshot data sent by the client of a device
+
+        :type device: dict
+        :param device: Device state (see ``init_device``)
+
+        :rtype: dict
+        """
+        return {
+            'hostname': device['hostname'],
+            'specs': {'cores': 8, 'virtual_memory': 16, 'processor': device['processor']},
+            'os': 'Linux',
+            'libraries': {
+                library_type: {
+                    str(position): {'Package': name, 'Version': version}
+                    for position, (name, version) in enumerate(installed.items())
+                }
+                for library_type, installed in device['libraries'].items()
+            },
+            'repositories': [
+                {'name': 'main', 'lines': 'deb http://deb.debian.org/debian bookworm main'},
+                {'name': 'security',
+                 'lines': 'deb http://security.debian.org/debian-security bookworm-security main'}
+            ]
+        }
+
+    def snapshots(self, snapshots_count: int) -> Iterator[tuple]:
+        """ Yields the ``(snapshot index, device index, snapshot data)`` of every import,
+        night after night
+
+        :type snapshots_count: int
+        :param snapshots_count: How many snapshots are sent by each device
+
+        :rtype: Iterator[tuple]
+        """
+        for snapshot_index in range(snapshots_count):
+            for device_index, device in enumerate(self.devices):
+                if snapshot_index:
+                    self.evolve(device)
+                yield snapshot_index, device_index, self.to_snapshot(device)
+
+
+class WriteCounter:
+    """
+    Database execute wrapper counting the queries and the rows written
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.rows_written = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        result = execute(sql, params, many, context)
+        self.queries += 1
+        if sql.lstrip().split(" ", 1)[0].upper() in ("INSERT", "UPDATE", "DELETE"):
+            self.rows_written += max(0, context['cursor'].rowcount)
+        return result
+
+
+def reset_peak_rss():
+    """
+    Resets the peak resident memory of the process (Linux only, ignored elsewhere)
+    """
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="utf-8") as clear_refs:
+            clear_refs.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_kib() -> int:
+    """ Returns the peak resident memory of the process since the last reset (in KiB).
+    Without ``/proc``, the peak since the process start is returned.
+
+    :rtype: int
+    """
+    try:
+        with open("/proc/self/status", encoding="utf-8") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+async def send_snapshot(snapshot_data: dict) -> str:
+    """ Sends a snapshot to the import websocket, then waits for the end frame.
+    Returns the end frame status.
+
+    :type snapshot_data: dict
+    :param snapshot_data: Snapshot data sent by the client
+
+    :rtype: str
+    """
+    # pylint: disable=import-outside-toplevel
+    from channels.testing import WebsocketCommunicator
+    from data.consumers import BackupImportConsumer
+
+    communicator = WebsocketCommunicator(BackupImportConsumer.as_asgi(), "/backup/import")
+    await communicator.connect()
+    # Greeting frame (plain text)
+    await communicator.receive_from()
+    await communicator.send_json_to(snapshot_data)
+    while True:
+        frame = await communicator.receive_json_from(timeout=600)
+        if frame['type'] == 'end':
+            break
+    await communicator.disconnect()
+    return frame['status']
+
+
+def measure_import(snapshot_data: dict) -> dict:
+    """ Imports a snapshot through the websocket consumer, then returns its measures.
+    The consumer runs in the current thread : its queries are counted on the current
+    database connection.
+
+    :type snapshot_data: dict
+    :param snapshot_data: Snapshot data sent by the client
+
+    :rtype: dict
+    """
+    from django.db import connection # pylint: disable=import-outside-toplevel
+
+    counter = WriteCounter()
+    reset_peak_rss()
+    with connection.execute_wrapper(counter):
+        start = time.perf_counter()
+        status = async_to_sync(send_snapshot)(snapshot_data)
+        wall_time = time.perf_counter() - start
+    return {
+        'status': status,
+        'wall_s': wall_time,
+        'queries': counter.queries,
+        'rows_written': counter.rows_written,
+        'peak_rss_kib': peak_rss_kib()
+    }
+
+
+def summarize(imports: List[dict]) -> dict:
+    """ Summarizes the measures of a series of imports
+
+    :type imports: List[dict]
+    :param imports: Imports measures
+
+    :rtype: dict
+    """
+    if not imports:
+        return {}
+    wall_times = sorted(measure['wall_s'] for measure in imports)
+    return {
+        'imports': len(imports),
+        'wall_s_mean': statistics.mean(wall_times),
+        'wall_s_p95': wall_times[min(len(wall_times) - 1, int(0.95 * len(wall_times)))],
+        'queries_mean': statistics.mean(measure['queries'] for measure in imports),
+        'rows_written_mean': statistics.mean(measure['rows_written'] for measure in imports),
+        'peak_rss_kib_max': max(measure['peak_rss_kib'] for measure in imports)
+    }
+
+
+def measure(generator: FleetGenerator, snapshots_count: int) -> dict:
+    """ Imports every snapshot of the fleet
+
+    :type generator: FleetGenerator
+    :param generator: Fleet snapshots generator
+
+    :type snapshots_count: int
+    :param snapshots_count: How many snapshots are sent by each device
+
+    :rtype: dict
+    """
+    # pylint: disable=import-outside-toplevel
+    from django.conf import settings
+    from django.test.utils import override_settings
+
+    imports = []
+    with override_settings(BACKUP_IMPORT={**settings.BACKUP_IMPORT, 'MODE': 'inline'}):
+        for snapshot_index, device_index, snapshot_data in generator.snapshots(snapshots_count):
+            imports.append({
+                'snapshot': snapshot_index,
+                'device': device_index,
+                'packages': sum(len(library) for library in snapshot_data['libraries'].values()),
+                **measure_import(snapshot_data)
+            })
+    return {
+        'summary': {
+            'first_snapshots': summarize(
+                [measure for measure in imports if measure['snapshot'] == 0]),
+            'next_snapshots': summarize(
+                [measure for measure in imports if measure['snapshot'] > 0])
+        },
+        'imports': imports
+    }
+
+
+def main():
+    """
+    Runs the benchmark
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--devices", type=int, default=20, help="Devices count")
+    parser.add_argument("--packages", type=int, default=2000, help="Packages per device")
+    parser.add_argument("--snapshots", type=int, default=3, help="Snapshots per device")
+    parser.add_argument("--churn", type=float, default=0.05,
+                        help="Share of the packages upgraded between two snapshots")
+    parser.add_argument("--seed", type=int, default=0, help="Random generator seed")
+    parser.add_argument("--output", type=str, default=None, help="JSON output file")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings # pylint: disable=import-outside-toplevel
+
+    generator = FleetGenerator(args.devices, args.packages, args.churn, args.seed)
+    with benchmark_database():
+        write_results('fleet', {
+            'devices': args.devices,
+            'packages': args.packages,
+            'snapshots': args.snapshots,
+            'churn': args.churn,
+            'seed': args.seed,
+            'storage_mode': settings.BACKUP_IMPORT['STORAGE_MODE'],
+            'ingestion_backend': settings.BACKUP_IMPORT['INGESTION_BACKEND'],
+            **measure(generator, args.snapshots)
+        }, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Snapshot ingestion benchmark.
+Imports snapshots of 10k, 50k and 100k packages with each ingestion backend :
+
+* ``orm`` : Django ORM bulk statements
+* ``copy`` : ``COPY`` into staging tables merged with set-based SQL (Postgres only)
+
+Each size is imported twice on two devices : ``cold_s`` inserts every package and version,
+``warm_s`` only resolves already stored rows.
+
+Usage : ``python -m benchmarks.ingestion --sizes 10000 50000 100000``
+"""
+import argparse
+import time
+
+from benchmarks.utils import benchmark_database, setup_django, write_results
+
+
+def generate_snapshot(packages_count: int, prefix: str, hostname: str) -> dict:
+    """ Generates the snapshot data sent by a client
+
+    :type packages_count: int
+    :param packages_count: How many packages are installed on the device
+
+    :type prefix: str
+    :param prefix: Packages names prefix (distinct names for every measure)
+
+    :type hostname: str
+    :param hostname: Device name
+
+    :rtype: dict
+    """
+    return {
+        'hostname': hostname,
+        'specs': {'cores': 4, 'virtual_memory': 16, 'processor': 'Benchmark'},
+        'os': 'Linux',
+        'libraries': {
+            'apt': {
+                str(index): {'Package': f"{prefix}-{index}-dev", 'Version': f"1.{index % 7}"}
+                for index in range(packages_count)
+            }
+        }
+    }
+
+
+def measure_import(snapshot_data: dict) -> float:
+    """ Imports a snapshot, then returns the elapsed time (in seconds)
+
+    :type snapshot_data: dict
+    :param snapshot_data: Snapshot data sent by the client
+
+    :rtype: float
+    """
+    from data.consumers import SnapshotImportMixin # pylint: disable=import-outside-toplevel
+
+    class SilentImporter(SnapshotImportMixin):
+        """
+        Snapshot importer without any client
+        """
+
+        def send_message(self, status, **args):
+            pass
+
+    start = time.perf_counter()
+    if SilentImporter().import_snapshot(snapshot_data) is None:
+        raise RuntimeError("The benchmark import failed!")
+    return time.perf_counter() - start
+
+
+def measure(backend: str, sizes: list) -> dict:
+    """ Measures the imports of every size with an ingestion backend
+
+    :type backend: str
+    :param backend: ``orm`` or ``copy``
+
+    :type sizes: list
+    :param sizes: Packages counts
+
+    :rtype: dict
+    """
+    # pylint: disable=import-outside-toplevel
+    from django.conf import settings
+    from django.db import connection
+    from django.test.utils import override_settings
+
+    if backend == 'copy' and connection.vendor != 'postgresql':
+        return {'skipped': f"COPY is not available on {connection.vendor}"}
+    results = {}
+    with override_settings(BACKUP_IMPORT={**settings.BACKUP_IMPORT, 'INGESTION_BACKEND': backend}):
+        for size in sizes:
+            prefix = f"{backend}-{size}"
+            results[size] = {
+                'cold_s': measure_import(generate_snapshot(size, prefix, f"{prefix}-cold")),
+                'warm_s': measure_import(generate_snapshot(size, prefix, f"{prefix}-warm"))
+            }
+    return results
+
+
+def main():
+    """
+    Runs the benchmark
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000, 100000],
+                        help="Packages counts of the imported snapshots")
+    parser.add_argument("--output", type=str, default=None, help="JSON output file")
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_database():
+        write_results('ingestion', {
+            'orm': measure('orm', args.sizes),
+            'copy': measure('copy', args.sizes)
+        }, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+"""
+Fleet-wide package lookup benchmark.
+Fills the devices latest versions lookup table of a synthetic fleet (every device runs
+``--packages`` packages of a shared catalogue, at random versions), then measures :
+
+* ``refresh_ms`` : refresh of the lookup rows of a device once a new snapshot is imported
+* ``lookup_ms`` : ``packageDevices`` lookups (devices running a package below a version)
+
+Usage : ``python -m benchmarks.package_lookup --devices 10000 --packages 50 --lookups 200``
+"""
+import argparse
+import random
+import statistics
+import time
+
+from typing import List
+
+from benchmarks.utils import benchmark_database, setup_django, write_results
+
+VERSIONS_COUNT = 20
+"""
+Versions of each package of the catalogue (``1.0`` to ``1.19``)
+"""
+
+
+def percentiles(durations: List[float]) -> dict:
+    """ Summarizes durations (in milliseconds)
+
+    :type durations: List[float]
+    :param durations: Measured durations (in seconds)
+
+    :rtype: dict
+    """
+    durations = sorted(duration * 1000 for duration in durations)
+    return {
+        'mean': statistics.mean(durations),
+        'p50': durations[len(durations) // 2],
+        'p95': durations[min(len(durations) - 1, int(0.95 * len(durations)))],
+        'max': durations[-1]
+    }
+
+
+def create_fleet(devices_count: int, packages_count: int, rng: random.Random) -> list:
+    """ Creates the devices, their snapshot and lookup rows with bulk inserts.
+    Returns the created devices.
+
+    :type devices_count: int
+    :param devices_count: How many devices are in the fleet
+
+    :type packages_count: int
+    :param packages_count: How many packages are installed on each device
+
+    :type rng: random.Random
+    :param rng: Random generator
+
+    :rtype: list
+    """
+    # pylint: disable=import-outside-toplevel
+    from django.utils import timezone
+    from data.models import ChosenVersion, Device, DeviceLatestVersion, Package, Snapshot
+    from tools.versions import version_key
+
+    packages = Package.objects.bulk_create([
+        Package(name=f"package-{index}", type="apt", pre_install_lines="")
+        for index in range(2 * packages_count)
+    ])
+    versions = ChosenVersion.objects.bulk_create([
+        ChosenVersion(package=package, chosen_version=f"1.{minor}",
+                      version_key=version_key(f"1.{minor}"))
+        for package in packages for minor in range(VERSIONS_COUNT)
+    ])
+    devices = Device.objects.bulk_create([
+        Device(name=f"device-{index}", processor="Processor", cores=8, memory=16,
+               fingerprint=f"device-{index}")
+        for index in range(devices_count)
+    ])
+    snapshots = Snapshot.objects.bulk_create([
+        Snapshot(related_device=device, save_date=timezone.now(), operating_system="Linux")
+        for device in devices
+    ])
+    rows, links = [], []
+    for device, snapshot in zip(devices, snapshots):
+        device.latest_snapshot = snapshot
+        for package_index in rng.sample(range(len(packages)), packages_count):
+            version = versions[package_index * VERSIONS_COUNT + rng.randrange(VERSIONS_COUNT)]
+            links.append(Snapshot.versions.through(
+                snapshot_id=snapshot.id, chosenversion_id=version.id))
+            rows.append(DeviceLatestVersion(
+                device=device, package_id=version.package_id,
+                chosen_version=version, version_key=version.version_key))
+    Snapshot.versions.through.objects.bulk_create(links, batch_size=10000)
+    DeviceLatestVersion.objects.bulk_create(rows, batch_size=10000)
+    Device.objects.bulk_update(devices, ['latest_snapshot'], batch_size=10000)
+    return devices
+
+
+def measure_refresh(devices: list, samples: int, rng: random.Random) -> List[float]:
+    """ Imports a new snapshot (one package upgraded) on a sample of devices,
+    then measures the refresh of their lookup rows
+
+    :type devices: list
+    :param devices: Devices of the fleet
+
+    :type samples: int
+    :param samples: How many devices are refreshed
+
+    :type rng: random.Random
+    :param rng: Random generator
+
+    :rtype: List[float]
+    """
+    # pylint: disable=import-outside-toplevel
+    from django.utils import timezone
+    from data.models import ChosenVersion, DeviceLatestVersion, Snapshot
+
+    durations = []
+    for device in rng.sample(devices, min(samples, len(devices))):
+        previous = Snapshot.objects.filter(related_device=device).latest('id')
+        version_ids = previous.get_version_ids()
+        upgraded = ChosenVersion.objects.get(id=next(iter(version_ids)))
+        upgrade = ChosenVersion.objects.filter(package_id=upgraded.package_id).exclude(
+            id=upgraded.id).first()
+        snapshot = Snapshot.objects.create(
+            related_device=device, save_date=timezone.now(), operating_system="Linux")
+        snapshot.link_versions((version_ids - {upgraded.id}) | {upgrade.id})
+        start = time.perf_counter()
+        DeviceLatestVersion.refresh(device.id)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def measure_lookups(packages_count: int, lookups: int, rng: random.Random) -> dict:
+    """ Measures the lookups of the devices running a package below a random version
+
+    :type packages_count: int
+    :param packages_count: How many packages are installed on each device
+
+    :type lookups: int
+    :param lookups: How many lookups are measured
+
+    :type rng: random.Random
+    :param rng: Random generator
+
+    :rtype: dict
+    """
+    from data.schemas.package import PackageQuery # pylint: disable=import-outside-toplevel
+
+    durations, results = [], []
+    for _ in range(lookups):
+        name = f"package-{rng.randrange(2 * packages_count)}"
+        version = f"1.{rng.randrange(VERSIONS_COUNT)}"
+        start = time.perf_counter()
+        devices = PackageQuery.resolve_package_devices(
+            None, None, name, version_lt=version, first=10000)
+        durations.append(time.perf_counter() - start)
+        results.append(len(devices))
+    return {
+        'lookup_ms': percentiles(durations),
+        'devices_found_mean': statistics.mean(results)
+    }
+
+
+def main():
+    """
+    Runs the benchmark
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--devices", type=int, default=10000, help="Devices count")
+    parser.add_argument("--packages", type=int, default=50, help="Packages per device")
+    parser.add_argument("--lookups", type=int, default=200, help="Measured lookups")
+    parser.add_argument("--refreshes", type=int, default=50, help="Measured refreshes")
+    parser.add_argument("--seed", type=int, default=0, help="Random generator seed")
+    parser.add_argument("--output", type=str, default=None, help="JSON output file")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection # pylint: disable=import-outside-toplevel
+
+    rng = random.Random(args.seed)
+    with benchmark_database():
+        start = time.perf_counter()
+        devices = create_fleet(args.devices, args.packages, rng)
+        fill_time = time.perf_counter() - start
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE" if connection.vendor == 'postgresql' else "SELECT 1")
+        write_results('package_lookup', {
+            'devices': args.devices,
+            'packages': args.packages,
+            'rows': args.devices * args.packages,
+            'fill_s': fill_time,
+            'refresh_ms': percentiles(measure_refresh(devices, args.refreshes, rng)),
+            **measure_lookups(args.packages, args.lookups, rng)
+        }, args.output)
+
+
+if __name__ == '__main__':
+    main()
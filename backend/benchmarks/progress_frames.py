@@ -0,0 +1,129 @@
+"""
+Import progress protocol benchmark.
+Compares, for a single library import, the ``progress_bar`` frames sent by the server :
+
+* ``legacy`` : one double-encoded frame per package (protocol before the throttling)
+* ``throttled_per_package`` : throttled progress, advanced after each package
+* ``throttled_per_batch`` : throttled progress, advanced after each bulk batch
+  (as done by ``BackupImportConsumer``)
+
+Usage : ``python -m benchmarks.progress_frames --packages 5000``
+"""
+import argparse
+import json
+import time
+
+from typing import Callable, List
+
+from benchmarks.utils import setup_django, write_results
+
+
+def legacy_frames(packages_count: int, desc: str) -> List[str]:
+    """ Progress frames of the protocol before the throttling
+
+    :type packages_count: int
+    :param packages_count: How many packages are imported
+
+    :type desc: str
+    :param desc: Progress bar description
+
+    :rtype: List[str]
+    """
+    frames = [json.dumps({
+        'status': 'info',
+        'type': 'progress_bar',
+        'infos': json.dumps({'state': 'init', 'total': packages_count, 'desc': desc})
+    })]
+    for package_index in range(packages_count):
+        frames.append(json.dumps({
+            'status': 'info',
+            'type': 'progress_bar',
+            'infos': json.dumps({'state': 'update', 'index': str(package_index)})
+        }))
+    return frames
+
+
+def throttled_frames(packages_count: int, desc: str, step: int) -> List[str]:
+    """ Progress frames of the throttled protocol
+
+    :type packages_count: int
+    :param packages_count: How many packages are imported
+
+    :type desc: str
+    :param desc: Progress bar description
+
+    :type step: int
+    :param step: How many packages are processed between two progress advances
+
+    :rtype: List[str]
+    """
+    from data.progress import ProgressReporter # pylint: disable=import-outside-toplevel
+
+    progress = ProgressReporter.from_settings(total=packages_count, desc=desc)
+    frames = [json.dumps({'status': 'info', 'type': 'progress_bar', 'infos': progress.start()})]
+    for start in range(0, packages_count, step):
+        infos = progress.advance(min(step, packages_count - start))
+        if infos:
+            frames.append(json.dumps({'status': 'info', 'type': 'progress_bar', 'infos': infos}))
+    return frames
+
+
+def measure(generate_frames: Callable[[], List[str]], repeat: int) -> dict:
+    """ Measures the frames sent by the server alongside the CPU time needed
+    to encode them (server side) and to decode them (client side)
+
+    :type generate_frames: Callable[[], List[str]]
+    :param generate_frames: Progress frames generation function
+
+    :type repeat: int
+    :param repeat: How many times the measure is repeated (the CPU times are averaged)
+
+    :rtype: dict
+    """
+    server_cpu_time = 0
+    client_cpu_time = 0
+    for _ in range(repeat):
+        start = time.process_time()
+        frames = generate_frames()
+        server_cpu_time += time.process_time() - start
+
+        start = time.process_time()
+        for frame in frames:
+            infos = json.loads(frame)['infos']
+            if isinstance(infos, str):
+                json.loads(infos)
+        client_cpu_time += time.process_time() - start
+    return {
+        'frames': len(frames),
+        'bytes': sum(len(frame) for frame in frames),
+        'server_cpu_ms': 1000 * server_cpu_time / repeat,
+        'client_cpu_ms': 1000 * client_cpu_time / repeat
+    }
+
+
+def main():
+    """
+    Runs the benchmark
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--packages", type=int, default=5000, help="Imported packages count")
+    parser.add_argument("--repeat", type=int, default=20, help="Measures count")
+    parser.add_argument("--output", type=str, default=None, help="JSON output file")
+    args = parser.parse_args()
+
+    setup_django()
+    from data.models import BULK_BATCH_SIZE # pylint: disable=import-outside-toplevel
+
+    desc = 'apt packages import'
+    write_results('progress_frames', {
+        'packages': args.packages,
+        'legacy': measure(lambda: legacy_frames(args.packages, desc), args.repeat),
+        'throttled_per_package': measure(
+            lambda: throttled_frames(args.packages, desc, 1), args.repeat),
+        'throttled_per_batch': measure(
+            lambda: throttled_frames(args.packages, desc, BULK_BATCH_SIZE), args.repeat)
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
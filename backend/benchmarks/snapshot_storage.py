@@ -0,0 +1,138 @@
+"""
+Snapshot versions storage benchmark.
+Imports a series of nightly snapshots of a device (a few package upgrades between two
+snapshots) then compares, for each storage mode :
+
+* ``rows`` : rows stored in the versions through tables
+* ``write_ms`` : mean time needed to store the versions of a snapshot
+* ``read_ms`` : mean and maximum time needed to rebuild the versions of a snapshot
+
+Usage : ``python -m benchmarks.snapshot_storage --packages 3000 --snapshots 30``
+"""
+import argparse
+import random
+import statistics
+import time
+
+from typing import List
+
+from benchmarks.utils import benchmark_database, setup_django, write_results
+
+
+def generate_snapshots(packages_count: int, snapshots_count: int,
+                       upgrades: int) -> List[List[tuple]]:
+    """ Generates the ``(name, version)`` packages of consecutive snapshots.
+    Each snapshot upgrades a few random packages of the previous one.
+
+    :type packages_count: int
+    :param packages_count: How many packages are installed on the device
+
+    :type snapshots_count: int
+    :param snapshots_count: How many snapshots are generated
+
+    :type upgrades: int
+    :param upgrades: How many packages are upgraded between two snapshots
+
+    :rtype: List[List[tuple]]
+    """
+    rng = random.Random(0)
+    versions = [0] * packages_count
+    snapshots = []
+    for _ in range(snapshots_count):
+        snapshots.append([
+            (f"package_{index}", f"1.{version}") for index, version in enumerate(versions)
+        ])
+        for index in rng.sample(range(packages_count), upgrades):
+            versions[index] += 1
+    return snapshots
+
+
+def measure(storage_mode: str, snapshots: List[List[tuple]], checkpoint_interval: int) -> dict:
+    """ Stores the snapshots with a storage mode, then measures the stored rows
+    alongside the write and read latencies
+
+    :type storage_mode: str
+    :param storage_mode: ``full`` or ``delta``
+
+    :type snapshots: List[List[tuple]]
+    :param snapshots: Packages of every snapshot
+
+    :type checkpoint_interval: int
+    :param checkpoint_interval: Snapshots count between two full checkpoints
+
+    :rtype: dict
+    """
+    # pylint: disable=import-outside-toplevel
+    from django.conf import settings
+    from django.test.utils import override_settings
+    from django.utils import timezone
+
+    from data.models import ChosenVersion, Device, Snapshot
+
+    device = Device.objects.create(
+        name=f"{storage_mode}-device", cores=4, memory=16, processor="Benchmark")
+    write_times = []
+    with override_settings(BACKUP_IMPORT={
+        **settings.BACKUP_IMPORT,
+        'STORAGE_MODE': storage_mode,
+        'CHECKPOINT_INTERVAL': checkpoint_interval
+    }):
+        for packages in snapshots:
+            version_ids = ChosenVersion.resolve_library(packages, "apt")
+            snapshot = Snapshot.objects.create(
+                related_device=device, save_date=timezone.now(), operating_system="Linux")
+            start = time.perf_counter()
+            snapshot.store_versions(version_ids)
+            write_times.append(time.perf_counter() - start)
+
+    read_times = []
+    for snapshot in Snapshot.objects.filter(related_device=device):
+        start = time.perf_counter()
+        snapshot.get_version_ids()
+        read_times.append(time.perf_counter() - start)
+
+    device_snapshots = {'snapshot__related_device': device}
+    return {
+        'rows': sum(
+            through_model.objects.filter(**device_snapshots).count()
+            for through_model in (Snapshot.versions.through,
+                                  Snapshot.added_versions.through,
+                                  Snapshot.removed_versions.through)
+        ),
+        'write_ms': 1000 * statistics.mean(write_times),
+        'read_ms': {
+            'mean': 1000 * statistics.mean(read_times),
+            'max': 1000 * max(read_times)
+        }
+    }
+
+
+def main():
+    """
+    Runs the benchmark
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--packages", type=int, default=3000, help="Packages per snapshot")
+    parser.add_argument("--snapshots", type=int, default=30, help="Snapshots count")
+    parser.add_argument("--upgrades", type=int, default=10,
+                        help="Packages upgraded between two snapshots")
+    parser.add_argument("--checkpoint-interval", type=int, default=10,
+                        help="Snapshots count between two full checkpoints (delta mode)")
+    parser.add_argument("--output", type=str, default=None, help="JSON output file")
+    args = parser.parse_args()
+
+    setup_django()
+    snapshots = generate_snapshots(args.packages, args.snapshots, args.upgrades)
+    with benchmark_database():
+        write_results('snapshot_storage', {
+            'packages': args.packages,
+            'snapshots': args.snapshots,
+            'upgrades': args.upgrades,
+            'checkpoint_interval': args.checkpoint_interval,
+            'full': measure('full', snapshots, args.checkpoint_interval),
+            'delta': measure('delta', snapshots, args.checkpoint_interval)
+        }, args.output)
+
+
+if __name__ == '__main__':
+    main()
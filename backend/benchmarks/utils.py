@@ -0,0 +1,50 @@
+import json
+import os
+import sys
+
+from contextlib import contextmanager
+
+import django
+
+
+def setup_django():
+    """
+    Loads the django project (``server.settings`` unless ``DJANGO_SETTINGS_MODULE`` is set).
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'server.settings')
+    django.setup()
+
+
+@contextmanager
+def benchmark_database():
+    """
+    Runs the benchmark on a throwaway test database (the project database is left untouched).
+    """
+    from django.db import connection # pylint: disable=import-outside-toplevel
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def write_results(name: str, results: dict, output: str = None):
+    """ Writes the benchmark results as JSON, either in a file or in the standard output
+
+    :type name: str
+    :param name: Benchmark name
+
+    :type results: dict
+    :param results: Measured values
+
+    :type output: str
+    :param output: Output file path (standard output if not set)
+    """
+    payload = json.dumps({'benchmark': name, 'results': results}, indent=4)
+    if output:
+        with open(output, 'w', encoding='utf-8') as output_file:
+            output_file.write(payload)
+    else:
+        sys.stdout.write(payload + "\n")
@@ -6,3 +6,9 @@ class DataConfig(AppConfig):
     """
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'data'
+
+    def ready(self):
+        """
+        Connects the GraphQL responses cache invalidation receivers
+        """
+        from . import response_cache # pylint: disable=import-outside-toplevel,unused-import
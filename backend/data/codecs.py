@@ -0,0 +1,136 @@
+import json
+import zlib
+
+from typing import List
+
+from django.conf import settings
+
+try:
+    import msgpack
+except ImportError: # pragma: no cover
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError: # pragma: no cover
+    zstandard = None
+
+DEFAULT_ENCODING = "json+gzip"
+"""
+Encoding of the binary frames sent without any negotiation
+"""
+
+DECOMPRESSION_ERRORS = (zlib.error, EOFError) + ((zstandard.ZstdError,) if zstandard else ())
+"""
+Errors raised by the decompression libraries on corrupted payloads
+"""
+
+
+class PayloadDecodingError(ValueError):
+    """
+    Raised when a binary payload cannot be decoded
+    """
+
+
+def supported_encodings() -> List[str]:
+    """ Returns the binary payload encodings supported by the server,
+    sorted by preference (``<serialisation>+<compression>``)
+
+    :rtype: List[str]
+    """
+    serialisations = (["msgpack"] if msgpack else []) + ["json"]
+    compressions = (["zstd"] if zstandard else []) + ["gzip", "identity"]
+    return [
+        f"{serialisation}+{compression}"
+        for serialisation in serialisations
+        for compression in compressions
+    ]
+
+
+def negotiate_encoding(client_encodings: List[str]) -> str:
+    """ Chooses the first encoding supported by the server in the client encodings
+
+    :type client_encodings: List[str]
+    :param client_encodings: Encodings supported by the client, sorted by preference
+
+    :raises: PayloadDecodingError No common encoding has been found
+
+    :rtype: str
+    """
+    server_encodings = supported_encodings()
+    for encoding in client_encodings:
+        if encoding in server_encodings:
+            return encoding
+    raise PayloadDecodingError(
+        f"No supported encoding found! The server supports {', '.join(server_encodings)}."
+    )
+
+
+def _decompress(payload: bytes, compression: str, max_size: int) -> bytes:
+    """ Decompresses a payload. The decompressed size is bounded by ``max_size``
+
+    :type payload: bytes
+    :param payload: Compressed payload
+
+    :type compression: str
+    :param compression: Compression algorithm (``identity``, ``gzip`` or ``zstd``)
+
+    :type max_size: int
+    :param max_size: Maximum size of the decompressed payload (in bytes)
+
+    :raises: PayloadDecodingError The payload cannot be decompressed or is too large
+
+    :rtype: bytes
+    """
+    try:
+        match compression:
+            case "identity":
+                raw = payload
+            case "gzip":
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                raw = decompressor.decompress(payload, max_size + 1)
+                if not decompressor.eof and len(raw) <= max_size:
+                    raise EOFError("Truncated gzip payload")
+            case "zstd" if zstandard:
+                # The output is bounded by the frame content size (if set in its header)
+                # or by ``max_output_size``, incomplete frames raise a ZstdError
+                if zstandard.frame_content_size(payload) > max_size:
+                    raise PayloadDecodingError(
+                        f"The payload exceeds {max_size} bytes once decompressed!")
+                raw = zstandard.ZstdDecompressor().decompress(
+                    payload, max_output_size=max_size + 1)
+            case _:
+                raise PayloadDecodingError(f"Unsupported compression {compression}!")
+    except DECOMPRESSION_ERRORS as error:
+        raise PayloadDecodingError(f"Invalid {compression} payload!") from error
+    if len(raw) > max_size:
+        raise PayloadDecodingError(f"The payload exceeds {max_size} bytes once decompressed!")
+    return raw
+
+
+def decode_payload(payload: bytes, encoding: str = DEFAULT_ENCODING) -> dict:
+    """ Decodes a binary frame sent by the client
+
+    :type payload: bytes
+    :param payload: Binary frame content
+
+    :type encoding: str
+    :param encoding: Negotiated encoding (``<serialisation>+<compression>``)
+
+    :raises: PayloadDecodingError The payload cannot be decoded
+
+    :rtype: dict
+    """
+    serialisation, _, compression = encoding.partition("+")
+    raw = _decompress(
+        payload, compression or "identity", settings.BACKUP_IMPORT['MAX_PAYLOAD_SIZE'])
+    try:
+        match serialisation:
+            case "json":
+                return json.loads(raw)
+            case "msgpack" if msgpack:
+                return msgpack.unpackb(raw, raw=False, strict_map_key=False)
+    except ValueError as error:
+        raise PayloadDecodingError(f"Invalid {serialisation} payload!") from error
+    raise PayloadDecodingError(f"Unsupported serialisation {serialisation}!")
+
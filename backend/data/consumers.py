@@ -1,41 +1,232 @@
 import json
+import logging
+import uuid
 
-from typing import Literal
+from contextlib import nullcontext
+from typing import List, Literal, Optional, Tuple
 
-from channels.generic.websocket import WebsocketConsumer
+from asgiref.sync import ThreadSensitiveContext, async_to_sync, sync_to_async
+from channels.consumer import SyncConsumer
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer, WebsocketConsumer
 
+from django.conf import settings
+from django.db import DatabaseError, transaction
 from django.utils import timezone
-from django.core.exceptions import ObjectDoesNotExist
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
 
+from .codecs import DEFAULT_ENCODING, PayloadDecodingError, decode_payload, negotiate_encoding
+from .ingestion import ingestion_batch_size
+from .progress import ProgressReporter
 
 
-class BackupImportConsumer(WebsocketConsumer):
+class SnapshotImportMixin:
     """
-    Websocket communication class
+    Snapshot import operations shared by the websocket consumers and the import worker.
+    The class using it must implement ``send_message``.
     """
 
-    def connect(self):
-        """ Connect the client to the database.
-        Check if user is connected before.
-        """
-        self.accept()
-        self.send("Connected!")
+    encoding = DEFAULT_ENCODING
+    """
+    Encoding of the binary frames sent by the client (see ``data.codecs``)
+    """
 
     def send_message(self, status: Literal['error', 'info', 'warning', 'success'], **args):
-        """ Sends a message to the connected client
+        """ Sends a message to the client importing the snapshot
         :type status: Literal
         :param status: Operation status (either ``error``, ``warning``, ``info``, ``success``)
 
         :type **args: dict
         :param **args: Extra arguments for the message
         """
-        self.send(
-            json.dumps(
-                {
-                    'status': status,
-                    **args
-                }
-            )
+        raise NotImplementedError("The snapshot import messages sending is not set!")
+
+    @staticmethod
+    def encode_message(status: Literal['error', 'info', 'warning', 'success'], **args) -> str:
+        """ Encodes a message sent to the client as a JSON text frame
+        :type status: Literal
+        :param status: Operation status (either ``error``, ``warning``, ``info``, ``success``)
+
+        :type **args: dict
+        :param **args: Extra arguments for the message
+
+        :rtype: str
+        """
+        return json.dumps(
+            {
+                'status': status,
+                **args
+            }
+        )
+
+    def decode_frame(self, text_data: Optional[str] = None,
+                     bytes_data: Optional[bytes] = None) -> Optional[dict]:
+        """ Decodes a frame sent by the client (JSON text, or binary frame with the
+        negotiated encoding). If the frame cannot be decoded (or is not an object),
+        an error is sent and ``None`` is returned.
+
+        :type text_data: Optional[str]
+        :param text_data: JSON data sent by the client
+
+        :type bytes_data: Optional[bytes]
+        :param bytes_data: Compressed data sent by the client (negotiated encoding)
+
+        :rtype: Optional[dict]
+        """
+        try:
+            if bytes_data is None:
+                frame = json.loads(text_data)
+            else:
+                frame = decode_payload(bytes_data, self.encoding)
+        except ValueError as error:
+            # PayloadDecodingError and JSONDecodeError are both ValueError
+            message = str(error) if isinstance(error, PayloadDecodingError) \
+                else "Invalid JSON frame!"
+            self.send_message(status='error', type='end', message=message)
+            return None
+        if not isinstance(frame, dict):
+            self.send_message(status='error', type='end', message="The frame must be an object.")
+            return None
+        return frame
+
+    def set_encoding(self, frame: dict):
+        """ Negotiates the encoding of the next binary frames sent by the client.
+        The chosen encoding is sent back to the client.
+
+        :type frame: dict
+        :param frame: Negotiation frame (client encodings set in ``encodings``)
+
+        :returns: Whether a common encoding has been found
+        """
+        try:
+            self.encoding = negotiate_encoding(frame['encodings'])
+        except PayloadDecodingError as error:
+            self.send_message(status='error', type='end', message=str(error))
+            return False
+        self.send_message(status='info', type='encoding', encoding=self.encoding)
+        return True
+
+    def receive_protocol_frame(self, frame: dict) -> Optional[int]:
+        """ Manages a frame carrying an ``action`` : encoding negotiation
+        or chunked upload protocol (see ``receive_upload_frame``)
+
+        :type frame: dict
+        :param frame: Frame sent by the client
+
+        :returns: Websocket close code (``None`` if the connection should be kept open)
+        """
+        if frame['action'] == 'negotiate':
+            return None if self.set_encoding(frame) else 4000
+        return None if self.receive_upload_frame(frame) else 4004
+
+    @staticmethod
+    def validate_snapshot_data(snapshot_data: dict):
+        """ Checks the structure of the snapshot data sent by the client
+
+        :type snapshot_data: dict
+        :param snapshot_data: Raw snapshot data sent by the client
+
+        :raises: ValidationError The snapshot data is malformed
+        """
+        if not isinstance(snapshot_data, dict):
+            raise ValidationError("The snapshot data must be an object.")
+        for key in ('hostname', 'specs', 'os', 'libraries'):
+            if key not in snapshot_data:
+                raise ValidationError(f"The snapshot field '{key}' is missing.")
+        for key in ('cores', 'virtual_memory', 'processor'):
+            if key not in snapshot_data['specs']:
+                raise ValidationError(f"The device specification '{key}' is missing.")
+        if not isinstance(snapshot_data['libraries'], dict):
+            raise ValidationError("The snapshot libraries must be an object.")
+        for library_name, library in snapshot_data['libraries'].items():
+            if not isinstance(library, dict) or not all(
+                isinstance(package, dict) and 'Package' in package and 'Version' in package
+                for package in library.values()
+            ):
+                raise ValidationError(f"The library '{library_name}' is malformed.")
+        if not all(
+            isinstance(repository, dict) and 'name' in repository and 'lines' in repository
+            for repository in snapshot_data.get('repositories', [])
+        ):
+            raise ValidationError("The snapshot repositories are malformed.")
+
+    @staticmethod
+    def validate_upload_frame(frame: dict):
+        """ Checks the structure of a chunked upload frame (``chunk``, ``resume`` or ``commit``)
+
+        :type frame: dict
+        :param frame: Frame sent by the client
+
+        :raises: ValidationError The frame is malformed
+        """
+        if not isinstance(frame.get('upload_id'), str):
+            raise ValidationError("The upload ID is missing.")
+        if frame['action'] == 'chunk':
+            if not isinstance(frame.get('index'), int) or not isinstance(frame.get('library'), str):
+                raise ValidationError("The chunk index or library is missing.")
+            if not isinstance(frame.get('packages'), dict) or not all(
+                isinstance(package, dict) and 'Package' in package and 'Version' in package
+                for package in frame['packages'].values()
+            ):
+                raise ValidationError(f"The chunk {frame['index']} is malformed.")
+        elif frame['action'] == 'commit' and not isinstance(frame.get('chunks'), int):
+            raise ValidationError("The upload chunks count is missing.")
+
+    def check_snapshot_data(self, snapshot_data: dict) -> bool:
+        """ Validates the snapshot data sent by the client (see ``validate_snapshot_data``).
+        If malformed, an error frame is sent.
+
+        :type snapshot_data: dict
+        :param snapshot_data: Raw snapshot data sent by the client
+
+        :returns: Whether the snapshot data is valid
+        """
+        try:
+            self.validate_snapshot_data(snapshot_data)
+        except ValidationError as error:
+            self.send_message(status='error', type='end', message=error.message)
+            return False
+        return True
+
+    @staticmethod
+    def is_batched_import(snapshot_data: dict) -> bool:
+        """ Whether the snapshot is too large to be imported in a single transaction
+        (more packages than ``BACKUP_IMPORT['ATOMIC_MAX_PACKAGES']``). The packages are then
+        committed by batches before the snapshot rows are inserted in a single transaction.
+
+        :type snapshot_data: dict
+        :param snapshot_data: Raw snapshot data sent by the client
+
+        :rtype: bool
+        """
+        packages_count = sum(len(library) for library in snapshot_data['libraries'].values())
+        return packages_count > settings.BACKUP_IMPORT['ATOMIC_MAX_PACKAGES']
+
+    def send_import_error(self, error: Exception):
+        """ Sends the error frame ending a failed import. The import transaction has been
+        rolled back : the client can send the snapshot again (database errors only).
+
+        :type error: Exception
+        :param error: Error raised during the import
+        """
+        # pylint: disable=import-outside-toplevel
+        from .models import ChosenVersion, Device
+
+        logging.error("Snapshot import failed", exc_info=error)
+        # The cached primary keys may refer to rows rolled back or deleted by another process
+        ChosenVersion.clear_cache()
+        Device.clear_cache()
+        is_database_error = isinstance(error, DatabaseError)
+        self.send_message(
+            status='error',
+            type='end',
+            message='The snapshot import failed! Nothing has been saved, '
+                    'the snapshot can be sent again.',
+            error={
+                'code': 'database_error' if is_database_error else 'internal_error',
+                'exception': error.__class__.__name__,
+                'retryable': is_database_error
+            }
         )
 
     def append_new_device(self, device_infos: dict):
@@ -49,41 +240,50 @@ class BackupImportConsumer(WebsocketConsumer):
 
     def append_libraries_chosen_version(self, packages: dict, library_name: str):
         """ Append every libraries chosen version to the database
+
         :type packages: dict
-        :param packages:
+        :param packages: Packages of the library, indexed by their position
 
         :type library_name: str
         :param library_name: Name of the library
 
-        :type device: Device
-        :param device: COmputer equipement performing the save
+        :returns: Primary keys of the chosen versions
         """
-        infos = {
-            'state': 'init',
-            'total': len(packages),
-            'desc': f'{library_name} packages import'
-        }
-
-        self.send_message(status='info', type='progress_bar',
-                          infos=json.dumps(infos))
+        progress = ProgressReporter.from_settings(
+            total=len(packages), desc=f'{library_name} packages import')
+        self.send_message(status='info', type='progress_bar', infos=progress.start())
 
+        libraries = [(data['Package'], data['Version']) for data in packages.values()]
         versions = []
-        for package_index in packages:
-            data = packages[package_index]
-            versions.append(
-                self.append_library(
-                    data['Package'], data['Version'], library_name)
-            )
-
-            self.send_message(
-                status='info',
-                type='progress_bar',
-                infos=json.dumps(
-                    {'state': 'update', 'index': package_index})
-            )
+        batch_size = ingestion_batch_size()
+        for start in range(0, len(libraries), batch_size):
+            batch = libraries[start:start+batch_size]
+            # Committed by batch unless the whole import runs in a transaction
+            with transaction.atomic(savepoint=False):
+                versions.extend(self.append_libraries(batch, library_name))
+            infos = progress.advance(len(batch))
+            if infos:
+                self.send_message(status='info', type='progress_bar', infos=infos)
 
         return versions
 
+    def append_libraries(self, libraries: List[Tuple[str, str]], package_type: str) -> List[int]:
+        """ Append a whole library group alongside the packages inside the database.
+        Every ``(name, type)`` and ``(package, chosen_version)`` pair is resolved with
+        set-based statements, only the missing rows are inserted.
+
+        :type libraries: List[Tuple[str, str]]
+        :param libraries: ``(package name, version)`` pairs (e.g. ``("curl", "1.0.5")``)
+
+        :type package_type: str
+        :param package_type: Type of package (e.g. ``snap package``, ``apt package``)
+
+        :returns: Primary keys of the chosen versions, in the same order as ``libraries``
+        """
+        from .models import ChosenVersion # pylint: disable=import-outside-toplevel
+
+        return ChosenVersion.resolve_library(libraries, package_type)
+
     def append_library(self, package_name: str, version: str, package_type: str):
         """ Append library alongside the package inside the database
 
@@ -96,24 +296,12 @@ class BackupImportConsumer(WebsocketConsumer):
         :type package_type: str
         :param package_type: Type of package (e.g. ``snap package``, ``apt package``)
 
-        :type device: Device
-        :param device: Related package
+        :rtype: ChosenVersion
         """
-        from .models import Package, ChosenVersion # pylint: disable=import-outside-toplevel
+        from .models import ChosenVersion # pylint: disable=import-outside-toplevel
 
-        try:
-            package = Package.objects.get(name=package_name, type=package_type)
-        except ObjectDoesNotExist as _:
-            package = Package.objects.create(
-                name=package_name, type=package_type)
-        try:
-            version = ChosenVersion.objects.get(
-                package=package, chosen_version=version)
-            return version
-        except ObjectDoesNotExist as _:
-            version = ChosenVersion.objects.create(
-                package=package, chosen_version=version)
-            return version
+        version_id = self.append_libraries([(package_name, version)], package_type)[0]
+        return ChosenVersion.objects.get(id=version_id)
 
     def add_repository(self, repository: dict):
         """
@@ -123,16 +311,7 @@ class BackupImportConsumer(WebsocketConsumer):
         """
         from .models import Repository # pylint: disable=import-outside-toplevel
 
-        try:
-            return Repository.objects.get(
-                name=repository['name'],
-                sources_lines=repository['lines']
-            )
-        except ObjectDoesNotExist:
-            return Repository.objects.create(
-                name=repository['name'],
-                sources_lines=repository['lines']
-            )
+        return Repository.find_or_create(repository)
 
     def init_device(self, device_data: str):
         """ Finds the device linked to the snapshot currently being created.
@@ -144,31 +323,61 @@ class BackupImportConsumer(WebsocketConsumer):
         :rtype: Device
         """
         from .models import Device # pylint: disable=import-outside-toplevel
-        try:
+        self.send_message(
+            status='info',
+            message='Fetching the device...',
+            type='message'
+        )
+        device, created = Device.find_or_create(Device.get_device_infos(device_data))
+        self.send_message(status='info',
+                          type='message',
+                          message='No device found! Adding a new one!' if created
+                          else 'Device found!')
+        return device
+
+    def init_shared_snapshot(self, snapshot_data: dict, device, hashes: dict):
+        """ Creates a snapshot sharing the content of a previous identical snapshot
+        of the device. Returns ``None`` if no identical snapshot is found.
+
+        :type snapshot_data: dict
+        :param snapshot_data: Raw snapshot data sent by the user
+
+        :type device: Device
+        :param device: Related device object
+
+        :type hashes: dict
+        :param hashes: Content and repositories hashes of the snapshot
+
+        :returns: Snapshot
+        """
+        from .models import Snapshot # pylint: disable=import-outside-toplevel
+        snapshot = Snapshot.share_identical(device, snapshot_data['os'], hashes)
+        if snapshot is not None:
             self.send_message(
                 status='info',
-                message='Fetching the device...',
-                type='message'
+                type='message',
+                message=f'Identical to the snapshot {snapshot.shared_snapshot_id}! '
+                        'Sharing its content'
             )
-            device_infos = {
-                'name': device_data['hostname'],
-                'cores': device_data['specs']['cores'],
-                'memory': device_data['specs']['virtual_memory'],
-                'processor': device_data['specs']['processor']
-            }
-            device = Device.objects.get(**device_infos)
-            self.send_message(status='info',
-                              type='message',
-                              message='Device found!')
-            return device
-        except ObjectDoesNotExist as _:
-            device = self.append_new_device(device_infos)
-            self.send_message(status='info',
-                              type='message',
-                              message='No device found! Adding a new one!')
-            return device
+        return snapshot
+
+    def resolve_versions(self, snapshot_data: dict) -> List[int]:
+        """ Returns the chosen versions primary keys of every library of the snapshot,
+        inserting the missing packages and versions
+
+        :type snapshot_data: dict
+        :param snapshot_data: Raw snapshot data sent by the user
 
-    def init_snapshot(self, snapshot_data: str, device):
+        :rtype: List[int]
+        """
+        versions = []
+        for library_type, library in snapshot_data['libraries'].items():
+            versions.extend(self.append_libraries_chosen_version(
+                library, library_type))
+        return versions
+
+    def init_snapshot(self, snapshot_data: str, device, hashes: Optional[dict] = None,
+                      versions: Optional[List[int]] = None):
         """ Creates a new snapshot object alongside the softwares
 
         :type device_data: str
@@ -177,23 +386,235 @@ class BackupImportConsumer(WebsocketConsumer):
         :type device: Device
         :param device: Related device object
 
+        :type hashes: Optional[dict]
+        :param hashes: Content and repositories hashes of the snapshot
+
+        :type versions: Optional[List[int]]
+        :param versions: Chosen versions primary keys (resolved from the data if not set)
+
         :returns: Snapshot
         """
         from .models import Snapshot # pylint: disable=import-outside-toplevel
+        if versions is None:
+            versions = self.resolve_versions(snapshot_data)
         snapshot = Snapshot.objects.create(
             related_device=device,
             save_date=timezone.now(),
-            operating_system=snapshot_data['os']
+            operating_system=snapshot_data['os'],
+            **(hashes or {})
         )
-        for library_type in enumerate(snapshot_data['libraries']):
-            library = snapshot_data['libraries'][library_type[1]]
-            versions = self.append_libraries_chosen_version(
-                library, library_type[1])
-            for lib_version in versions:
-                snapshot.versions.add(lib_version)
-            snapshot.save()
+        snapshot.store_versions(versions)
+        return snapshot
+
+    def create_snapshot(self, snapshot_data: dict, device, hashes: dict, versions: List[int]):
+        """ Inserts the snapshot rows (versions and repositories) in a single transaction
+
+        :type snapshot_data: dict
+        :param snapshot_data: Raw snapshot data sent by the user
+
+        :type device: Device
+        :param device: Related device object
+
+        :type hashes: dict
+        :param hashes: Content and repositories hashes of the snapshot
+
+        :type versions: List[int]
+        :param versions: Chosen versions primary keys
+
+        :returns: Snapshot
+        """
+        with transaction.atomic(savepoint=False):
+            snapshot = self.init_snapshot(snapshot_data, device, hashes, versions)
+            self.set_repositories(snapshot_data, snapshot)
         return snapshot
 
+    def import_snapshot(self, snapshot_data: dict):
+        """ Imports the whole snapshot sent by the client in a single transaction.
+        Large snapshots (see ``is_batched_import``) commit their packages by batches,
+        the snapshot rows are still inserted in a single transaction.
+        If the snapshot data is malformed or the import fails, an error frame is sent
+        and ``None`` is returned.
+
+        :type snapshot_data: dict
+        :param snapshot_data: Raw snapshot data sent by the client
+
+        :rtype: Snapshot
+        """
+        # pylint: disable=import-outside-toplevel
+        from .models import ChosenVersion, DeviceLatestVersion, Snapshot
+        if not self.check_snapshot_data(snapshot_data):
+            return None
+        try:
+            with nullcontext() if self.is_batched_import(snapshot_data) \
+                    else transaction.atomic():
+                device = self.init_device(snapshot_data)
+                hashes = Snapshot.get_hashes(snapshot_data)
+                snapshot = self.init_shared_snapshot(snapshot_data, device, hashes)
+                if snapshot is None:
+                    self.send_message(status='info', type='message',
+                                      message='Appending libraries to the database!')
+                    snapshot = self.create_snapshot(
+                        snapshot_data, device, hashes, self.resolve_versions(snapshot_data))
+                DeviceLatestVersion.refresh(device.id)
+        except DatabaseError as error:
+            self.send_import_error(error)
+            return None
+        logging.debug("Interning caches usage: %s", ChosenVersion.cache_stats())
+        self.send_message(status='info', type='end',
+                          message='End of data added!')
+        return snapshot
+
+    def send_upload_state(self, snapshot):
+        """ Sends the chunked upload state to the client (ID and last acknowledged chunk)
+
+        :type snapshot: Snapshot
+        :param snapshot: Snapshot created by the upload
+        """
+        self.send_message(status='info', type='upload',
+                          upload_id=str(snapshot.upload_id),
+                          last_chunk=snapshot.last_chunk)
+
+    def find_upload(self, upload_id: str):
+        """ Finds the snapshot created by a chunked upload.
+        If not set, an error is sent to the client and ``None`` is returned.
+
+        :type upload_id: str
+        :param upload_id: ID of the chunked upload
+
+        :rtype: Snapshot
+        """
+        from .models import Snapshot # pylint: disable=import-outside-toplevel
+        try:
+            return Snapshot.objects.get(upload_id=upload_id)
+        except (ObjectDoesNotExist, ValidationError) as _:
+            self.send_message(status='error', type='end',
+                              message=f"Unknown upload {upload_id}!")
+            return None
+
+    def start_upload(self, header: dict) -> bool:
+        """ Starts a chunked upload : creates the device (if not set), the snapshot
+        and its repositories. The snapshot stays incomplete until the upload is committed.
+
+        :type header: dict
+        :param header: Snapshot data sent by the client, without the libraries
+
+        :returns: Whether the upload has been started
+        """
+        from .models import Snapshot # pylint: disable=import-outside-toplevel
+        try:
+            self.validate_snapshot_data({**header, 'libraries': {}})
+        except ValidationError as error:
+            self.send_message(status='error', type='end', message=error.message)
+            return False
+        device = self.init_device(header)
+        snapshot = Snapshot.objects.create(
+            related_device=device,
+            save_date=timezone.now(),
+            operating_system=header['os'],
+            upload_id=uuid.uuid4(),
+            is_complete=False
+        )
+        self.set_repositories(header, snapshot)
+        self.send_upload_state(snapshot)
+        return True
+
+    def append_upload_chunk(self, chunk: dict) -> bool:
+        """ Ingests a libraries chunk of a chunked upload, then acknowledges it.
+        Chunks must be sent in order : a chunk already acknowledged (or sent too early)
+        is skipped and the upload state is sent back so the client resumes from it.
+
+        :type chunk: dict
+        :param chunk: Chunk data (``upload_id``, ``index``, ``library`` and ``packages``)
+
+        :returns: Whether the upload is still running
+        """
+        from .models import Snapshot # pylint: disable=import-outside-toplevel
+        snapshot = self.find_upload(chunk['upload_id'])
+        if snapshot is None:
+            return False
+        if snapshot.is_complete or chunk['index'] != snapshot.last_chunk + 1:
+            self.send_upload_state(snapshot)
+            return True
+        with transaction.atomic():
+            snapshot.link_versions(self.append_libraries(
+                [(data['Package'], data['Version']) for data in chunk['packages'].values()],
+                chunk['library']
+            ))
+            Snapshot.objects.filter(id=snapshot.id).update(last_chunk=chunk['index'])
+        self.send_message(status='info', type='ack', index=chunk['index'])
+        return True
+
+    def commit_upload(self, upload_id: str, chunks: int):
+        """ Ends a chunked upload once every chunk has been acknowledged, the snapshot
+        is then complete and its versions are stored with the configured storage mode.
+        An incomplete upload is kept (it can still be resumed) and an error is sent.
+        A repeated commit (e.g. the end frame was lost) is only answered again.
+
+        :type upload_id: str
+        :param upload_id: ID of the chunked upload
+
+        :type chunks: int
+        :param chunks: Chunks count sent by the client
+        """
+        snapshot = self.find_upload(upload_id)
+        if snapshot is None:
+            return
+        if snapshot.is_complete:
+            self.send_message(status='info', type='end',
+                              message='End of data added!')
+            return
+        if snapshot.last_chunk != chunks - 1:
+            self.send_message(
+                status='error', type='end',
+                message=f"The upload {upload_id} is incomplete : "
+                        f"{snapshot.last_chunk + 1} of {chunks} chunks received!")
+            return
+        from .models import DeviceLatestVersion # pylint: disable=import-outside-toplevel
+        with transaction.atomic():
+            snapshot.is_complete = True
+            snapshot.save(update_fields=['is_complete'])
+            snapshot.update_hashes()
+            snapshot.compact_versions()
+            DeviceLatestVersion.refresh(snapshot.related_device_id)
+        self.send_message(status='info', type='end',
+                          message='End of data added!')
+
+    def receive_upload_frame(self, frame: dict) -> bool:
+        """ Manages a frame of the chunked upload protocol :
+
+        * ``header`` : snapshot data without the libraries, answered with the upload ID
+        * ``chunk`` : libraries chunk, answered with an acknowledgement
+        * ``resume`` : answered with the last acknowledged chunk of the upload
+        * ``commit`` : ends the upload (the chunks count is set in ``chunks``)
+
+        :type frame: dict
+        :param frame: Frame sent by the client (the frame type is set in ``action``)
+
+        :returns: Whether the connection should be kept open
+        """
+        if frame['action'] in ('chunk', 'resume', 'commit'):
+            try:
+                self.validate_upload_frame(frame)
+            except ValidationError as error:
+                self.send_message(status='error', type='end', message=error.message)
+                return False
+        match frame['action']:
+            case 'header':
+                return self.start_upload(frame)
+            case 'chunk':
+                return self.append_upload_chunk(frame)
+            case 'resume':
+                snapshot = self.find_upload(frame['upload_id'])
+                if snapshot is not None:
+                    self.send_upload_state(snapshot)
+                return snapshot is not None
+            case 'commit':
+                self.commit_upload(frame['upload_id'], frame['chunks'])
+                return False
+        self.send_message(status='error', type='end',
+                          message=f"Unknown action {frame['action']}!")
+        return False
+
     def set_repositories(self, snapshot_data: str, snapshot):
         """ Add install types to the snapshot if set in the device raw data
 
@@ -203,13 +624,13 @@ class BackupImportConsumer(WebsocketConsumer):
         :type snapshot: Snapshot
         :param snapshot: Created snapshot object in previous operation
         """
+        from .models import Repository # pylint: disable=import-outside-toplevel
         try:
             self.send_message(status='info',
                               type='message',
                               message=f"Found {len(snapshot_data['repositories'])}")
-            for _, repository in enumerate(snapshot_data['repositories']):
-                repository = self.add_repository(repository)
-                snapshot.repositories.add(repository)
+            snapshot.link_repositories(
+                Repository.resolve_all(snapshot_data['repositories']))
         except KeyError as _:
             self.send_message(
                 status='info',
@@ -217,6 +638,82 @@ class BackupImportConsumer(WebsocketConsumer):
                 message='No repository found! Skipping the operation'
             )
 
+
+
+class BackupImportConsumer(SnapshotImportMixin, WebsocketConsumer):
+    """
+    Websocket communication class
+    """
+
+    group_name = None
+    """
+    Channel layer group receiving the events of the queued import
+    """
+
+    def connect(self):
+        """ Connect the client to the database.
+        Check if user is connected before.
+        """
+        self.accept()
+        self.send("Connected!")
+
+    def disconnect(self, code):
+        """ Leaves the queued import group (if any) once the client is disconnected
+
+        :type code: int
+        :param code: Websocket close code
+        """
+        if self.group_name:
+            async_to_sync(self.channel_layer.group_discard)(
+                self.group_name, self.channel_name)
+
+    def send_message(self, status: Literal['error', 'info', 'warning', 'success'], **args):
+        """ Sends a message to the connected client
+        :type status: Literal
+        :param status: Operation status (either ``error``, ``warning``, ``info``, ``success``)
+
+        :type **args: dict
+        :param **args: Extra arguments for the message
+        """
+        self.send(self.encode_message(status, **args))
+
+    def queue_import(self, snapshot_data: dict):
+        """ Validates the snapshot data, then queues its import on the import workers.
+        The job id is sent back to the client, the import events are forwarded
+        through the job channel layer group.
+
+        :type snapshot_data: dict
+        :param snapshot_data: Raw snapshot data sent by the client
+        """
+        if not self.check_snapshot_data(snapshot_data):
+            self.close(4000)
+            return
+        job_id = uuid.uuid4().hex
+        self.group_name = f"snapshot_import_{job_id}"
+        async_to_sync(self.channel_layer.group_add)(self.group_name, self.channel_name)
+        async_to_sync(self.channel_layer.send)(
+            settings.BACKUP_IMPORT['WORKER_CHANNEL'],
+            {
+                'type': 'snapshot.import',
+                'job_id': job_id,
+                'group': self.group_name,
+                'snapshot_data': snapshot_data
+            }
+        )
+        self.send_message(status='info', type='job', job_id=job_id,
+                          message='Snapshot import queued!')
+
+    def import_event(self, event: dict):
+        """ Forwards an event of the queued import to the client.
+        The connection is closed once the import is over.
+
+        :type event: dict
+        :param event: Channel layer event (the message is set in the ``message`` key)
+        """
+        self.send(json.dumps(event['message']))
+        if event['message']['type'] == 'end':
+            self.close(4004)
+
     def receive(self, text_data=None, bytes_data=None):
         """ Receive data function from the client socket
 
@@ -224,14 +721,152 @@ class BackupImportConsumer(WebsocketConsumer):
         :param text_data: JSON data sent by the client
 
         :type bytes_data: bytes
-        :param bytes_data: Bytes sent by the client (Unused here)
-        """
-        snapshot_data = json.loads(text_data)
-        device = self.init_device(snapshot_data)
-        self.send_message(status='info', type='message',
-                          message='Appending libraries to the database!')
-        snapshot = self.init_snapshot(snapshot_data, device)
-        self.set_repositories(snapshot_data, snapshot)
-        self.send_message(status='info', type='end',
-                          message='End of data added!')
+        :param bytes_data: Compressed data sent by the client (negotiated encoding)
+        """
+        snapshot_data = self.decode_frame(text_data, bytes_data)
+        if snapshot_data is None:
+            self.close(4000)
+            return
+        if 'action' in snapshot_data:
+            close_code = self.receive_protocol_frame(snapshot_data)
+            if close_code is not None:
+                self.close(close_code)
+            return
+        if settings.BACKUP_IMPORT['MODE'] == 'worker':
+            self.queue_import(snapshot_data)
+            return
+        self.import_snapshot(snapshot_data)
         self.close(4004)
+
+
+class SnapshotImportWorker(SnapshotImportMixin, SyncConsumer):
+    """
+    Background snapshot import worker, reading the jobs queued by ``BackupImportConsumer``.
+    Run it with ``./manage.py runworker snapshot-import``.
+    """
+
+    group_name = None
+    """
+    Channel layer group of the import currently running
+    """
+
+    def send_message(self, status: Literal['error', 'info', 'warning', 'success'], **args):
+        """ Sends a message to the websocket consumers listening to the import group
+        :type status: Literal
+        :param status: Operation status (either ``error``, ``warning``, ``info``, ``success``)
+
+        :type **args: dict
+        :param **args: Extra arguments for the message
+        """
+        async_to_sync(self.channel_layer.group_send)(
+            self.group_name,
+            {
+                'type': 'import.event',
+                'message': {
+                    'status': status,
+                    **args
+                }
+            }
+        )
+
+    def snapshot_import(self, event: dict):
+        """ Runs a queued snapshot import
+
+        :type event: dict
+        :param event: Import job (``job_id``, ``group`` and ``snapshot_data``)
+        """
+        self.group_name = event['group']
+        try:
+            self.import_snapshot(event['snapshot_data'])
+        except Exception as error: # pylint: disable=broad-exception-caught
+            logging.error("Snapshot import job %s failed", event['job_id'])
+            self.send_import_error(error)
+
+
+class AsyncBackupImportConsumer(SnapshotImportMixin, AsyncWebsocketConsumer):
+    """
+    Asynchronous websocket communication class.
+    The import operations (see ``SnapshotImportMixin``) are run as separate
+    ``database_sync_to_async`` units, the event loop stays free to stream the progress
+    of the other imports. Every received frame runs its units in its own thread
+    (hence with its own database connection) : concurrent imports run in parallel.
+    """
+
+    async def connect(self):
+        """ Connect the client to the database.
+        Check if user is connected before.
+        """
+        await self.accept()
+        await self.send("Connected!")
+
+    def send_message(self, status: Literal['error', 'info', 'warning', 'success'], **args):
+        """ Sends a message to the connected client from an import unit
+        (run outside of the event loop)
+        :type status: Literal
+        :param status: Operation status (either ``error``, ``warning``, ``info``, ``success``)
+
+        :type **args: dict
+        :param **args: Extra arguments for the message
+        """
+        async_to_sync(self.send)(self.encode_message(status, **args))
+
+    async def run_import(self, snapshot_data: dict):
+        """ Imports the snapshot sent by the client. The packages are committed by batches,
+        then the snapshot rows are inserted in a single transaction.
+        If the snapshot data is malformed or the import fails, an error frame is sent.
+
+        :type snapshot_data: dict
+        :param snapshot_data: Raw snapshot data sent by the client
+        """
+        from .models import DeviceLatestVersion, Snapshot # pylint: disable=import-outside-toplevel
+
+        try:
+            self.validate_snapshot_data(snapshot_data)
+        except ValidationError as error:
+            await self.send(self.encode_message('error', type='end', message=error.message))
+            return
+        try:
+            device = await database_sync_to_async(self.init_device)(snapshot_data)
+            hashes = Snapshot.get_hashes(snapshot_data)
+            snapshot = await database_sync_to_async(self.init_shared_snapshot)(
+                snapshot_data, device, hashes)
+            if snapshot is None:
+                await self.send(self.encode_message(
+                    'info', type='message', message='Appending libraries to the database!'))
+                versions = []
+                for library_type, library in snapshot_data['libraries'].items():
+                    versions.extend(await database_sync_to_async(
+                        self.append_libraries_chosen_version)(library, library_type))
+                await database_sync_to_async(self.create_snapshot)(
+                    snapshot_data, device, hashes, versions)
+            await database_sync_to_async(DeviceLatestVersion.refresh)(device.id)
+        except DatabaseError as error:
+            await database_sync_to_async(self.send_import_error)(error)
+            return
+        await self.send(self.encode_message('info', type='end', message='End of data added!'))
+
+    async def receive(self, text_data=None, bytes_data=None):
+        """ Receive data function from the client socket
+
+        :type text_data: str
+        :param text_data: JSON data sent by the client
+
+        :type bytes_data: bytes
+        :param bytes_data: Compressed data sent by the client (negotiated encoding)
+        """
+        # Decompression is CPU bound : it is kept out of the event loop
+        snapshot_data = await sync_to_async(self.decode_frame, thread_sensitive=False)(
+            text_data, bytes_data)
+        if snapshot_data is None:
+            await self.close(4000)
+            return
+        # The database units of the frame share a thread, not the ones of the other frames
+        async with ThreadSensitiveContext():
+            if 'action' in snapshot_data:
+                close_code = await database_sync_to_async(
+                    self.receive_protocol_frame)(snapshot_data)
+                if close_code is not None:
+                    await self.close(close_code)
+                return
+            await self.run_import(snapshot_data)
+        await self.close(4004)
@@ -0,0 +1,174 @@
+import io
+
+from typing import Iterable, List, Sequence, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from tools.versions import version_key
+
+
+def copy_enabled() -> bool:
+    """ Whether the rows are ingested with the Postgres ``COPY`` fast path
+    (``BACKUP_IMPORT['INGESTION_BACKEND']`` set to ``copy``). Other databases
+    (e.g. SQLite in the unit tests) always use the Django ORM.
+
+    :rtype: bool
+    """
+    return settings.BACKUP_IMPORT['INGESTION_BACKEND'] == 'copy' \
+        and connection.vendor == 'postgresql'
+
+
+def ingestion_batch_size() -> int:
+    """ Returns how many packages are resolved by a single import batch
+
+    :rtype: int
+    """
+    from .models import BULK_BATCH_SIZE # pylint: disable=import-outside-toplevel
+
+    return settings.BACKUP_IMPORT['COPY_BATCH_SIZE'] if copy_enabled() else BULK_BATCH_SIZE
+
+
+def format_copy_value(value) -> str:
+    """ Formats a value for the ``COPY`` text format
+
+    :param value: Column value (``None`` is written as ``NULL``, ``bytes`` as ``bytea``)
+
+    :rtype: str
+    """
+    if value is None:
+        return "\\N"
+    if isinstance(value, bytes):
+        # Hex ``bytea`` input, with its backslash escaped
+        return "\\\\x" + value.hex()
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t")\
+        .replace("\n", "\\n").replace("\r", "\\r")
+
+
+def format_copy_rows(rows: Iterable[Sequence]) -> io.StringIO:
+    """ Formats rows as a ``COPY`` text format buffer (tab separated columns)
+
+    :type rows: Iterable[Sequence]
+    :param rows: Rows to copy
+
+    :rtype: io.StringIO
+    """
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(format_copy_value(value) for value in row))
+        buffer.write("\n")
+    buffer.seek(0)
+    return buffer
+
+
+def copy_to_staging(cursor, staging_table: str, columns: List[str], rows: Iterable[Sequence]):
+    """ Streams rows into an empty staging table, created for the current transaction
+
+    :param cursor: Database cursor (psycopg2)
+
+    :type staging_table: str
+    :param staging_table: Temporary table name
+
+    :type columns: List[str]
+    :param columns: ``<name> <type>`` columns definitions
+
+    :type rows: Iterable[Sequence]
+    :param rows: Rows to copy
+    """
+    cursor.execute(
+        f"CREATE TEMPORARY TABLE IF NOT EXISTS {staging_table} ({', '.join(columns)}) "
+        "ON COMMIT DROP"
+    )
+    cursor.execute(f"TRUNCATE {staging_table}")
+    cursor.copy_expert(f"COPY {staging_table} FROM STDIN", format_copy_rows(rows))
+
+
+def copy_resolve_library(libraries: List[Sequence[str]], package_type: str,
+                         package_table: str, version_table: str) -> List[Tuple[int, int]]:
+    """ Returns the packages and chosen versions primary keys of a library group.
+    The pairs (with the sortable key of their version) are copied into a staging table,
+    then merged into the packages and chosen versions tables with set-based statements.
+
+    :type libraries: List[Sequence[str]]
+    :param libraries: ``(package name, version)`` pairs
+
+    :type package_type: str
+    :param package_type: Type of package (e.g. ``snap package``, ``apt package``)
+
+    :type package_table: str
+    :param package_table: Packages table name
+
+    :type version_table: str
+    :param version_table: Chosen versions table name
+
+    :returns: ``(package id, chosen version id)`` pairs, in the same order as ``libraries``
+    """
+    staged = f"""
+        import_staging staging
+        JOIN {package_table} package
+            ON package.name = staging.name AND package.type = %s
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        copy_to_staging(
+            cursor,
+            "import_staging",
+            ["position integer", "name text", "version text", "version_key bytea"],
+            (
+                (position, name, version, version_key(version))
+                for position, (name, version) in enumerate(libraries)
+            )
+        )
+        cursor.execute(
+            f"""
+            INSERT INTO {package_table} (name, type, pre_install_lines)
+            SELECT DISTINCT staging.name, %s, '' FROM import_staging staging
+            ON CONFLICT (name, type) DO NOTHING
+            """,
+            [package_type]
+        )
+        cursor.execute(
+            f"""
+            INSERT INTO {version_table} (package_id, chosen_version, version_key)
+            SELECT DISTINCT package.id, staging.version, staging.version_key FROM {staged}
+            ON CONFLICT (package_id, chosen_version) DO NOTHING
+            """,
+            [package_type]
+        )
+        cursor.execute(
+            f"""
+            SELECT package.id, version.id FROM {staged}
+            JOIN {version_table} version
+                ON version.package_id = package.id
+                AND version.chosen_version = staging.version
+            ORDER BY staging.position
+            """,
+            [package_type]
+        )
+        return cursor.fetchall()
+
+
+def copy_link_rows(through_table: str, columns: List[str], rows: Iterable[Sequence[int]]):
+    """ Inserts many-to-many links through a staging table (already set links are ignored)
+
+    :type through_table: str
+    :param through_table: Through table name
+
+    :type columns: List[str]
+    :param columns: Foreign key columns names
+
+    :type rows: Iterable[Sequence[int]]
+    :param rows: Linked primary keys
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        copy_to_staging(
+            cursor,
+            "import_links",
+            [f"{column} integer" for column in columns],
+            rows
+        )
+        cursor.execute(
+            f"""
+            INSERT INTO {through_table} ({', '.join(columns)})
+            SELECT {', '.join(columns)} FROM import_links
+            ON CONFLICT DO NOTHING
+            """
+        )
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from tools.versions import version_key
+
+from ...models import BULK_BATCH_SIZE, ChosenVersion, DeviceLatestVersion
+
+
+class Command(BaseCommand):
+    """
+    Version keys backfill command (to be run once the keys are added or their encoding changed)
+    """
+
+    help ="Computes the sortable keys of the stored chosen versions (see tools.versions)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=BULK_BATCH_SIZE,
+                            help="Chosen versions updated by each transaction")
+        parser.add_argument("--all", action="store_true",
+                            help="Recomputes the already set keys (e.g. once the encoding changed)")
+
+    def handle(self, *args, **kwargs):
+        versions = ChosenVersion.objects.order_by('id').only('id', 'chosen_version', 'version_key')
+        if not kwargs['all']:
+            versions = versions.filter(version_key=b"")
+        updated_count, last_id = 0, 0
+        while True:
+            batch = list(versions.filter(id__gt=last_id)[:kwargs['batch_size']])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            updated_count += self.update_keys(batch)
+        self.stdout.write(f"✅ {updated_count} version keys updated")
+
+    @staticmethod
+    def update_keys(versions: list) -> int:
+        """ Stores the keys of a batch of chosen versions, and copies them into
+        the devices latest versions lookup rows. Returns the updated versions count.
+
+        :type versions: list
+        :param versions: Chosen versions
+
+        :rtype: int
+        """
+        updated_versions = []
+        for version in versions:
+            key = version_key(version.chosen_version)
+            if bytes(version.version_key) != key:
+                version.version_key = key
+                updated_versions.append(version)
+        if updated_versions:
+            with transaction.atomic():
+                ChosenVersion.objects.bulk_update(updated_versions, ['version_key'])
+                DeviceLatestVersion.objects.filter(
+                    chosen_version_id__in=[version.id for version in updated_versions]
+                ).update(version_key=Subquery(
+                    ChosenVersion.objects.filter(
+                        id=OuterRef('chosen_version_id')).values('version_key')[:1]
+                ))
+        return len(updated_versions)
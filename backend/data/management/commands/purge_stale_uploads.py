@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ...models import Snapshot
+
+
+class Command(BaseCommand):
+    """
+    Chunked uploads purge command (to be scheduled, e.g. daily)
+    """
+
+    help = "Deletes the chunked uploads abandoned by their client (never committed)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int,
+                            default=settings.BACKUP_IMPORT['UPLOAD_MAX_AGE_DAYS'],
+                            help="Age of the uploads deleted (since the upload start)")
+
+    def handle(self, *args, **kwargs):
+        deleted_count = Snapshot.purge_stale_uploads(timedelta(days=kwargs['days']))
+        self.stdout.write(f"✅ {deleted_count} stale uploads deleted")
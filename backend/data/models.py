@@ -1,9 +1,52 @@
-from django.db import models
+import hashlib
+import json
+
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.db.models.signals import post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from tools.cache import TTLCache
 from tools.localisation import Localisation
+from tools.versions import version_key
+
+from .ingestion import copy_enabled, copy_link_rows, copy_resolve_library
 
 
 LOCALE = Localisation("en-us")
 
+BULK_BATCH_SIZE = 1000
+"""
+Maximum rows count handled by a single bulk statement
+"""
+
+DEVICE_CACHE = TTLCache(
+    max_size=settings.BACKUP_IMPORT['DEVICE_CACHE_SIZE'],
+    ttl_seconds=settings.BACKUP_IMPORT['DEVICE_CACHE_TTL_SECONDS']
+)
+"""
+Stored fields of the latest imported devices (see ``Device.cache``), indexed by fingerprint
+"""
+
+PACKAGE_CACHE = TTLCache(max_size=settings.BACKUP_IMPORT['PACKAGE_CACHE_SIZE'])
+"""
+Packages primary keys interned by the importer, indexed by ``(name, type)``
+"""
+
+VERSION_CACHE = TTLCache(max_size=settings.BACKUP_IMPORT['VERSION_CACHE_SIZE'])
+"""
+Chosen versions primary keys interned by the importer, indexed by ``(package id, version)``
+"""
+
+SNAPSHOT_DIFF_CACHE = TTLCache(max_size=256)
+"""
+Differences between two complete (hence immutable) snapshots,
+indexed by ``(base snapshot id, target snapshot id)``
+"""
+
 class Device(models.Model):
     """
     Device containing list of libraries
@@ -49,10 +92,146 @@ class Device(models.Model):
     RAM size
     """
 
+    fingerprint = models.CharField(
+        verbose_name=LOCALE.load_localised_text("DEVICE_FINGERPRINT"),
+        max_length=64,
+        unique=True,
+        null=True,
+        blank=True
+    )
+    """
+    Stable hardware fingerprint (see ``Device.compute_fingerprint``)
+    """
+
+    latest_snapshot = models.ForeignKey(
+        to='Snapshot',
+        verbose_name=LOCALE.load_localised_text("DEVICE_LATEST_SNAPSHOT"),
+        on_delete=models.SET_NULL,
+        related_name='+',
+        null=True,
+        blank=True
+    )
+    """
+    Latest complete snapshot, read by the installed versions lookup
+    (see ``DeviceLatestVersion.refresh``)
+    """
+
+    @staticmethod
+    def compute_fingerprint(name: str, processor: str, cores: int) -> str:
+        """ Returns the hardware fingerprint of a device. The memory size is left out as
+        its reported value may slightly change between two snapshots.
+        The client computes the same fingerprint (``BaseOS.get_fingerprint``).
+
+        :type name: str
+        :param name: Device network name
+
+        :type processor: str
+        :param processor: Processor model
+
+        :type cores: int
+        :param cores: Cores count
+
+        :rtype: str
+        """
+        return hashlib.sha256("\x1f".join([name, processor, str(cores)]).encode()).hexdigest()
+
+    @staticmethod
+    def get_device_infos(device_data: dict) -> dict:
+        """ Extracts the device fields from the snapshot data sent by the client.
+        The fingerprint is computed if not sent by the client.
+
+        :type device_data: dict
+        :param device_data: Snapshot raw data sent by the client
+
+        :rtype: dict
+        """
+        specs = device_data['specs']
+        return {
+            'name': device_data['hostname'],
+            'cores': specs['cores'],
+            'memory': specs['virtual_memory'],
+            'processor': specs['processor'],
+            'fingerprint': specs.get('fingerprint') or Device.compute_fingerprint(
+                device_data['hostname'], specs['processor'], specs['cores'])
+        }
+
+    @staticmethod
+    def find_or_create(device_infos: dict) -> Tuple["Device", bool]:
+        """ Finds the device matching the fingerprint. If not set, creates a new one.
+        Returns the device alongside whether it has been created.
+        The device fields are cached (``DEVICE_CACHE``) : repeated imports of a device
+        skip the lookup, and only write the device if its memory size has changed.
+
+        :type device_infos: dict
+        :param device_infos: Device fields (see ``Device.get_device_infos``)
+
+        :rtype: Tuple[Device, bool]
+        """
+        fingerprint = device_infos['fingerprint']
+        cached_fields = DEVICE_CACHE.get(fingerprint)
+        if cached_fields is not None:
+            # The fields left out of the cache (e.g. latest_snapshot) are deferred
+            device = Device.from_db(None, list(cached_fields), list(cached_fields.values()))
+            if device.memory != device_infos['memory']:
+                device.memory = device_infos['memory']
+                Device.objects.filter(id=device.id).update(memory=device.memory)
+                device.cache()
+            return device, False
+        device = Device.objects.filter(fingerprint=fingerprint).first()
+        if device is None:
+            # Devices imported before the fingerprint
+            device = Device.objects.filter(
+                fingerprint__isnull=True,
+                name=device_infos['name'],
+                cores=device_infos['cores'],
+                processor=device_infos['processor']
+            ).first()
+        created = device is None
+        if created:
+            device, created = Device.objects.get_or_create(
+                fingerprint=fingerprint, defaults=device_infos)
+        if created:
+            # The device is only cached once its creation is committed
+            transaction.on_commit(device.cache)
+            return device, created
+        if (device.fingerprint, device.memory) != \
+                (fingerprint, device_infos['memory']):
+            device.fingerprint = fingerprint
+            device.memory = device_infos['memory']
+            device.save(update_fields=['fingerprint', 'memory'])
+        device.cache()
+        return device, created
+
+    @staticmethod
+    def clear_cache():
+        """
+        Removes every cached device (e.g. after a failed import)
+        """
+        DEVICE_CACHE.clear()
+
+    def cache(self):
+        """ Caches the stored fields of the device, indexed by its fingerprint (``DEVICE_CACHE``)
+        """
+        DEVICE_CACHE.set(self.fingerprint, {
+            field: getattr(self, field)
+            for field in ('id', 'name', 'processor', 'cores', 'memory', 'fingerprint')
+        })
+
     def __str__(self) -> str:
         return f"{self.name}"
 
 
+@receiver(post_delete, sender=Device)
+def uncache_device(instance: Device, **_):
+    """ Removes a deleted device from the fingerprints cache
+
+    :type instance: Device
+    :param instance: Deleted device
+    """
+    if instance.fingerprint:
+        DEVICE_CACHE.delete(instance.fingerprint)
+
+
 class Package(models.Model):
     """
     Package data from linux like operating system (Linux and MacOSX)
@@ -85,10 +264,72 @@ class Package(models.Model):
     Lines to run before installing the package
     """
 
+    class Meta:
+        """
+        Meta subclass for the package model
+        """
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'type'],
+                name='unique_package_name_type'
+            )
+        ]
+        indexes = [
+            # Name prefix lookups (``LIKE 'prefix%'``) whatever the database collation
+            models.Index(fields=['name'], name='package_name_prefix',
+                         opclasses=['varchar_pattern_ops']),
+            models.Index(fields=['type', 'name'], name='package_type_name')
+        ]
+
+    @staticmethod
+    def bulk_resolve(names: Iterable[str], package_type: str) -> Dict[str, int]:
+        """ Returns the primary key of every package of a same type.
+        Missing packages are inserted, already stored ones are left untouched.
+
+        :type names: Iterable[str]
+        :param names: Packages names (duplicates are ignored)
+
+        :type package_type: str
+        :param package_type: Type of package (e.g. ``snap package``, ``apt package``)
+
+        :rtype: Dict[str, int]
+        """
+        names = list(dict.fromkeys(names))
+        found_ids = {}
+        for start in range(0, len(names), BULK_BATCH_SIZE):
+            found_ids.update(Package.objects.filter(
+                type=package_type,
+                name__in=names[start:start+BULK_BATCH_SIZE]
+            ).values_list('name', 'id'))
+
+        missing_names = [name for name in names if name not in found_ids]
+        if missing_names:
+            Package.objects.bulk_create(
+                [Package(name=name, type=package_type) for name in missing_names],
+                batch_size=BULK_BATCH_SIZE,
+                ignore_conflicts=True
+            )
+            for start in range(0, len(missing_names), BULK_BATCH_SIZE):
+                found_ids.update(Package.objects.filter(
+                    type=package_type,
+                    name__in=missing_names[start:start+BULK_BATCH_SIZE]
+                ).values_list('name', 'id'))
+        return found_ids
+
     def __str__(self) -> str:
         return self.name
 
 
+@receiver(post_delete, sender=Package)
+def uncache_package(instance: Package, **_):
+    """ Removes a deleted package from the interning cache
+
+    :type instance: Package
+    :param instance: Deleted package
+    """
+    PACKAGE_CACHE.delete((instance.name, instance.type))
+
+
 class Repository(models.Model):
     """
     Ubuntu repositories
@@ -111,6 +352,101 @@ class Repository(models.Model):
         default="My repository"
     )
 
+    digest = models.CharField(
+        verbose_name=LOCALE.load_localised_text("REPOSITORY_DIGEST"),
+        max_length=64,
+        unique=True,
+        null=True,
+        blank=True
+    )
+    """
+    SHA-256 digest of the name and the normalized sources.list lines
+    (see ``Repository.compute_digest``)
+    """
+
+    @staticmethod
+    def compute_digest(name: str, lines: str) -> str:
+        """ Returns the digest of a repository. The sources.list lines are normalized :
+        blank characters are collapsed, empty lines are removed and the lines are sorted.
+
+        :type name: str
+        :param name: Repository name
+
+        :type lines: str
+        :param lines: sources.list lines
+
+        :rtype: str
+        """
+        normalized_lines = sorted({
+            " ".join(line.split()) for line in lines.splitlines() if line.strip()
+        })
+        return hashlib.sha256(
+            "\n".join([name.strip()] + normalized_lines).encode()
+        ).hexdigest()
+
+    @staticmethod
+    def find_or_create(repository: dict) -> "Repository":
+        """ Finds the repository sent by the client. If not set, creates a new one.
+
+        :type repository: dict
+        :param repository: Repository data (``name`` and sources.list ``lines``)
+
+        :rtype: Repository
+        """
+        return Repository.objects.get(id=Repository.resolve_all([repository])[0])
+
+    @staticmethod
+    def resolve_all(repositories: List[dict]) -> List[int]:
+        """ Returns the primary keys of every repository sent by the client.
+        Repositories are resolved by digest with set-based statements, only the missing
+        ones are inserted.
+
+        :type repositories: List[dict]
+        :param repositories: Repositories data (``name`` and sources.list ``lines``)
+
+        :returns: Primary keys of the repositories, in the same order as ``repositories``
+        """
+        digests = [
+            Repository.compute_digest(repository['name'], repository['lines'])
+            for repository in repositories
+        ]
+        missing = dict(zip(digests, repositories))
+        found_ids = {}
+        for start in range(0, len(missing), BULK_BATCH_SIZE):
+            found_ids.update(Repository.objects.filter(
+                digest__in=list(missing)[start:start+BULK_BATCH_SIZE]
+            ).values_list('digest', 'id'))
+        for digest in found_ids:
+            del missing[digest]
+        if missing:
+            # Repositories stored before the digest
+            for repository in Repository.objects.filter(
+                    digest__isnull=True,
+                    name__in={repository['name'] for repository in missing.values()}):
+                digest = Repository.compute_digest(repository.name, repository.sources_lines)
+                if digest in missing:
+                    repository.digest = digest
+                    repository.save(update_fields=['digest'])
+                    found_ids[digest] = repository.id
+                    del missing[digest]
+        if missing:
+            Repository.objects.bulk_create(
+                [
+                    Repository(
+                        digest=digest,
+                        name=repository['name'],
+                        sources_lines=repository['lines']
+                    )
+                    for digest, repository in missing.items()
+                ],
+                batch_size=BULK_BATCH_SIZE,
+                ignore_conflicts=True
+            )
+            found_ids.update(Repository.objects.filter(
+                digest__in=list(missing)
+            ).values_list('digest', 'id'))
+        return [found_ids[digest] for digest in digests]
+
     def __str__(self) -> str:
         return f"{self.id} - {self.name}"
 
@@ -142,10 +478,218 @@ class ChosenVersion(models.Model):
     Related package
     """
 
+    version_key = models.BinaryField(
+        verbose_name=LOCALE.load_localised_text("CHOSEN_VERSION_KEY"),
+        max_length=255,
+        default=b""
+    )
+    """
+    Byte sortable key of the version (see ``tools.versions.version_key``),
+    empty until computed (see the ``backfill_version_keys`` command)
+    """
+
+    class Meta:
+        """
+        Meta subclass for the chosen version model
+        """
+        constraints = [
+            models.UniqueConstraint(
+                fields=['package', 'chosen_version'],
+                name='unique_chosen_version_package'
+            )
+        ]
+        indexes = [
+            # Versions ranges of a package (e.g. ``openssl < 2.4.1-3ubuntu1``)
+            models.Index(fields=['package', 'version_key'], name='chosen_version_package_key')
+        ]
+
+    @staticmethod
+    def _fetch_ids(versions: list) -> Dict[Tuple[int, str], int]:
+        """ Fetch the primary keys of the stored ``(package id, chosen version)`` pairs
+
+        :type versions: list
+        :param versions: ``(package id, chosen version)`` pairs to look for
+
+        :rtype: Dict[Tuple[int, str], int]
+        """
+        wanted_versions = set(versions)
+        found_ids = {}
+        for start in range(0, len(versions), BULK_BATCH_SIZE):
+            batch = versions[start:start+BULK_BATCH_SIZE]
+            rows = ChosenVersion.objects.filter(
+                package_id__in={package_id for package_id, _ in batch},
+                chosen_version__in={version for _, version in batch}
+            ).values_list('package_id', 'chosen_version', 'id')
+            for package_id, version, version_id in rows:
+                if (package_id, version) in wanted_versions:
+                    found_ids[(package_id, version)] = version_id
+        return found_ids
+
+    @staticmethod
+    def bulk_resolve(versions: Iterable[Tuple[int, str]]) -> Dict[Tuple[int, str], int]:
+        """ Returns the primary key of every ``(package id, chosen version)`` pair.
+        Missing versions are inserted, already stored ones are left untouched.
+
+        :type versions: Iterable[Tuple[int, str]]
+        :param versions: ``(package id, chosen version)`` pairs (duplicates are ignored)
+
+        :rtype: Dict[Tuple[int, str], int]
+        """
+        versions = list(dict.fromkeys(versions))
+        found_ids = ChosenVersion._fetch_ids(versions)
+
+        missing_versions = [version for version in versions if version not in found_ids]
+        if missing_versions:
+            ChosenVersion.objects.bulk_create(
+                [
+                    ChosenVersion(package_id=package_id, chosen_version=version,
+                                  version_key=version_key(version))
+                    for package_id, version in missing_versions
+                ],
+                batch_size=BULK_BATCH_SIZE,
+                ignore_conflicts=True
+            )
+            found_ids.update(ChosenVersion._fetch_ids(missing_versions))
+        return found_ids
+
+    @staticmethod
+    def cached_ids(libraries: Iterable[Tuple[str, str]],
+                   package_type: str) -> Dict[Tuple[str, str], int]:
+        """ Returns the interned chosen versions primary keys (see ``VERSION_CACHE``)
+
+        :type libraries: Iterable[Tuple[str, str]]
+        :param libraries: ``(package name, version)`` pairs
+
+        :type package_type: str
+        :param package_type: Type of package (e.g. ``snap package``, ``apt package``)
+
+        :returns: Primary keys of the cached pairs, indexed by ``(package name, version)``
+        """
+        found_ids = {}
+        for package_name, version in libraries:
+            package_id = PACKAGE_CACHE.get((package_name, package_type))
+            if package_id is not None:
+                version_id = VERSION_CACHE.get((package_id, version))
+                if version_id is not None:
+                    found_ids[(package_name, version)] = version_id
+        return found_ids
+
+    @staticmethod
+    def intern_ids(rows: List[Tuple[str, int, str, int]], package_type: str):
+        """ Caches resolved primary keys once the current transaction is committed :
+        the rows inserted by a rolled back transaction are never cached.
+
+        :type rows: List[Tuple[str, int, str, int]]
+        :param rows: ``(package name, package id, version, chosen version id)`` rows
+
+        :type package_type: str
+        :param package_type: Type of package (e.g. ``snap package``, ``apt package``)
+        """
+        def cache_rows():
+            for package_name, package_id, version, version_id in rows:
+                PACKAGE_CACHE.set((package_name, package_type), package_id)
+                VERSION_CACHE.set((package_id, version), version_id)
+        transaction.on_commit(cache_rows)
+
+    @staticmethod
+    def clear_cache():
+        """
+        Removes every interned package and chosen version (e.g. after a failed import)
+        """
+        PACKAGE_CACHE.clear()
+        VERSION_CACHE.clear()
+
+    @staticmethod
+    def cache_stats() -> Dict[str, Dict[str, int]]:
+        """ Returns the usage counters of the interning caches of the current process
+
+        :rtype: Dict[str, Dict[str, int]]
+        """
+        return {'packages': PACKAGE_CACHE.stats(), 'versions': VERSION_CACHE.stats()}
+
+    @staticmethod
+    def resolve_library(libraries: List[Tuple[str, str]], package_type: str) -> List[int]:
+        """ Returns the chosen versions primary keys of a whole library group.
+        The interned pairs (see ``VERSION_CACHE``) are resolved without any query,
+        the other ``(name, type)`` and ``(package, chosen_version)`` pairs are resolved with
+        set-based statements, only the missing rows are inserted.
+        With the ``copy`` ingestion backend, the pairs are streamed into a staging table
+        with ``COPY`` then merged in SQL (see ``data.ingestion``).
+
+        :type libraries: List[Tuple[str, str]]
+        :param libraries: ``(package name, version)`` pairs (e.g. ``("curl", "1.0.5")``)
+
+        :type package_type: str
+        :param package_type: Type of package (e.g. ``snap package``, ``apt package``)
+
+        :returns: Primary keys of the chosen versions, in the same order as ``libraries``
+        """
+        unique_libraries = list(dict.fromkeys(libraries))
+        version_ids = ChosenVersion.cached_ids(unique_libraries, package_type)
+        missing_libraries = [
+            library for library in unique_libraries if library not in version_ids
+        ]
+        if not missing_libraries:
+            return [version_ids[library] for library in libraries]
+
+        if copy_enabled():
+            resolved_ids = copy_resolve_library(
+                missing_libraries, package_type,
+                Package._meta.db_table, ChosenVersion._meta.db_table
+            )
+        else:
+            package_ids = {
+                package_name: PACKAGE_CACHE.get((package_name, package_type))
+                for package_name, _ in missing_libraries
+            }
+            package_ids.update(Package.bulk_resolve(
+                [name for name, package_id in package_ids.items() if package_id is None],
+                package_type
+            ))
+            versions = [
+                (package_ids[package_name], version)
+                for package_name, version in missing_libraries
+            ]
+            versions_ids = ChosenVersion.bulk_resolve(versions)
+            resolved_ids = [(version[0], versions_ids[version]) for version in versions]
+
+        rows = [
+            (package_name, package_id, version, version_id)
+            for (package_name, version), (package_id, version_id)
+            in zip(missing_libraries, resolved_ids)
+        ]
+        ChosenVersion.intern_ids(rows, package_type)
+        version_ids.update(
+            ((package_name, version), version_id)
+            for package_name, _, version, version_id in rows
+        )
+        return [version_ids[library] for library in libraries]
+
     def __str__(self) -> str:
         return f"{self.package.name} - {str(self.chosen_version)}"
 
 
+@receiver(pre_save, sender=ChosenVersion)
+def fill_version_key(instance: ChosenVersion, **_):
+    """ Computes the sortable key of a saved chosen version
+    (the importer bulk inserts fill it themselves)
+
+    :type instance: ChosenVersion
+    :param instance: Saved chosen version
+    """
+    instance.version_key = version_key(instance.chosen_version)
+
+
+@receiver(post_delete, sender=ChosenVersion)
+def uncache_chosen_version(instance: ChosenVersion, **_):
+    """ Removes a deleted chosen version from the interning cache
+
+    :type instance: ChosenVersion
+    :param instance: Deleted chosen version
+    """
+    VERSION_CACHE.delete((instance.package_id, instance.chosen_version))
+
+
 class Shell(models.Model):
     """
     POSIX shell storage class
@@ -253,6 +797,11 @@ class Snapshot(models.Model):
     Save Database manager class
     """
 
+    STORAGE_MODES = {
+        "full": "SAVE_STORAGE_FULL",
+        "delta": "SAVE_STORAGE_DELTA"
+    }
+
     id = models.AutoField(primary_key=True, help_text="Save Database ID")
     """
     Index for the database save object
@@ -315,5 +864,784 @@ class Snapshot(models.Model):
     Repositories in the repositories list file
     """
 
+    upload_id = models.UUIDField(
+        verbose_name=LOCALE.load_localised_text("SAVE_UPLOAD_ID"),
+        null=True,
+        blank=True,
+        unique=True
+    )
+    """
+    ID of the chunked upload creating the snapshot (not set for single frame imports)
+    """
+
+    last_chunk = models.IntegerField(
+        verbose_name=LOCALE.load_localised_text("SAVE_LAST_CHUNK"),
+        default=-1
+    )
+    """
+    Index of the last chunk acknowledged during the chunked upload
+    """
+
+    is_complete = models.BooleanField(
+        verbose_name=LOCALE.load_localised_text("SAVE_IS_COMPLETE"),
+        default=True
+    )
+    """
+    Whether the snapshot upload is over (chunked uploads are complete once committed)
+    """
+
+    content_hash = models.CharField(
+        verbose_name=LOCALE.load_localised_text("SAVE_CONTENT_HASH"),
+        max_length=64,
+        default=""
+    )
+    """
+    SHA-256 hash of the sorted ``(type, name, version)`` packages set
+    """
+
+    repositories_hash = models.CharField(
+        verbose_name=LOCALE.load_localised_text("SAVE_REPOSITORIES_HASH"),
+        max_length=64,
+        default=""
+    )
+    """
+    SHA-256 hash of the sorted repositories digests set
+    """
+
+    shared_snapshot = models.ForeignKey(
+        to='self',
+        verbose_name=LOCALE.load_localised_text("SAVE_SHARED_SNAPSHOT"),
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='sharing_snapshots'
+    )
+    """
+    Identical snapshot of the same device owning the versions and repositories rows
+    (``None`` if the snapshot owns its own rows)
+    """
+
+    storage_mode = models.CharField(
+        verbose_name=LOCALE.load_localised_text("SAVE_STORAGE_MODE"),
+        choices=STORAGE_MODES,
+        max_length=8,
+        default="full"
+    )
+    """
+    Versions storage : ``full`` (every version linked in ``versions``) or ``delta``
+    (versions added and removed since the parent snapshot)
+    """
+
+    parent = models.ForeignKey(
+        to='self',
+        verbose_name=LOCALE.load_localised_text("SAVE_PARENT"),
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='delta_children'
+    )
+    """
+    Snapshot the delta is computed from (only set in ``delta`` storage mode)
+    """
+
+    added_versions = models.ManyToManyField(
+        to=ChosenVersion,
+        verbose_name=LOCALE.load_localised_text("SAVE_ADDED_VERSIONS"),
+        related_name='added_in_snapshots'
+    )
+    """
+    Versions added since the parent snapshot (``delta`` storage mode)
+    """
+
+    removed_versions = models.ManyToManyField(
+        to=ChosenVersion,
+        verbose_name=LOCALE.load_localised_text("SAVE_REMOVED_VERSIONS"),
+        related_name='removed_in_snapshots'
+    )
+    """
+    Versions removed since the parent snapshot (``delta`` storage mode)
+    """
+
+    chain_length = models.IntegerField(
+        verbose_name=LOCALE.load_localised_text("SAVE_CHAIN_LENGTH"),
+        default=0
+    )
+    """
+    How many deltas are applied to the last full checkpoint to rebuild the snapshot
+    """
+
+    class Meta:
+        """
+        Meta subclass for the snapshot model
+        """
+        indexes = [
+            models.Index(
+                fields=['related_device', 'content_hash', 'repositories_hash'],
+                name='snapshot_device_hashes'
+            )
+        ]
+
+    @staticmethod
+    def hash_items(items: Iterable[Tuple[str, ...]]) -> str:
+        """ Returns the canonical hash of a set of tuples (order and duplicates are ignored)
+
+        :type items: Iterable[Tuple[str, ...]]
+        :param items: Hashed tuples (packages or repositories)
+
+        :rtype: str
+        """
+        canonical = json.dumps(sorted(set(items)), separators=(',', ':'))
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    @staticmethod
+    def hash_libraries(libraries: dict) -> str:
+        """ Returns the content hash of the libraries sent by the client
+
+        :type libraries: dict
+        :param libraries: Packages of every library, indexed by library type
+
+        :rtype: str
+        """
+        return Snapshot.hash_items(
+            (library_type, data['Package'], data['Version'])
+            for library_type, packages in libraries.items()
+            for data in packages.values()
+        )
+
+    @staticmethod
+    def hash_repositories(repositories: List[dict]) -> str:
+        """ Returns the repositories hash of the repositories sent by the client
+        (computed from the repositories digests)
+
+        :type repositories: List[dict]
+        :param repositories: Repositories data (``name`` and sources.list ``lines``)
+
+        :rtype: str
+        """
+        return Snapshot.hash_items(
+            (Repository.compute_digest(repository['name'], repository['lines']),)
+            for repository in repositories
+        )
+
+    @staticmethod
+    def get_hashes(snapshot_data: dict) -> Dict[str, str]:
+        """ Returns the content and repositories hashes of the snapshot sent by the client
+
+        :type snapshot_data: dict
+        :param snapshot_data: Raw snapshot data sent by the client
+
+        :rtype: Dict[str, str]
+        """
+        return {
+            'content_hash': Snapshot.hash_libraries(snapshot_data['libraries']),
+            'repositories_hash': Snapshot.hash_repositories(
+                snapshot_data.get('repositories', []))
+        }
+
+    @staticmethod
+    def find_identical(device: Device, content_hash: str, repositories_hash: str,
+                       snapshot_id: Optional[int] = None) -> Optional["Snapshot"]:
+        """ Finds the snapshot owning the rows of a previous identical snapshot of the device.
+        The hashed snapshot itself (and the snapshots sharing its rows) are left out.
+
+        :type device: Device
+        :param device: Device of the snapshot
+
+        :type content_hash: str
+        :param content_hash: Packages set hash
+
+        :type repositories_hash: str
+        :param repositories_hash: Repositories set hash
+
+        :type snapshot_id: Optional[int]
+        :param snapshot_id: Primary key of the hashed snapshot (if already stored)
+
+        :rtype: Optional[Snapshot]
+        """
+        identical = Snapshot.objects.filter(
+            related_device=device,
+            content_hash=content_hash,
+            repositories_hash=repositories_hash,
+            is_complete=True
+        ).exclude(pk=snapshot_id).order_by('-id').first()
+        if identical is not None and identical.shared_snapshot_id is not None:
+            identical = identical.shared_snapshot
+        if identical is not None and identical.pk == snapshot_id:
+            return None
+        return identical
+
+    @staticmethod
+    def share_identical(device: Device, operating_system: str,
+                        hashes: Dict[str, str]) -> Optional["Snapshot"]:
+        """ Creates a snapshot sharing the rows of a previous identical snapshot of the device.
+        Returns ``None`` (nothing is created) if no identical snapshot is found.
+
+        :type device: Device
+        :param device: Device of the snapshot
+
+        :type operating_system: str
+        :param operating_system: OS name
+
+        :type hashes: Dict[str, str]
+        :param hashes: Snapshot hashes (see ``get_hashes``)
+
+        :rtype: Optional[Snapshot]
+        """
+        identical = Snapshot.find_identical(device, **hashes)
+        if identical is None:
+            return None
+        return Snapshot.objects.create(
+            related_device=device,
+            save_date=timezone.now(),
+            operating_system=operating_system,
+            shared_snapshot=identical,
+            **hashes
+        )
+
+    def get_content_owner(self) -> "Snapshot":
+        """ Returns the snapshot owning the versions rows (itself if not deduplicated)
+
+        :rtype: Snapshot
+        """
+        return self.shared_snapshot if self.shared_snapshot_id else self
+
+    def get_version_ids(self) -> set:
+        """ Returns the primary keys of the snapshot chosen versions.
+        Delta snapshots are rebuilt from their last full checkpoint.
+
+        :rtype: set
+        """
+        snapshot = self.get_content_owner()
+        deltas = []
+        while snapshot.storage_mode == "delta":
+            deltas.append(snapshot.id)
+            snapshot = snapshot.parent.get_content_owner()
+        version_ids = set(Snapshot.versions.through.objects.filter(
+            snapshot_id=snapshot.id).values_list('chosenversion_id', flat=True))
+        if not deltas:
+            return version_ids
+        changes = {snapshot_id: (set(), set()) for snapshot_id in deltas}
+        for through_model, change_index in ((Snapshot.added_versions.through, 0),
+                                            (Snapshot.removed_versions.through, 1)):
+            for snapshot_id, version_id in through_model.objects.filter(
+                    snapshot_id__in=deltas).values_list('snapshot_id', 'chosenversion_id'):
+                changes[snapshot_id][change_index].add(version_id)
+        for snapshot_id in reversed(deltas):
+            added, removed = changes[snapshot_id]
+            version_ids = (version_ids - removed) | added
+        return version_ids
+
+    @staticmethod
+    def bulk_version_ids(snapshots: Iterable["Snapshot"]) -> Dict[int, set]:
+        """ Returns the chosen versions primary keys of many snapshots, indexed by snapshot ID.
+        The versions of the full snapshots are read with a single query,
+        delta snapshots are rebuilt one by one (see ``get_version_ids``).
+
+        :type snapshots: Iterable[Snapshot]
+        :param snapshots: Snapshots (their shared snapshot should be selected)
+
+        :rtype: Dict[int, set]
+        """
+        owners = {snapshot.id: snapshot.get_content_owner() for snapshot in snapshots}
+        owner_versions = {
+            owner.id: set() for owner in owners.values() if owner.storage_mode == "full"
+        }
+        for snapshot_id, version_id in Snapshot.versions.through.objects.filter(
+                snapshot_id__in=owner_versions).values_list('snapshot_id', 'chosenversion_id'):
+            owner_versions[snapshot_id].add(version_id)
+        for owner in owners.values():
+            if owner.id not in owner_versions:
+                owner_versions[owner.id] = owner.get_version_ids()
+        return {snapshot_id: owner_versions[owner.id] for snapshot_id, owner in owners.items()}
+
+    def get_versions(self) -> models.QuerySet:
+        """ Returns the snapshot chosen versions (the shared ones if deduplicated,
+        rebuilt from the parent snapshots if stored as a delta). Delta snapshots are
+        filtered in SQL : the through rows of their full checkpoint, plus the (few)
+        versions added and minus the ones removed along the deltas chain.
+
+        :rtype: QuerySet
+        """
+        owner = self.get_content_owner()
+        if owner.storage_mode == "full":
+            return ChosenVersion.objects.filter(snapshot__id=owner.id)
+        checkpoint = owner
+        while checkpoint.storage_mode == "delta":
+            checkpoint = checkpoint.parent.get_content_owner()
+        added, removed = owner.get_delta_changes(checkpoint)
+        checkpoint_rows = Snapshot.versions.through.objects.filter(
+            snapshot_id=checkpoint.id).values('chosenversion_id')
+        return ChosenVersion.objects.filter(
+            models.Q(id__in=checkpoint_rows) | models.Q(id__in=added)
+        ).exclude(id__in=removed)
+
+    def transfer_content(self, new_owner: "Snapshot"):
+        """ Hands the versions and repositories rows owned by the snapshot over to one of
+        the snapshots sharing them (used before the snapshot is deleted). The other sharing
+        snapshots and the delta children then point at the new owner.
+
+        :type new_owner: Snapshot
+        :param new_owner: Snapshot sharing the rows of this one
+        """
+        for through_model in (Snapshot.versions.through, Snapshot.repositories.through,
+                              Snapshot.added_versions.through,
+                              Snapshot.removed_versions.through):
+            through_model.objects.filter(snapshot_id=self.id).update(snapshot_id=new_owner.id)
+        Snapshot.objects.filter(shared_snapshot_id=self.id).exclude(id=new_owner.id).update(
+            shared_snapshot_id=new_owner.id)
+        Snapshot.objects.filter(parent_id=self.id).update(parent_id=new_owner.id)
+        new_owner.shared_snapshot = None
+        new_owner.storage_mode = self.storage_mode
+        new_owner.parent_id = self.parent_id
+        new_owner.chain_length = self.chain_length
+        new_owner.save(update_fields=['shared_snapshot', 'storage_mode', 'parent', 'chain_length'])
+
+    def materialize(self):
+        """ Stores every version of a delta snapshot (``full`` storage mode),
+        so it no longer depends on its parent snapshot (used before the parent is deleted)
+        """
+        version_ids = self.get_version_ids()
+        self.added_versions.clear()
+        self.removed_versions.clear()
+        self.link_versions(version_ids)
+        self.storage_mode = "full"
+        self.parent = None
+        self.chain_length = 0
+        self.save(update_fields=['storage_mode', 'parent', 'chain_length'])
+
+    def get_repositories(self) -> models.QuerySet:
+        """ Returns the snapshot repositories (the shared ones if deduplicated)
+
+        :rtype: QuerySet
+        """
+        return Repository.objects.filter(snapshot__id=self.shared_snapshot_id or self.id)
+
+    def update_hashes(self):
+        """ Computes the hashes of the rows linked to the snapshot (used once a chunked upload
+        is committed), then shares the rows of a previous identical snapshot if found.
+        """
+        self.content_hash = Snapshot.hash_items(
+            self.versions.values_list('package__type', 'package__name', 'chosen_version'))
+        self.repositories_hash = Snapshot.hash_items(
+            self.repositories.values_list('digest'))
+        identical = Snapshot.find_identical(
+            self.related_device, self.content_hash, self.repositories_hash, self.pk)
+        # A snapshot never shares its own rows
+        if identical is not None and identical.pk != self.pk:
+            self.shared_snapshot = identical
+            self.versions.clear()
+            self.repositories.clear()
+        self.save(update_fields=['content_hash', 'repositories_hash', 'shared_snapshot'])
+
+    def get_delta_changes(self, base: "Snapshot") -> Optional[Tuple[set, set]]:
+        """ Returns the ``(added, removed)`` chosen versions primary keys since ``base``,
+        rebuilt from the deltas chain of the snapshot. Returns ``None`` if ``base``
+        is not in the deltas chain.
+
+        :type base: Snapshot
+        :param base: Previous snapshot of the device
+
+        :rtype: Optional[Tuple[set, set]]
+        """
+        base_id = base.get_content_owner().id
+        snapshot = self.get_content_owner()
+        deltas = []
+        while snapshot.id != base_id and snapshot.storage_mode == "delta":
+            deltas.append(snapshot.id)
+            snapshot = snapshot.parent.get_content_owner()
+        if snapshot.id != base_id:
+            return None
+        changes = {snapshot_id: (set(), set()) for snapshot_id in deltas}
+        for through_model, change_index in ((Snapshot.added_versions.through, 0),
+                                            (Snapshot.removed_versions.through, 1)):
+            for snapshot_id, version_id in through_model.objects.filter(
+                    snapshot_id__in=deltas).values_list('snapshot_id', 'chosenversion_id'):
+                changes[snapshot_id][change_index].add(version_id)
+        added, removed = set(), set()
+        for snapshot_id in reversed(deltas):
+            delta_added, delta_removed = changes[snapshot_id]
+            for version_id in delta_removed:
+                if version_id in added:
+                    added.discard(version_id)
+                else:
+                    removed.add(version_id)
+            for version_id in delta_added:
+                if version_id in removed:
+                    removed.discard(version_id)
+                else:
+                    added.add(version_id)
+        return added, removed
+
+    @staticmethod
+    def diff_version_ids(base: "Snapshot", target: "Snapshot") -> Tuple[set, set]:
+        """ Returns the ``(added, removed)`` chosen versions primary keys between two snapshots.
+        Identical snapshots are compared without any query, delta chains from their deltas,
+        full snapshots with ``EXCEPT`` statements over the versions through table.
+
+        :type base: Snapshot
+        :param base: Compared snapshot
+
+        :type target: Snapshot
+        :param target: Snapshot compared to ``base``
+
+        :rtype: Tuple[set, set]
+        """
+        base_owner, target_owner = base.get_content_owner(), target.get_content_owner()
+        if base_owner.id == target_owner.id or (
+                base.content_hash and base.content_hash == target.content_hash):
+            return set(), set()
+        if target_owner.storage_mode == "delta":
+            changes = target.get_delta_changes(base)
+            if changes is not None:
+                return changes
+        if base_owner.storage_mode == "delta":
+            changes = base.get_delta_changes(target)
+            if changes is not None:
+                return changes[1], changes[0]
+        if base_owner.storage_mode == target_owner.storage_mode == "full":
+            through_rows = Snapshot.versions.through.objects.values_list(
+                'chosenversion_id', flat=True)
+            base_rows = through_rows.filter(snapshot_id=base_owner.id)
+            target_rows = through_rows.filter(snapshot_id=target_owner.id)
+            return set(target_rows.difference(base_rows)), set(base_rows.difference(target_rows))
+        base_ids, target_ids = base.get_version_ids(), target.get_version_ids()
+        return target_ids - base_ids, base_ids - target_ids
+
+    @staticmethod
+    def diff(base: "Snapshot", target: "Snapshot") -> Dict[str, List[tuple]]:
+        """ Returns the packages added, removed, upgraded and downgraded between two complete
+        snapshots. Only the changed versions are read, the result is cached
+        (``SNAPSHOT_DIFF_CACHE``).
+
+        :type base: Snapshot
+        :param base: Compared snapshot
+
+        :type target: Snapshot
+        :param target: Snapshot compared to ``base``
+
+        :returns: ``added`` and ``removed`` ``(name, type, version)`` rows,
+            ``upgraded`` and ``downgraded`` ``(name, type, base version, target version)`` rows
+        """
+        cache_key = (base.id, target.id)
+        cached_diff = SNAPSHOT_DIFF_CACHE.get(cache_key)
+        if cached_diff is not None:
+            return cached_diff
+
+        added_ids, removed_ids = Snapshot.diff_version_ids(base, target)
+        rows = {
+            version_id: (package_id, name, package_type, version,
+                         bytes(key) or version_key(version))
+            for version_id, package_id, name, package_type, version, key
+            in ChosenVersion.objects.filter(id__in=added_ids | removed_ids).values_list(
+                'id', 'package_id', 'package__name', 'package__type', 'chosen_version',
+                'version_key')
+        }
+        changes = {}
+        for version_ids, change_index in ((added_ids, 0), (removed_ids, 1)):
+            for version_id in version_ids:
+                package_id, name, package_type, version, key = rows[version_id]
+                changes.setdefault(package_id, ([], []))[change_index].append(
+                    (name, package_type, version, key))
+        diff = {'added': [], 'removed': [], 'upgraded': [], 'downgraded': []}
+        for added, removed in changes.values():
+            # A single version replaced by another one : the package has been upgraded
+            # or downgraded (equivalent versions, e.g. 1.01 and 1.1, count as upgraded)
+            if len(added) == len(removed) == 1:
+                base_row, target_row = removed[0], added[0]
+                diff['upgraded' if target_row[3] >= base_row[3] else 'downgraded'].append(
+                    base_row[:3] + target_row[2:3])
+            else:
+                diff['added'].extend(row[:3] for row in added)
+                diff['removed'].extend(row[:3] for row in removed)
+        for rows_list in diff.values():
+            rows_list.sort()
+        SNAPSHOT_DIFF_CACHE.set(cache_key, diff)
+        return diff
+
+    def find_parent(self) -> Optional["Snapshot"]:
+        """ Returns the previous complete snapshot of the device (``None`` if not set)
+
+        :rtype: Optional[Snapshot]
+        """
+        return Snapshot.objects.filter(
+            related_device_id=self.related_device_id,
+            is_complete=True
+        ).exclude(id=self.id).order_by('-id').first()
+
+    def store_versions(self, version_ids: Iterable[int]):
+        """ Stores the snapshot chosen versions with the configured storage mode
+        (``BACKUP_IMPORT['STORAGE_MODE']``). In ``delta`` mode, only the versions added and
+        removed since the previous snapshot of the device are stored. A full checkpoint is
+        stored every ``BACKUP_IMPORT['CHECKPOINT_INTERVAL']`` snapshots.
+
+        :type version_ids: Iterable[int]
+        :param version_ids: Primary keys of the chosen versions
+        """
+        parent = self.find_parent() if settings.BACKUP_IMPORT['STORAGE_MODE'] == "delta" \
+            else None
+        chain_length = parent.get_content_owner().chain_length + 1 if parent else 0
+        if parent is None or chain_length >= settings.BACKUP_IMPORT['CHECKPOINT_INTERVAL']:
+            self.link_versions(version_ids)
+            return
+        version_ids = set(version_ids)
+        parent_version_ids = parent.get_version_ids()
+        for through_model, changed_ids in (
+                (Snapshot.added_versions.through, version_ids - parent_version_ids),
+                (Snapshot.removed_versions.through, parent_version_ids - version_ids)):
+            through_model.objects.bulk_create(
+                [
+                    through_model(snapshot_id=self.id, chosenversion_id=version_id)
+                    for version_id in changed_ids
+                ],
+                batch_size=BULK_BATCH_SIZE
+            )
+        self.storage_mode = "delta"
+        self.parent = parent
+        self.chain_length = chain_length
+        self.save(update_fields=['storage_mode', 'parent', 'chain_length'])
+
+    def compact_versions(self):
+        """ Stores the versions linked by a committed chunked upload with the configured
+        storage mode (see ``store_versions``). Deduplicated snapshots are left unchanged.
+        """
+        if self.shared_snapshot_id or settings.BACKUP_IMPORT['STORAGE_MODE'] != "delta":
+            return
+        version_ids = list(Snapshot.versions.through.objects.filter(
+            snapshot_id=self.id).values_list('chosenversion_id', flat=True))
+        self.versions.clear()
+        self.store_versions(version_ids)
+
+    @staticmethod
+    def purge_stale_uploads(max_age: timedelta) -> int:
+        """ Deletes the chunked uploads started more than ``max_age`` ago and never committed
+        (abandoned by their client). Returns the deleted snapshots count.
+
+        :type max_age: timedelta
+        :param max_age: Maximum age of an uncommitted upload (the save date is a day)
+
+        :rtype: int
+        """
+        _, deleted_rows = Snapshot.objects.filter(
+            is_complete=False, save_date__lt=timezone.localdate() - max_age).delete()
+        return deleted_rows.get(Snapshot._meta.label, 0)
+
+    def link_versions(self, version_ids: Iterable[int]):
+        """ Links chosen versions to the snapshot with a single bulk insert
+        into the ``versions`` through table.
+
+        :type version_ids: Iterable[int]
+        :param version_ids: Primary keys of the chosen versions (duplicates are ignored)
+        """
+        through_model = Snapshot.versions.through
+        if copy_enabled():
+            copy_link_rows(
+                through_model._meta.db_table,
+                ['snapshot_id', 'chosenversion_id'],
+                ((self.id, version_id) for version_id in dict.fromkeys(version_ids))
+            )
+            return
+        through_model.objects.bulk_create(
+            [
+                through_model(snapshot_id=self.id, chosenversion_id=version_id)
+                for version_id in dict.fromkeys(version_ids)
+            ],
+            batch_size=BULK_BATCH_SIZE,
+            ignore_conflicts=True
+        )
+
+    def link_repositories(self, repository_ids: Iterable[int]):
+        """ Links repositories to the snapshot with a single bulk insert
+        into the ``repositories`` through table.
+
+        :type repository_ids: Iterable[int]
+        :param repository_ids: Primary keys of the repositories (duplicates are ignored)
+        """
+        through_model = Snapshot.repositories.through
+        through_model.objects.bulk_create(
+            [
+                through_model(snapshot_id=self.id, repository_id=repository_id)
+                for repository_id in dict.fromkeys(repository_ids)
+            ],
+            batch_size=BULK_BATCH_SIZE,
+            ignore_conflicts=True
+        )
+
     def __str__(self) -> str:
         return f"{str(self.related_device)} : {str(self.save_date)}"
+
+
+def surviving_snapshots(snapshots: models.QuerySet, origin) -> models.QuerySet:
+    """ Excludes the snapshots deleted along with the one being deleted : the whole snapshots
+    queryset deleted (``origin``), or every snapshot if another model deletion cascades.
+
+    :type snapshots: QuerySet
+    :param snapshots: Snapshots referencing the deleted one
+
+    :type origin: Union[Model, QuerySet]
+    :param origin: Origin of the deletion (see the ``pre_delete`` signal)
+
+    :rtype: QuerySet
+    """
+    if isinstance(origin, models.QuerySet):
+        return snapshots.exclude(id__in=origin.values('id')) \
+            if origin.model is Snapshot else snapshots.none()
+    return snapshots if isinstance(origin, Snapshot) else snapshots.none()
+
+
+@receiver(pre_delete, sender=Snapshot)
+def transfer_shared_content(instance: Snapshot, origin, **_):
+    """ Hands the rows of a deleted snapshot over to the oldest snapshot sharing them
+    (see ``transfer_content``), so the sharing snapshots keep their versions
+
+    :type instance: Snapshot
+    :param instance: Deleted snapshot
+
+    :type origin: Union[Model, QuerySet]
+    :param origin: Origin of the deletion
+    """
+    new_owner = surviving_snapshots(
+        instance.sharing_snapshots.order_by('id'), origin).first()
+    if new_owner is not None:
+        instance.transfer_content(new_owner)
+
+
+@receiver(pre_delete, sender=Snapshot)
+def materialize_delta_children(instance: Snapshot, origin, **_):
+    """ Stores every version of the delta snapshots computed from a deleted snapshot
+    (see ``materialize``), so they can still be rebuilt
+
+    :type instance: Snapshot
+    :param instance: Deleted snapshot
+
+    :type origin: Union[Model, QuerySet]
+    :param origin: Origin of the deletion
+    """
+    for child in surviving_snapshots(instance.delta_children.order_by('id'), origin):
+        child.materialize()
+
+
+@receiver(post_delete, sender=Snapshot)
+def uncache_snapshot_diffs(**_):
+    """
+    Removes the cached snapshots differences once a snapshot is deleted
+    (the primary keys of the deleted snapshots may be reused by some databases)
+    """
+    SNAPSHOT_DIFF_CACHE.clear()
+
+
+class DeviceLatestVersion(models.Model):
+    """
+    Chosen version installed on a device according to its latest snapshot
+    (``Device.latest_snapshot``). Denormalized lookup table (which devices run a package
+    at a given version), maintained by the importer (see ``refresh``).
+    """
+    id = models.BigAutoField(primary_key=True)
+
+    device = models.ForeignKey(
+        to=Device,
+        verbose_name=LOCALE.load_localised_text("LATEST_VERSION_DEVICE"),
+        on_delete=models.CASCADE,
+        related_name='latest_versions'
+    )
+    """
+    Device running the version
+    """
+
+    package = models.ForeignKey(
+        to=Package,
+        verbose_name=LOCALE.load_localised_text("LATEST_VERSION_PACKAGE"),
+        on_delete=models.PROTECT,
+        related_name='+'
+    )
+    """
+    Installed package
+    """
+
+    chosen_version = models.ForeignKey(
+        to=ChosenVersion,
+        verbose_name=LOCALE.load_localised_text("LATEST_VERSION_CHOSEN_VERSION"),
+        on_delete=models.PROTECT,
+        related_name='+'
+    )
+    """
+    Installed version
+    """
+
+    version_key = models.BinaryField(
+        verbose_name=LOCALE.load_localised_text("LATEST_VERSION_KEY"),
+        max_length=255
+    )
+    """
+    Sortable key of the installed version, copied from the chosen version
+    """
+
+    class Meta:
+        """
+        Meta subclass for the device latest version model
+        """
+        constraints = [
+            models.UniqueConstraint(
+                fields=['device', 'chosen_version'],
+                name='unique_latest_version_device'
+            )
+        ]
+        indexes = [
+            # Versions ranges of a package (e.g. ``openssl < 3.0.2``)
+            models.Index(fields=['package', 'version_key'], name='latest_version_package_key')
+        ]
+
+    @staticmethod
+    def refresh(device_id: int):
+        """ Points the lookup rows of a device at its latest complete snapshot.
+        Only the versions installed or removed since the previous refresh are written.
+
+        :type device_id: int
+        :param device_id: Device primary key
+        """
+        with transaction.atomic():
+            latest = Snapshot.objects.select_related('shared_snapshot').filter(
+                related_device_id=device_id, is_complete=True).order_by('-id').first()
+            device = Device.objects.filter(id=device_id)
+            latest_id = latest.id if latest is not None else None
+            if latest_id is not None \
+                    and device.values_list('latest_snapshot_id', flat=True).first() == latest_id:
+                return
+            rows = DeviceLatestVersion.objects.filter(device_id=device_id)
+            current_ids = set(rows.values_list('chosen_version_id', flat=True))
+            version_ids = latest.get_version_ids() if latest is not None else set()
+            removed_ids = current_ids - version_ids
+            if removed_ids:
+                rows.filter(chosen_version_id__in=removed_ids).delete()
+            added_ids = sorted(version_ids - current_ids)
+            # The keys are copied from the chosen versions in SQL, without fetching them
+            with connection.cursor() as cursor:
+                for start in range(0, len(added_ids), BULK_BATCH_SIZE):
+                    batch = added_ids[start:start+BULK_BATCH_SIZE]
+                    cursor.execute(
+                        f"""
+                        INSERT INTO {DeviceLatestVersion._meta.db_table}
+                            (device_id, package_id, chosen_version_id, version_key)
+                        SELECT %s, version.package_id, version.id, version.version_key
+                        FROM {ChosenVersion._meta.db_table} version
+                        WHERE version.id IN ({', '.join(['%s'] * len(batch))})
+                        """,
+                        [device_id, *batch]
+                    )
+            device.update(latest_snapshot_id=latest_id)
+
+    def __str__(self) -> str:
+        return f"{str(self.device)} : {str(self.chosen_version)}"
+
+
+@receiver(post_delete, sender=Snapshot)
+def refresh_latest_versions(instance: Snapshot, **_):
+    """ Points the lookup rows of a device at its previous snapshot once its latest one
+    is deleted (``Device.latest_snapshot`` has been set to null)
+
+    :type instance: Snapshot
+    :param instance: Deleted snapshot
+    """
+    if instance.is_complete and instance.related_device_id is not None \
+            and Device.objects.filter(
+                id=instance.related_device_id, latest_snapshot__isnull=True).exists():
+        DeviceLatestVersion.refresh(instance.related_device_id)
@@ -0,0 +1,162 @@
+import hashlib
+import json
+
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from graphene_django.settings import graphene_settings
+from graphql import DocumentNode, GraphQLError, GraphQLSchema, parse, validate
+from tools.cache import TTLCache
+
+DOCUMENTS = TTLCache(max_size=settings.GRAPHQL_PERSISTED_QUERIES['CACHE_SIZE'])
+"""
+Parsed and validated GraphQL documents, indexed by the SHA-256 hash of their query
+"""
+
+
+class AllowList:
+    """
+    Allowed persisted queries of the current process (see ``allow_list``)
+    """
+
+    queries: Optional[Dict[str, str]] = None
+    """
+    Allowed queries indexed by their hash (``None`` until the manifest is read)
+    """
+
+
+class PersistedQueryError(GraphQLError):
+    """
+    Raised when a persisted query cannot be executed. The error code is sent
+    in the error extensions (e.g. ``PERSISTED_QUERY_NOT_FOUND``, the client should
+    then send the full query with its hash).
+    """
+
+    def __init__(self, message: str, code: str):
+        """ Error initialisation
+
+        :type message: str
+        :param message: Error message sent to the client
+
+        :type code: str
+        :param code: Error code sent in the error extensions
+        """
+        super().__init__(message, extensions={'code': code})
+
+
+def query_hash(query: str) -> str:
+    """ Returns the SHA-256 hash identifying a GraphQL query
+
+    :type query: str
+    :param query: GraphQL query document
+
+    :rtype: str
+    """
+    return hashlib.sha256(query.encode()).hexdigest()
+
+
+def allow_list() -> Dict[str, str]:
+    """ Returns the allowed queries, indexed by their hash. They are read once
+    from the persisted queries manifest (``GRAPHQL_PERSISTED_QUERIES['ALLOW_LIST']``,
+    ``{"operations": [{"id": <hash>, "body": <query>}, ...]}``).
+
+    :rtype: Dict[str, str]
+    """
+    if AllowList.queries is None:
+        path = settings.GRAPHQL_PERSISTED_QUERIES['ALLOW_LIST']
+        operations = []
+        if path:
+            with open(path, encoding="utf-8") as manifest:
+                operations = json.load(manifest)['operations']
+        AllowList.queries = {operation['id']: operation['body'] for operation in operations}
+    return AllowList.queries
+
+
+@receiver(setting_changed)
+def reset_documents(setting: str, **_):
+    """ Forgets the cached documents and allow-list once their settings are changed
+    (e.g. in the unit tests)
+
+    :type setting: str
+    :param setting: Changed setting name
+    """
+    if setting == 'GRAPHQL_PERSISTED_QUERIES':
+        AllowList.queries = None
+        DOCUMENTS.clear()
+
+
+def resolve_query(query: Optional[str],
+                  extensions: Optional[dict]) -> Tuple[Optional[str], Optional[str]]:
+    """ Returns the query to execute with its hash. The query is looked up by its hash
+    if only the hash is sent (``extensions.persistedQuery.sha256Hash``).
+
+    :type query: Optional[str]
+    :param query: GraphQL query document sent by the client
+
+    :type extensions: Optional[dict]
+    :param extensions: Request extensions sent by the client
+
+    :raises: PersistedQueryError The query is unknown, does not match its hash
+    or is not allowed (strict mode)
+
+    :rtype: Tuple[Optional[str], Optional[str]]
+    """
+    persisted_query = (extensions or {}).get('persistedQuery') \
+        if isinstance(extensions, dict) else None
+    if isinstance(persisted_query, dict):
+        if persisted_query.get('version') != 1:
+            raise PersistedQueryError(
+                "PersistedQueryNotSupported", "PERSISTED_QUERY_NOT_SUPPORTED")
+        sha256_hash = persisted_query.get('sha256Hash')
+        if query:
+            if query_hash(query) != sha256_hash:
+                raise PersistedQueryError(
+                    "Provided sha256Hash does not match the query", "BAD_PERSISTED_QUERY")
+        else:
+            query = allow_list().get(sha256_hash) or DOCUMENTS.get(sha256_hash, (None,))[0]
+            if query is None:
+                raise PersistedQueryError("PersistedQueryNotFound", "PERSISTED_QUERY_NOT_FOUND")
+    elif query:
+        sha256_hash = query_hash(query)
+    else:
+        return None, None
+    if settings.GRAPHQL_PERSISTED_QUERIES['STRICT'] and sha256_hash not in allow_list():
+        raise PersistedQueryError("PersistedQueryNotAllowed", "PERSISTED_QUERY_NOT_ALLOWED")
+    return query, sha256_hash
+
+
+def get_document(query: str, sha256_hash: Optional[str] = None,
+                 schema: Optional[GraphQLSchema] = None) -> Tuple[Optional[DocumentNode],
+                                                                  List[GraphQLError]]:
+    """ Returns a query document parsed and validated against the schema,
+    with its validation errors. Valid documents are only parsed and validated once.
+
+    :type query: str
+    :param query: GraphQL query document
+
+    :type sha256_hash: Optional[str]
+    :param sha256_hash: Query hash (computed if not set)
+
+    :type schema: Optional[GraphQLSchema]
+    :param schema: Schema of the executing view (the project schema if not set)
+
+    :rtype: Tuple[Optional[DocumentNode], List[GraphQLError]]
+    """
+    sha256_hash = sha256_hash or query_hash(query)
+    cached = DOCUMENTS.get(sha256_hash)
+    if cached is not None:
+        return cached[1], []
+    try:
+        document = parse(query)
+    except GraphQLError as error:
+        return None, [error]
+    errors = validate(
+        schema or graphene_settings.SCHEMA.graphql_schema,
+        document,
+        max_errors=graphene_settings.MAX_VALIDATION_ERRORS
+    )
+    if not errors:
+        DOCUMENTS.set(sha256_hash, (query, document))
+    return document, errors
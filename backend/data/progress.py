@@ -0,0 +1,100 @@
+import time
+
+from typing import Optional
+
+from django.conf import settings
+
+
+class ProgressReporter:
+    """
+    Progress bar state of an import step.
+    Throttles the ``progress_bar`` updates sent to the client : an update is emitted
+    once either the time or the percent interval has elapsed since the previous one
+    (a disabled interval never triggers an update). The last update (every element
+    processed) is always emitted.
+    """
+
+    def __init__(self, total: int, desc: str,
+                 interval_seconds: float = 0, interval_percent: float = 0):
+        """ Progress reporter initialisation
+
+        :type total: int
+        :param total: How many elements are processed during the step
+
+        :type desc: str
+        :param desc: Description of the step displayed by the client
+
+        :type interval_seconds: float
+        :param interval_seconds: Minimum delay between two updates (``0`` to disable)
+
+        :type interval_percent: float
+        :param interval_percent: Minimum progress between two updates, in percent
+        (``0`` to disable)
+        """
+        self.total = total
+        self.desc = desc
+        self.interval_seconds = interval_seconds
+        self.interval_percent = interval_percent
+        self.index = 0
+        self._last_sent_index = 0
+        self._last_sent_time = time.monotonic()
+
+    @staticmethod
+    def from_settings(total: int, desc: str) -> "ProgressReporter":
+        """ Creates a progress reporter throttled with the project settings
+        (``BACKUP_IMPORT['PROGRESS_INTERVAL_SECONDS']`` and
+        ``BACKUP_IMPORT['PROGRESS_INTERVAL_PERCENT']``)
+
+        :type total: int
+        :param total: How many elements are processed during the step
+
+        :type desc: str
+        :param desc: Description of the step displayed by the client
+
+        :rtype: ProgressReporter
+        """
+        return ProgressReporter(
+            total=total,
+            desc=desc,
+            interval_seconds=settings.BACKUP_IMPORT['PROGRESS_INTERVAL_SECONDS'],
+            interval_percent=settings.BACKUP_IMPORT['PROGRESS_INTERVAL_PERCENT']
+        )
+
+    def start(self) -> dict:
+        """ Returns the progress bar initialisation infos
+
+        :rtype: dict
+        """
+        self._last_sent_time = time.monotonic()
+        return {
+            'state': 'init',
+            'total': self.total,
+            'desc': self.desc
+        }
+
+    def advance(self, count: int = 1) -> Optional[dict]:
+        """ Marks elements as processed. Returns the update infos to send to the client,
+        or ``None`` if the update is throttled.
+
+        :type count: int
+        :param count: How many elements have been processed
+
+        :rtype: Optional[dict]
+        """
+        self.index = min(self.index + count, self.total)
+        now = time.monotonic()
+        if self.index < self.total and (self.interval_seconds or self.interval_percent):
+            elapsed = self.interval_seconds \
+                and now - self._last_sent_time >= self.interval_seconds
+            progressed = self.interval_percent \
+                and 100 * (self.index - self._last_sent_index) / self.total \
+                >= self.interval_percent
+            if not (elapsed or progressed):
+                return None
+        self._last_sent_index = self.index
+        self._last_sent_time = now
+        return {
+            'state': 'update',
+            'index': self.index,
+            'total': self.total
+        }
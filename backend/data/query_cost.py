@@ -0,0 +1,281 @@
+import json
+import logging
+
+from copy import copy
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from graphql import (
+    DocumentNode,
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    GraphQLObjectType,
+    GraphQLSchema,
+    InlineFragmentNode,
+    OperationDefinitionNode,
+    SelectionSetNode,
+    get_named_type,
+    get_nullable_type,
+    is_composite_type,
+    is_list_type
+)
+from graphql.execution.values import get_argument_values
+
+_NO_DATA = object()
+
+
+class QueryCostError(GraphQLError):
+    """
+    Raised when the estimated cost of a query exceeds the budget
+    (``GRAPHQL_COST['BUDGET']``)
+    """
+
+    def __init__(self, message: str, cost: int, path: Optional[List[str]] = None):
+        """ Error initialisation
+
+        :type message: str
+        :param message: Error message sent to the client
+
+        :type cost: int
+        :param cost: Estimated cost of the rejected query (or root field)
+
+        :type path: Optional[List[str]]
+        :param path: Response key of the skipped root field (``None`` if the whole query
+        is rejected)
+        """
+        super().__init__(message, path=path, extensions={
+            'code': "QUERY_TOO_EXPENSIVE",
+            'cost': cost,
+            'budget': settings.GRAPHQL_COST['BUDGET']
+        })
+
+
+class QueryCost:
+    """
+    Cost of a GraphQL operation. Every object costs ``1``, every field resolved with
+    database queries costs ``GRAPHQL_COST['FIELD_COSTS']``. A list field multiplies
+    the cost of its objects by its rows count : the length of its list argument
+    (e.g. ``ids``), its page size or the one of its connection (``first``) or the estimated
+    rows count (``GRAPHQL_COST['LIST_SIZES']``). Once executed, the actual rows count
+    of the response is used.
+    """
+
+    def __init__(self, schema: GraphQLSchema, document: DocumentNode,
+                 variables: Optional[dict]):
+        """ Cost analysis initialisation
+
+        :type schema: GraphQLSchema
+        :param schema: Executed schema
+
+        :type document: DocumentNode
+        :param document: Validated query document
+
+        :type variables: Optional[dict]
+        :param variables: Query variables
+        """
+        self.schema = schema
+        self.variables = variables or {}
+        self.fragments = {
+            definition.name.value: definition for definition in document.definitions
+            if isinstance(definition, FragmentDefinitionNode)
+        }
+
+    def root_costs(self, operation: OperationDefinitionNode,
+                   data: Any = _NO_DATA) -> Dict[str, int]:
+        """ Returns the cost of each root field of an operation, indexed by response key.
+        The cost is estimated if ``data`` is not set, computed from the response otherwise.
+
+        :type operation: OperationDefinitionNode
+        :param operation: Executed operation
+
+        :param data: Response data (estimated cost if not set)
+
+        :rtype: Dict[str, int]
+        """
+        root_type = self.schema.get_root_type(operation.operation)
+        costs = {}
+        for field_node in self.collect_fields(root_type, operation.selection_set):
+            key = (field_node.alias or field_node.name).value
+            value = _NO_DATA if data is _NO_DATA else (data or {}).get(key)
+            costs[key] = costs.get(key, 0) + self.field_cost(root_type, field_node, value)
+        return costs
+
+    def collect_fields(self, parent_type: GraphQLObjectType,
+                       selection_set: SelectionSetNode) -> List[FieldNode]:
+        """ Returns the fields selected on a type, the fragments being expanded
+
+        :type parent_type: GraphQLObjectType
+        :param parent_type: Type of the selected object
+
+        :type selection_set: SelectionSetNode
+        :param selection_set: Selected fields and fragments
+
+        :rtype: List[FieldNode]
+        """
+        fields = []
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                fields.append(selection)
+            elif isinstance(selection, InlineFragmentNode):
+                fields.extend(self.collect_fields(parent_type, selection.selection_set))
+            elif isinstance(selection, FragmentSpreadNode) \
+                    and selection.name.value in self.fragments:
+                fields.extend(self.collect_fields(
+                    parent_type, self.fragments[selection.name.value].selection_set))
+        return fields
+
+    def field_cost(self, parent_type: GraphQLObjectType, field_node: FieldNode,
+                   value: Any = _NO_DATA, page_size: Optional[int] = None) -> int:
+        """ Returns the cost of a field with its selected sub fields
+
+        :type parent_type: GraphQLObjectType
+        :param parent_type: Type of the object owning the field
+
+        :type field_node: FieldNode
+        :param field_node: Selected field
+
+        :param value: Field value in the response (estimated cost if not set)
+
+        :type page_size: Optional[int]
+        :param page_size: Page size of the parent connection (``first`` argument)
+
+        :rtype: int
+        """
+        field = parent_type.fields.get(field_node.name.value)
+        if field is None:
+            # Introspection fields (e.g. __typename)
+            return 0
+        key = f"{parent_type.name}.{field_node.name.value}"
+        cost = settings.GRAPHQL_COST['FIELD_COSTS'].get(key, 0)
+        field_type = get_named_type(field.type)
+        if not is_composite_type(field_type):
+            return cost
+        try:
+            arguments = get_argument_values(field, field_node, self.variables)
+        except GraphQLError:
+            arguments = {}
+
+        # The scalar fields cost does not depend on the response : only computed once
+        scalars_cost, sub_fields = 0, []
+        for sub_field in self.collect_fields(field_type, field_node.selection_set):
+            sub_field_def = field_type.fields.get(sub_field.name.value)
+            if sub_field_def is not None and is_composite_type(get_named_type(sub_field_def.type)):
+                sub_fields.append(((sub_field.alias or sub_field.name).value, sub_field))
+            else:
+                scalars_cost += self.field_cost(field_type, sub_field)
+
+        def object_cost(item: Any) -> int:
+            if item is None:
+                return 0
+            return 1 + scalars_cost + sum(
+                self.field_cost(
+                    field_type,
+                    sub_field,
+                    _NO_DATA if item is _NO_DATA else item.get(sub_key),
+                    arguments.get('first')
+                )
+                for sub_key, sub_field in sub_fields
+            )
+
+        if not is_list_type(get_nullable_type(field.type)):
+            return cost + object_cost(value)
+        if value is not _NO_DATA:
+            if not sub_fields:
+                return cost + (1 + scalars_cost) * sum(item is not None for item in value or [])
+            return cost + sum(object_cost(item) for item in value or [])
+        list_arguments = [
+            argument for argument in arguments.values() if isinstance(argument, list)
+        ]
+        if list_arguments:
+            rows_count = len(list_arguments[0])
+        elif isinstance(arguments.get('first'), int):
+            rows_count = arguments['first']
+        elif page_size is not None:
+            rows_count = page_size
+        else:
+            rows_count = settings.GRAPHQL_COST['LIST_SIZES'].get(
+                key, settings.GRAPHQL_COST['DEFAULT_LIST_SIZE'])
+        return cost + rows_count * object_cost(_NO_DATA)
+
+
+def apply_budget(document: DocumentNode, operation: OperationDefinitionNode,
+                 root_costs: Dict[str, int]) -> Tuple[Optional[DocumentNode],
+                                                      List[QueryCostError]]:
+    """ Checks the estimated cost of an operation against the budget. Over budget,
+    the whole query is rejected (``GRAPHQL_COST['MODE']`` set to ``reject``) or the last
+    root fields are skipped until the cost fits in the budget (``truncate``).
+    Returns the document to execute (``None`` if nothing is executed) with the errors
+    of the rejected query or skipped fields.
+
+    :type document: DocumentNode
+    :param document: Validated query document
+
+    :type operation: OperationDefinitionNode
+    :param operation: Executed operation
+
+    :type root_costs: Dict[str, int]
+    :param root_costs: Estimated cost of each root field (see ``QueryCost.root_costs``)
+
+    :rtype: Tuple[Optional[DocumentNode], List[QueryCostError]]
+    """
+    budget = settings.GRAPHQL_COST['BUDGET']
+    cost = sum(root_costs.values())
+    if cost <= budget:
+        return document, []
+    if settings.GRAPHQL_COST['MODE'] != 'truncate' \
+            or not all(isinstance(selection, FieldNode)
+                       for selection in operation.selection_set.selections):
+        return None, [QueryCostError(
+            f"The query cost ({cost}) exceeds the budget ({budget})!", cost)]
+
+    kept_selections, errors, cost = [], [], 0
+    for selection in operation.selection_set.selections:
+        key = (selection.alias or selection.name).value
+        if cost + root_costs[key] <= budget:
+            cost += root_costs[key]
+            kept_selections.append(selection)
+        else:
+            errors.append(QueryCostError(
+                f"The field cost ({root_costs[key]}) exceeds the remaining budget "
+                f"({budget - cost})!", root_costs[key], [key]))
+    if not kept_selections:
+        return None, errors
+    truncated_operation = copy(operation)
+    truncated_operation.selection_set = SelectionSetNode(selections=tuple(kept_selections))
+    truncated_document = copy(document)
+    truncated_document.definitions = tuple(
+        truncated_operation if definition is operation else definition
+        for definition in document.definitions
+    )
+    return truncated_document, errors
+
+
+def record_cost(operation_name: Optional[str], sha256_hash: Optional[str],
+                estimated_cost: int, actual_cost: int, elapsed_seconds: float):
+    """ Logs the estimated and actual costs of an executed query, to tune the budget
+    and the estimations from the real traffic
+
+    :type operation_name: Optional[str]
+    :param operation_name: Executed operation name
+
+    :type sha256_hash: Optional[str]
+    :param sha256_hash: Query hash (see ``data.persisted_queries``)
+
+    :type estimated_cost: int
+    :param estimated_cost: Cost estimated before the execution
+
+    :type actual_cost: int
+    :param actual_cost: Cost computed from the response
+
+    :type elapsed_seconds: float
+    :param elapsed_seconds: Execution duration
+    """
+    logging.info("GraphQL query cost: %s", json.dumps({
+        'operation': operation_name,
+        'hash': sha256_hash,
+        'estimated': estimated_cost,
+        'actual': actual_cost,
+        'elapsed_ms': round(elapsed_seconds * 1000, 3)
+    }))
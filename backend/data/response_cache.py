@@ -0,0 +1,331 @@
+import hashlib
+import json
+import logging
+import time
+import uuid
+
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from graphql import FieldNode, OperationDefinitionNode, print_ast
+from redis.exceptions import RedisError
+from tools.cache import TTLCache
+
+from . import persisted_queries
+from .models import Device, Snapshot
+
+CACHEABLE_FIELDS = {
+    'snapshotInfos': ('snapshotId',),
+    'snapshotDiff': ('baseId', 'targetId'),
+    'snapshotInfosBatch': ('ids',)
+}
+"""
+Root fields only reading complete (hence immutable) snapshots, with their snapshot ID arguments
+"""
+
+LOCAL_CACHE = TTLCache(max_size=settings.GRAPHQL_CACHE['LOCAL_CACHE_SIZE'])
+"""
+In-process GraphQL responses cache, in front of the shared one
+"""
+
+RESPONSE_KEYS = TTLCache(
+    max_size=settings.GRAPHQL_CACHE['LOCAL_CACHE_SIZE'],
+    ttl_seconds=settings.GRAPHQL_CACHE['LOCAL_KEYS_TTL_SECONDS']
+)
+"""
+Cache keys of the latest requests, indexed by the hash of the normalized request :
+a repeated request skips the snapshots lookup and the generations read. The invalidations
+of the other processes are seen once the entry expires (``LOCAL_KEYS_TTL_SECONDS``).
+"""
+
+SNAPSHOT_DEVICES = TTLCache(max_size=settings.GRAPHQL_CACHE['LOCAL_CACHE_SIZE'])
+"""
+Related device primary keys of the complete snapshots, indexed by snapshot ID
+"""
+
+
+RETRY_DELAY_SECONDS = 30
+"""
+Delay during which the shared cache is not used anymore once unavailable
+"""
+
+
+class SharedCacheAvailability:
+    """
+    Availability of the shared cache in the current process
+    """
+
+    unavailable_until = 0.0
+    """
+    Monotonic time until which the shared cache is not used (set once it raised an error)
+    """
+
+    pending_keys = set()
+    """
+    Generation keys invalidated while the shared cache was unavailable, bumped once
+    it is reachable again
+    """
+
+
+def shared_cache():
+    """ Returns the GraphQL responses cache shared by every server process (Redis).
+    Returns ``None`` if it has been unavailable for less than ``RETRY_DELAY_SECONDS``.
+    The invalidations missed meanwhile are applied first (``pending_keys``).
+
+    :rtype: Optional[BaseCache]
+    """
+    if time.monotonic() < SharedCacheAvailability.unavailable_until:
+        return None
+    cache = caches[settings.GRAPHQL_CACHE['CACHE_ALIAS']]
+    if SharedCacheAvailability.pending_keys:
+        try:
+            cache.set_many({
+                generation_key: uuid.uuid4().hex
+                for generation_key in SharedCacheAvailability.pending_keys
+            }, timeout=None)
+        except RedisError as error:
+            mark_unavailable(error)
+            return None
+        SharedCacheAvailability.pending_keys.clear()
+    return cache
+
+
+def mark_unavailable(error: RedisError):
+    """ Stops using the shared cache for ``RETRY_DELAY_SECONDS``
+
+    :type error: RedisError
+    :param error: Error raised by the shared cache
+    """
+    SharedCacheAvailability.unavailable_until = time.monotonic() + RETRY_DELAY_SECONDS
+    logging.warning("GraphQL responses cache unavailable: %s", error)
+
+
+@receiver(setting_changed)
+def reset_availability(setting: str, **_):
+    """ Uses the shared cache again once its settings are changed (e.g. in the unit tests)
+
+    :type setting: str
+    :param setting: Changed setting name
+    """
+    if setting in ('CACHES', 'GRAPHQL_CACHE'):
+        SharedCacheAvailability.unavailable_until = 0.0
+        SharedCacheAvailability.pending_keys.clear()
+        RESPONSE_KEYS.clear()
+
+
+def snapshot_ids(query: str, variables: Optional[dict],
+                 operation_name: Optional[str]) -> Optional[List[int]]:
+    """ Returns the IDs of the snapshots read by a GraphQL query.
+    Returns ``None`` if the query is not cacheable (other root fields, fragments,
+    mutations, invalid query, ...).
+
+    :type query: str
+    :param query: GraphQL query document
+
+    :type variables: Optional[dict]
+    :param variables: Query variables
+
+    :type operation_name: Optional[str]
+    :param operation_name: Executed operation (if the document contains many of them)
+
+    :rtype: Optional[List[int]]
+    """
+    document, errors = persisted_queries.get_document(query)
+    if document is None or errors:
+        return None
+    operations = [
+        definition for definition in document.definitions
+        if isinstance(definition, OperationDefinitionNode)
+        and (operation_name is None or getattr(definition.name, 'value', None) == operation_name)
+    ]
+    if len(operations) != 1 or operations[0].operation.value != 'query':
+        return None
+    ids = []
+    for selection in operations[0].selection_set.selections:
+        arguments = CACHEABLE_FIELDS.get(selection.name.value) \
+            if isinstance(selection, FieldNode) else None
+        if arguments is None:
+            return None
+        values = {argument.name.value: argument.value for argument in selection.arguments}
+        for argument in arguments:
+            value = values.get(argument)
+            if value is None:
+                return None
+            if value.kind == 'variable':
+                value = (variables or {}).get(value.name.value)
+            elif value.kind == 'list_value':
+                value = [getattr(item, 'value', None) for item in value.values]
+            else:
+                value = getattr(value, 'value', None)
+            try:
+                ids.extend(int(item) for item in (value if isinstance(value, list) else [value]))
+            except (TypeError, ValueError):
+                return None
+    return ids
+
+
+def snapshot_devices(ids: List[int]) -> Optional[Dict[int, int]]:
+    """ Returns the related device of the snapshots (``None`` if one of them is not complete)
+
+    :type ids: List[int]
+    :param ids: Snapshots IDs
+
+    :rtype: Optional[Dict[int, int]]
+    """
+    devices = {snapshot_id: SNAPSHOT_DEVICES.get(snapshot_id) for snapshot_id in ids}
+    missing_ids = [snapshot_id for snapshot_id, device_id in devices.items() if device_id is None]
+    if missing_ids:
+        for snapshot_id, device_id in Snapshot.objects.filter(
+                id__in=missing_ids, is_complete=True).values_list('id', 'related_device_id'):
+            SNAPSHOT_DEVICES.set(snapshot_id, device_id)
+            devices[snapshot_id] = device_id
+    if None in devices.values():
+        return None
+    return devices
+
+
+def cache_key(query: str, variables: Optional[dict],
+              operation_name: Optional[str]) -> Optional[str]:
+    """ Returns the cache key of a GraphQL query response (``None`` if not cacheable).
+    The key is built from the normalized query document, the variables and the generations
+    of the read snapshots and devices : it changes once one of them is invalidated.
+    The keys of the latest requests are kept in memory (``RESPONSE_KEYS``).
+
+    :type query: str
+    :param query: GraphQL query document
+
+    :type variables: Optional[dict]
+    :param variables: Query variables
+
+    :type operation_name: Optional[str]
+    :param operation_name: Executed operation (if the document contains many of them)
+
+    :rtype: Optional[str]
+    """
+    if not settings.GRAPHQL_CACHE['ENABLED'] or not query:
+        return None
+    ids = snapshot_ids(query, variables, operation_name)
+    if not ids:
+        return None
+    request = json.dumps([
+        print_ast(persisted_queries.get_document(query)[0]),
+        variables or {},
+        operation_name
+    ], sort_keys=True)
+    request_hash = hashlib.sha256(request.encode()).hexdigest()
+    key = RESPONSE_KEYS.get(request_hash)
+    if key is not None:
+        return key
+    devices = snapshot_devices(ids)
+    if devices is None:
+        return None
+    generation_keys = sorted(
+        {f"graphql:snapshot:{snapshot_id}" for snapshot_id in devices}
+        | {f"graphql:device:{device_id}" for device_id in devices.values()}
+    )
+    cache = shared_cache()
+    if cache is None:
+        return None
+    try:
+        generations = cache.get_many(generation_keys)
+    except RedisError as error:
+        mark_unavailable(error)
+        return None
+    key = json.dumps([
+        request,
+        [generations.get(generation_key, "0") for generation_key in generation_keys]
+    ])
+    key = f"graphql:response:{hashlib.sha256(key.encode()).hexdigest()}"
+    RESPONSE_KEYS.set(request_hash, key)
+    return key
+
+
+def get_response(key: str) -> Optional[bytes]:
+    """ Returns a cached GraphQL response (``None`` if not cached)
+
+    :type key: str
+    :param key: Cache key (see ``cache_key``)
+
+    :rtype: Optional[bytes]
+    """
+    response = LOCAL_CACHE.get(key)
+    cache = shared_cache()
+    if response is None and cache is not None:
+        try:
+            response = cache.get(key)
+        except RedisError as error:
+            mark_unavailable(error)
+            return None
+        if response is not None:
+            LOCAL_CACHE.set(key, response)
+    return response
+
+
+def set_response(key: str, response: bytes):
+    """ Caches a GraphQL response
+
+    :type key: str
+    :param key: Cache key (see ``cache_key``)
+
+    :type response: bytes
+    :param response: JSON response content
+    """
+    LOCAL_CACHE.set(key, response)
+    cache = shared_cache()
+    if cache is None:
+        return
+    try:
+        cache.set(key, response, timeout=settings.GRAPHQL_CACHE['TIMEOUT'])
+    except RedisError as error:
+        mark_unavailable(error)
+
+
+def invalidate(generation_key: str):
+    """ Invalidates every cached response depending on a snapshot or a device.
+    The invalidation is kept until the shared cache is reachable (if unavailable).
+
+    :type generation_key: str
+    :param generation_key: ``graphql:snapshot:<id>`` or ``graphql:device:<id>``
+    """
+    RESPONSE_KEYS.clear()
+    if not settings.GRAPHQL_CACHE['ENABLED']:
+        return
+    cache = shared_cache()
+    if cache is None:
+        SharedCacheAvailability.pending_keys.add(generation_key)
+        return
+    try:
+        cache.set(generation_key, uuid.uuid4().hex, timeout=None)
+    except RedisError as error:
+        SharedCacheAvailability.pending_keys.add(generation_key)
+        mark_unavailable(error)
+
+
+@receiver(post_delete, sender=Snapshot)
+def invalidate_snapshot(instance: Snapshot, **_):
+    """ Invalidates the cached responses of a deleted snapshot
+
+    :type instance: Snapshot
+    :param instance: Deleted snapshot
+    """
+    SNAPSHOT_DEVICES.delete(instance.id)
+    invalidate(f"graphql:snapshot:{instance.id}")
+
+
+@receiver(post_save, sender=Device)
+@receiver(post_delete, sender=Device)
+def invalidate_device(instance: Device, created: bool = False, **_):
+    """ Invalidates the cached responses of the snapshots of an edited device
+
+    :type instance: Device
+    :param instance: Edited device
+
+    :type created: bool
+    :param created: Whether the device has just been created (nothing to invalidate)
+    """
+    if not created:
+        invalidate(f"graphql:device:{instance.id}")
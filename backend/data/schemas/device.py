@@ -1,4 +1,7 @@
+from typing import List, Optional
+
 from django.core.exceptions import ObjectDoesNotExist
+from graphql import GraphQLError
 
 import graphene
 from ..models import Device, Snapshot
@@ -27,28 +30,6 @@ class SnapshotHeader(graphene.ObjectType):
         description = "Device snapshot header data."
 
 
-class DeviceSoftwareVersion(graphene.ObjectType):
-    """
-    Sub-graphql query output class for query ``fetch_device_info``
-    Only software version informations here.
-    """
-    chosen_version = graphene.String(
-        description="Version of the package chosen in the device"
-    )
-    name = graphene.String(
-        description="Name of the package"
-    )
-    install_type = graphene.String(
-        description="Software installation type (e.g. DVD media install, APT install, ...)"
-    )
-
-    class Meta:
-        """
-        Meta subclass for the device versions software
-        """
-        description = "Device installed software data."
-
-
 class DeviceInfos(graphene.ObjectType):
     """
     Graphql query output for query ``fetch_device_info``
@@ -67,7 +48,8 @@ class DeviceInfos(graphene.ObjectType):
     )
     snapshots = graphene.List(
         SnapshotHeader,
-        description="Every device snapshot set inside the server"
+        description="Every device snapshot set inside the server, sorted by date",
+        first=graphene.Int(description="Only the oldest snapshots (rows count)")
     )
 
     class Meta:
@@ -77,6 +59,36 @@ class DeviceInfos(graphene.ObjectType):
         name = "DeviceInfos"
         description = "Device informations data stored inside the backup server."
 
+    @staticmethod
+    def resolve_snapshots(device: Device, _, first: Optional[int] = None
+                          ) -> List[SnapshotHeader]:
+        """ Returns the complete snapshots headers of the device, sorted by date.
+        Only queried if the ``snapshots`` field is selected.
+
+        :type device: Device
+        :param device: Resolved device
+
+        :type first: Optional[int]
+        :param first: Returned snapshots count (every snapshot if not set)
+
+        :rtype: List[SnapshotHeader]
+        """
+        if first is not None and first < 1:
+            raise GraphQLError("first must be positive!")
+        snapshots = Snapshot.objects.filter(
+            related_device_id=device.id, is_complete=True
+        ).order_by('save_date', 'id').values_list('id', 'save_date', 'operating_system')
+        if first is not None:
+            snapshots = snapshots[:first]
+        return [
+            SnapshotHeader(
+                key=snapshot_id,
+                date=save_date.strftime("%Y-%m-%d"),
+                operating_system=operating_system
+            )
+            for snapshot_id, save_date, operating_system in snapshots
+        ]
+
 
 class DeviceInfoType(graphene.ObjectType):
     """
@@ -86,45 +98,16 @@ class DeviceInfoType(graphene.ObjectType):
         description="ID of the device object stored in the database."
     )
 
-    def resolve_device_infos(self, _, device_id) -> DeviceInfos:
-        """ Description
-        :type info:
-        :param info:
+    def resolve_device_infos(self, _, device_id) -> Device:
+        """ Returns the device. Its fields are resolved by ``DeviceInfos``,
+        the snapshots headers being only queried if selected.
 
         :type device_id: str
         :param device_id: ID of the device
 
-        :rtype: DeviceInfos
+        :rtype: Device
         """
         try:
-            device = Device.objects.get(id=device_id)
-            raw_snapshots = list(Snapshot.objects.filter(related_device=device))
-            snapshots = [
-                SnapshotHeader(
-                    key=snapshot.id,
-                    date=snapshot.save_date.strftime("%Y-%m-%d"),
-                    operating_system=snapshot.operating_system
-                )
-                for snapshot in list(Snapshot.objects.filter(related_device=device))
-            ]
-
-            versions_data = []
-            for snapshot in raw_snapshots:
-                for found_version in list(snapshot.versions.all()):
-                    versions_data.append(
-                        DeviceSoftwareVersion(
-                            chosen_version=found_version.chosen_version,
-                            name=found_version.package.name,
-                            install_type=found_version.package.type
-                        ))
-
-            return DeviceInfos(
-                cores=device.cores,
-                memory=device.memory,
-                name=device.name,
-                processor=device.processor,
-                snapshots=snapshots
-            )
-
+            return Device.objects.get(id=device_id)
         except ObjectDoesNotExist as _:
             return None
@@ -0,0 +1,116 @@
+from typing import List, Optional
+
+import graphene
+from graphql import GraphQLError
+from tools.versions import version_key
+
+from ..models import DeviceLatestVersion
+
+PACKAGE_DEVICES_PAGE_SIZE = 1000
+"""
+Default count of devices returned by the ``packageDevices`` query
+"""
+
+PACKAGE_DEVICES_MAX_PAGE_SIZE = 10000
+"""
+Maximum count of devices returned by the ``packageDevices`` query
+"""
+
+VERSION_FILTERS = {
+    'version_lt': 'version_key__lt',
+    'version_lte': 'version_key__lte',
+    'version_gt': 'version_key__gt',
+    'version_gte': 'version_key__gte'
+}
+"""
+Version range arguments of the ``packageDevices`` query, with their lookup
+"""
+
+
+class PackageDevice(graphene.ObjectType):
+    """
+    Graphql query output for query ``resolve_package_devices`` :
+    a device running a package version in its latest snapshot
+    """
+    device_id = graphene.BigInt(
+        description="ID of the device stored in the database."
+    )
+    device_name = graphene.String(
+        description="Device name"
+    )
+    snapshot_id = graphene.BigInt(
+        description="ID of the latest snapshot of the device."
+    )
+    date = graphene.String(
+        description="Latest snapshot update date"
+    )
+    name = graphene.String(
+        description="Software name"
+    )
+    install_type = graphene.String(
+        description="Software installation type " +
+        "(e.g. marketplace install, Package managment install, ...)"
+    )
+    chosen_version = graphene.String(
+        description="Installed version"
+    )
+
+    class Meta:
+        """
+        Meta subclass for the package device
+        """
+        description = "Device running a software version in its latest snapshot."
+
+
+class PackageQuery(graphene.ObjectType):
+    """
+    Query object representing the query asking for the devices running a package
+    """
+
+    def resolve_package_devices(self, _, name: str, install_type: Optional[str] = None,
+                                first: Optional[int] = None,
+                                **versions: str) -> List[PackageDevice]:
+        """ Returns the devices running a package in their latest snapshot,
+        sorted by version (e.g. ``openssl`` versions lower than ``3.0.2``)
+
+        :type name: str
+        :param name: Package name
+
+        :type install_type: Optional[str]
+        :param install_type: Package type (every type if not set)
+
+        :type first: Optional[int]
+        :param first: Maximum count of devices (``PACKAGE_DEVICES_PAGE_SIZE`` if not set)
+
+        :param versions: Version range (``version_lt``, ``version_lte``, ``version_gt``
+        and ``version_gte``)
+
+        :rtype: List[PackageDevice]
+        """
+        first = PACKAGE_DEVICES_PAGE_SIZE if first is None else first
+        if first < 0 or first > PACKAGE_DEVICES_MAX_PAGE_SIZE:
+            raise GraphQLError(
+                f"At most {PACKAGE_DEVICES_MAX_PAGE_SIZE} devices can be fetched!")
+        latest_versions = DeviceLatestVersion.objects.filter(package__name=name, **{
+            VERSION_FILTERS[argument]: version_key(version)
+            for argument, version in versions.items() if version is not None
+        })
+        if install_type is not None:
+            latest_versions = latest_versions.filter(package__type=install_type)
+        return [
+            PackageDevice(
+                device_id=device_id,
+                device_name=device_name,
+                snapshot_id=snapshot_id,
+                date=save_date.strftime("%Y-%m-%d"),
+                name=name,
+                install_type=package_type,
+                chosen_version=chosen_version
+            )
+            for device_id, device_name, snapshot_id, save_date, package_type, chosen_version
+            in latest_versions.order_by('version_key', 'device_id').values_list(
+                'device_id', 'device__name', 'device__latest_snapshot_id',
+                'device__latest_snapshot__save_date',
+                'package__type', 'chosen_version__chosen_version'
+            )[:first]
+        ]
@@ -1,7 +1,10 @@
+from typing import List
+
 import graphene
 
 from .device import DeviceInfos, DeviceInfoType
-from .snapshot import SnapshotData, SnapshotQuery
+from .package import PackageDevice, PackageQuery
+from .snapshot import SnapshotData, SnapshotDiff, SnapshotQuery
 
 class Query(graphene.ObjectType):
     """
@@ -31,6 +34,58 @@ class Query(graphene.ObjectType):
     Snapshot infos query graphql class object
     """
 
+    snapshot_infos_batch = graphene.List(
+        SnapshotData,
+        ids=graphene.List(
+            graphene.BigInt,
+            required=True,
+            description="IDs of the snapshots stored in the database."
+        ),
+        description="Fetch many device snapshots from the database at once, " +
+        "in the order of the given IDs (null if not found)."
+    )
+    """
+    Snapshots batch infos query graphql class object
+    """
+
+    package_devices = graphene.List(
+        PackageDevice,
+        name=graphene.String(
+            required=True,
+            description="Package name."
+        ),
+        install_type=graphene.String(
+            description="Package installation type (every type if not set)."
+        ),
+        version_lt=graphene.String(description="Versions lower than this one."),
+        version_lte=graphene.String(description="Versions lower than or equal to this one."),
+        version_gt=graphene.String(description="Versions greater than this one."),
+        version_gte=graphene.String(description="Versions greater than or equal to this one."),
+        first=graphene.Int(description="Maximum count of devices (1000 by default)."),
+        description="Fetch the devices running a package in their latest snapshot, " +
+        "sorted by version."
+    )
+    """
+    Package devices query graphql class object
+    """
+
+    snapshot_diff = graphene.Field(
+        SnapshotDiff,
+        base_id=graphene.BigInt(
+            required=True,
+            description="ID of the compared snapshot."
+        ),
+        target_id=graphene.BigInt(
+            required=True,
+            description="ID of the snapshot compared to the base one."
+        ),
+        description="Fetch the softwares added, removed, upgraded and downgraded between two "
+                    "snapshots."
+    )
+    """
+    Snapshots difference query graphql class object
+    """
+
     def resolve_device_infos(self, info, device_id) -> DeviceInfos:
         """ Description
 
@@ -52,5 +107,38 @@ class Query(graphene.ObjectType):
         """
         return SnapshotQuery.resolve_snapshot(self, info, snapshot_id)
 
+    def resolve_snapshot_infos_batch(self, info, ids) -> List[SnapshotData]:
+        """ Retrieve the libraries of many snapshots at once
+
+        :type ids: List[str]
+        :param ids: Database snapshots indexes
+
+        :rtype: List[SnapshotData]
+        """
+        return SnapshotQuery.resolve_snapshot_batch(self, info, ids)
+
+    def resolve_package_devices(self, info, name, **kwargs) -> List[PackageDevice]:
+        """ Retrieve the devices running a package in their latest snapshot
+
+        :type name: str
+        :param name: Package name
+
+        :rtype: List[PackageDevice]
+        """
+        return PackageQuery.resolve_package_devices(self, info, name, **kwargs)
+
+    def resolve_snapshot_diff(self, info, base_id, target_id) -> SnapshotDiff:
+        """ Computes the softwares changes between two snapshots
+
+        :type base_id: str
+        :param base_id: ID of the compared snapshot
+
+        :type target_id: str
+        :param target_id: ID of the snapshot compared to the base one
+
+        :rtype: SnapshotDiff
+        """
+        return SnapshotQuery.resolve_snapshot_diff(self, info, base_id, target_id)
+
 
 schema = graphene.Schema(query=Query)
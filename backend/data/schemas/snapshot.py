@@ -1,7 +1,29 @@
+import base64
+import json
+
+from typing import List, Optional, Tuple
+
 import graphene
 from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Q
+from graphql import GraphQLError
+
+from ..models import ChosenVersion, Repository, Snapshot
+
+VERSIONS_PAGE_SIZE = 100
+"""
+Default page size of the versions connection
+"""
 
-from ..models import Snapshot
+VERSIONS_MAX_PAGE_SIZE = 1000
+"""
+Maximum page size of the versions connection
+"""
+
+SNAPSHOTS_BATCH_MAX_SIZE = 100
+"""
+Maximum snapshots count of a ``snapshotInfosBatch`` query
+"""
 
 
 class RepositoryData(graphene.ObjectType):
@@ -58,9 +80,58 @@ class DeviceSoftwareVersion(graphene.ObjectType):
         description = "Device installed software data."
 
 
+class VersionConnection(graphene.relay.Connection):
+    """
+    Relay connection of the software versions of a snapshot
+    """
+
+    class Meta:
+        """
+        Meta subclass for the snapshot versions connection
+        """
+        node = DeviceSoftwareVersion
+        description = "Page of the software versions installed on the device."
+
+
+def encode_version_cursor(name: str, install_type: str, version_id: int) -> str:
+    """ Returns the opaque cursor of a version (its sort key)
+
+    :type name: str
+    :param name: Package name
+
+    :type install_type: str
+    :param install_type: Package type
+
+    :type version_id: int
+    :param version_id: Chosen version ID
+
+    :rtype: str
+    """
+    return base64.urlsafe_b64encode(
+        json.dumps([name, install_type, version_id]).encode()).decode()
+
+
+def decode_version_cursor(cursor: str) -> Tuple[str, str, int]:
+    """ Returns the sort key of a version cursor (see ``encode_version_cursor``)
+
+    :type cursor: str
+    :param cursor: Opaque cursor sent by the client
+
+    :raises: GraphQLError The cursor is malformed
+
+    :rtype: Tuple[str, str, int]
+    """
+    try:
+        name, install_type, version_id = json.loads(base64.urlsafe_b64decode(cursor))
+        return str(name), str(install_type), int(version_id)
+    except (ValueError, TypeError) as error:
+        raise GraphQLError(f"Invalid cursor {cursor}!") from error
+
+
 class SnapshotData(graphene.ObjectType):
     """
-    GraphQL response object class for the query ``resolve_snapshot``
+    GraphQL response object class for the query ``resolve_snapshot``.
+    Resolved from a ``Snapshot`` : the versions and repositories are only queried if selected.
     """
 
     versions = graphene.List(
@@ -71,6 +142,21 @@ class SnapshotData(graphene.ObjectType):
     Every software version installed on the device
     """
 
+    versions_connection = graphene.Field(
+        VersionConnection,
+        first=graphene.Int(
+            description=f"Page size (default {VERSIONS_PAGE_SIZE}, "
+                        f"at most {VERSIONS_MAX_PAGE_SIZE})"
+        ),
+        after=graphene.String(description="Cursor of the last version of the previous page"),
+        name_prefix=graphene.String(description="Only the packages starting with this name"),
+        install_type=graphene.String(description="Only the packages of this installation type"),
+        description="Software versions installed on the device, sorted by name and type"
+    )
+    """
+    Cursor paginated software versions installed on the device
+    """
+
     repositories = graphene.List(
         RepositoryData,
         description="Every repositories linked to the snapshot"
@@ -80,6 +166,169 @@ class SnapshotData(graphene.ObjectType):
         description="Operating system of the device at the time where the snapshot was created"
     )
 
+    @staticmethod
+    def resolve_versions(snapshot: Snapshot, _) -> List[DeviceSoftwareVersion]:
+        """ Returns every software version of the snapshot
+
+        :type snapshot: Snapshot
+        :param snapshot: Resolved snapshot
+
+        :rtype: List[DeviceSoftwareVersion]
+        """
+        prefetched_versions = getattr(snapshot, 'prefetched_versions', None)
+        if prefetched_versions is not None:
+            return prefetched_versions
+        # The packages are joined : a single query whatever the versions count
+        return [
+            DeviceSoftwareVersion(
+                chosen_version=chosen_version,
+                name=name,
+                install_type=install_type
+            )
+            for chosen_version, name, install_type in snapshot.get_versions().values_list(
+                'chosen_version', 'package__name', 'package__type')
+        ]
+
+    @staticmethod
+    def resolve_versions_connection(snapshot: Snapshot, _, first: Optional[int] = None,
+                                    after: Optional[str] = None,
+                                    name_prefix: Optional[str] = None,
+                                    install_type: Optional[str] = None) -> VersionConnection:
+        """ Returns a page of the snapshot software versions, sorted by package name, type
+        and version ID. The page starts right after the ``after`` cursor (keyset pagination) :
+        the cursor filter and the page size are applied in SQL, no previous row is skipped
+        with an ``OFFSET``. The database still sorts the snapshot versions left after the
+        cursor (no index follows both the snapshot and the package name).
+
+        :type snapshot: Snapshot
+        :param snapshot: Resolved snapshot
+
+        :type first: Optional[int]
+        :param first: Page size
+
+        :type after: Optional[str]
+        :param after: Cursor of the last version of the previous page
+
+        :type name_prefix: Optional[str]
+        :param name_prefix: Only the packages starting with this name
+
+        :type install_type: Optional[str]
+        :param install_type: Only the packages of this installation type
+
+        :rtype: VersionConnection
+        """
+        page_size = VERSIONS_PAGE_SIZE if first is None else first
+        if not 0 < page_size <= VERSIONS_MAX_PAGE_SIZE:
+            raise GraphQLError(f"first must be between 1 and {VERSIONS_MAX_PAGE_SIZE}!")
+        versions = snapshot.get_versions()
+        if name_prefix:
+            versions = versions.filter(package__name__startswith=name_prefix)
+        if install_type is not None:
+            versions = versions.filter(package__type=install_type)
+        if after is not None:
+            name, after_type, version_id = decode_version_cursor(after)
+            versions = versions.filter(
+                Q(package__name__gt=name)
+                | Q(package__name=name, package__type__gt=after_type)
+                | Q(package__name=name, package__type=after_type, id__gt=version_id)
+            )
+        rows = list(versions.order_by('package__name', 'package__type', 'id').values_list(
+            'id', 'chosen_version', 'package__name', 'package__type')[:page_size + 1])
+
+        edges = [
+            VersionConnection.Edge(
+                node=DeviceSoftwareVersion(
+                    chosen_version=chosen_version,
+                    name=name,
+                    install_type=version_type
+                ),
+                cursor=encode_version_cursor(name, version_type, version_id)
+            )
+            for version_id, chosen_version, name, version_type in rows[:page_size]
+        ]
+        return VersionConnection(
+            edges=edges,
+            page_info=graphene.relay.PageInfo(
+                start_cursor=edges[0].cursor if edges else None,
+                end_cursor=edges[-1].cursor if edges else None,
+                has_previous_page=after is not None,
+                has_next_page=len(rows) > page_size
+            )
+        )
+
+    @staticmethod
+    def resolve_repositories(snapshot: Snapshot, _) -> List[Repository]:
+        """ Returns the repositories of the snapshot
+
+        :type snapshot: Snapshot
+        :param snapshot: Resolved snapshot
+
+        :rtype: List[Repository]
+        """
+        return list(snapshot.get_repositories())
+
+
+class UpgradedSoftware(graphene.ObjectType):
+    """
+    Sub-graphql query output class for query ``snapshotDiff``.
+    Software installed in both snapshots with another version.
+    """
+
+    name = graphene.String(
+        description="Name of the software"
+    )
+
+    install_type = graphene.String(
+        description="Software installation type (e.g. marketplace install, " +
+        "Package managment install, ...)"
+    )
+
+    base_version = graphene.String(
+        description="Version of the software in the base snapshot"
+    )
+
+    chosen_version = graphene.String(
+        description="Version of the software in the target snapshot"
+    )
+
+    class Meta:
+        """
+        Meta subclass for the upgraded (or downgraded) software
+        """
+        description = "Software with another version between two snapshots."
+
+
+class SnapshotDiff(graphene.ObjectType):
+    """
+    GraphQL response object class for the query ``snapshotDiff``
+    """
+
+    added = graphene.List(
+        DeviceSoftwareVersion,
+        description="Softwares only installed in the target snapshot"
+    )
+
+    removed = graphene.List(
+        DeviceSoftwareVersion,
+        description="Softwares only installed in the base snapshot"
+    )
+
+    upgraded = graphene.List(
+        UpgradedSoftware,
+        description="Softwares installed in both snapshots with a newer version in the target"
+    )
+
+    downgraded = graphene.List(
+        UpgradedSoftware,
+        description="Softwares installed in both snapshots with an older version in the target"
+    )
+
+    class Meta:
+        """
+        Meta subclass for the snapshots difference
+        """
+        description = "Softwares changes between two snapshots."
+
 
 class SnapshotQuery(graphene.ObjectType):
     """
@@ -93,27 +342,85 @@ class SnapshotQuery(graphene.ObjectType):
     Id of the snapshot stored in the database
     """
 
-    def resolve_snapshot(self, _, snapshot_id: str) -> SnapshotData:
-        """ Fetch snapshot data from the database. Returns the result as a ``SaveData`` object
+    def resolve_snapshot(self, _, snapshot_id: str) -> Snapshot:
+        """ Fetch snapshot data from the database. Its fields are resolved by ``SnapshotData``
         :type snapshot_id:str
         :param snapshot_id: ID of the snapshot in the database
 
-        :rtype: SnapshotData
+        :rtype: Snapshot
         """
         try:
-            snapshot = Snapshot.objects.get(id=snapshot_id)
-            versions = []
-            for found_version in list(snapshot.versions.all()):
-                versions.append(
-                    DeviceSoftwareVersion(
-                        chosen_version=found_version.chosen_version,
-                        name=found_version.package.name,
-                        install_type=found_version.package.type
-                    ))
-            return SnapshotData(
-                versions=versions,
-                repositories=[],
-                operating_system=snapshot.operating_system
-            )
+            return Snapshot.objects.select_related('shared_snapshot').get(
+                id=snapshot_id, is_complete=True)
         except ObjectDoesNotExist as _:
             return None
+
+    def resolve_snapshot_diff(self, _, base_id: str, target_id: str) -> SnapshotDiff:
+        """ Computes the softwares changes between two complete snapshots
+        (``None`` if one of them is not set)
+
+        :type base_id: str
+        :param base_id: ID of the compared snapshot
+
+        :type target_id: str
+        :param target_id: ID of the snapshot compared to the base one
+
+        :rtype: SnapshotDiff
+        """
+        snapshots = Snapshot.objects.select_related('shared_snapshot').in_bulk(
+            [base_id, target_id])
+        base, target = snapshots.get(int(base_id)), snapshots.get(int(target_id))
+        if base is None or target is None or not (base.is_complete and target.is_complete):
+            return None
+        diff = Snapshot.diff(base, target)
+        return SnapshotDiff(
+            added=[
+                DeviceSoftwareVersion(name=name, install_type=install_type, chosen_version=version)
+                for name, install_type, version in diff['added']
+            ],
+            removed=[
+                DeviceSoftwareVersion(name=name, install_type=install_type, chosen_version=version)
+                for name, install_type, version in diff['removed']
+            ],
+            upgraded=[
+                UpgradedSoftware(name=name, install_type=install_type,
+                                 base_version=base_version, chosen_version=version)
+                for name, install_type, base_version, version in diff['upgraded']
+            ],
+            downgraded=[
+                UpgradedSoftware(name=name, install_type=install_type,
+                                 base_version=base_version, chosen_version=version)
+                for name, install_type, base_version, version in diff['downgraded']
+            ]
+        )
+
+    def resolve_snapshot_batch(self, _, ids: List[str]) -> List[Optional[Snapshot]]:
+        """ Fetch many snapshots from the database, in the order of ``ids``
+        (``None`` for the unknown ones). Their versions are loaded in a single pass,
+        the versions shared by many snapshots are only built once.
+
+        :type ids: List[str]
+        :param ids: IDs of the snapshots in the database
+
+        :rtype: List[Optional[Snapshot]]
+        """
+        if len(ids) > SNAPSHOTS_BATCH_MAX_SIZE:
+            raise GraphQLError(f"At most {SNAPSHOTS_BATCH_MAX_SIZE} snapshots can be fetched!")
+        snapshots = Snapshot.objects.select_related('shared_snapshot').filter(
+            is_complete=True).in_bulk(ids)
+        version_ids = Snapshot.bulk_version_ids(snapshots.values())
+        versions = {
+            version_id: DeviceSoftwareVersion(
+                chosen_version=chosen_version,
+                name=name,
+                install_type=install_type
+            )
+            for version_id, chosen_version, name, install_type in ChosenVersion.objects.filter(
+                id__in=set().union(*version_ids.values())
+            ).values_list('id', 'chosen_version', 'package__name', 'package__type')
+        }
+        for snapshot in snapshots.values():
+            snapshot.prefetched_versions = [
+                versions[version_id] for version_id in version_ids[snapshot.id]
+            ]
+        return [snapshots.get(int(snapshot_id)) for snapshot_id in ids]
@@ -1,12 +1,11 @@
 from django.urls import path
 from django.views.decorators.csrf import csrf_exempt
 
-from graphene_django.views import GraphQLView
-from .views import index
+from .views import CachedGraphQLView, index
 
 app_name = "data"
 
 urlpatterns = [
     path('', index, name="index"),
-    path("graphql/", csrf_exempt(GraphQLView.as_view(graphiql=True)), name="GraphQL")
+    path("graphql/", csrf_exempt(CachedGraphQLView.as_view(graphiql=True)), name="GraphQL")
 ]
@@ -1,7 +1,29 @@
+import json
+import time
+
+from typing import Optional
+
+from django.db import connection, transaction
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed, \
+    HttpResponseNotModified
+from django.utils.cache import quote_etag
+from graphene_django.settings import graphene_settings
+from graphene_django.views import MUTATION_ERRORS_FLAG, GraphQLView, HttpError
+from graphql import (
+    DocumentNode,
+    ExecutionResult,
+    OperationDefinitionNode,
+    OperationType,
+    execute,
+    get_operation_ast,
+    validate_schema
+)
 from rest_framework.decorators import api_view, renderer_classes
 from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
+from . import persisted_queries, query_cost, response_cache
+
 @api_view(['GET'])
 @renderer_classes([JSONRenderer])
 def index(request):
@@ -9,4 +31,187 @@ def index(request):
         'urls':{
             'graphql':f"{request.get_host()}/api/v1/graphql/"
         }
-    })
\ No newline at end of file
+    })
+
+
+class CachedGraphQLView(GraphQLView):
+    """
+    GraphQL view caching the responses of the queries only reading complete snapshots
+    (see ``data.response_cache``). The responses are sent with an ``ETag`` :
+    a request with a matching ``If-None-Match`` header gets a ``304 Not Modified`` response.
+    The clients may only send the hash of a persisted query, the documents are only
+    parsed and validated once (see ``data.persisted_queries``). The queries over
+    the cost budget are rejected or truncated before their execution (see ``data.query_cost``).
+    """
+
+    @staticmethod
+    def get_extensions(request, data: dict) -> Optional[dict]:
+        """ Returns the extensions sent with a GraphQL request (e.g. ``persistedQuery``)
+
+        :type request: HttpRequest
+        :param request: GraphQL request
+
+        :type data: dict
+        :param data: Request body
+
+        :raises: HttpError The extensions are invalid JSON
+
+        :rtype: Optional[dict]
+        """
+        extensions = request.GET.get("extensions") or data.get("extensions")
+        if extensions and isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError as error:
+                raise HttpError(HttpResponseBadRequest("Extensions are invalid JSON.")) from error
+        return extensions
+
+    def get_cache_key(self, request):
+        """ Returns the cache key of the requested GraphQL query (``None`` if not cacheable)
+
+        :type request: HttpRequest
+        :param request: GraphQL request
+
+        :rtype: Optional[str]
+        """
+        if self.batch or request.method not in ("GET", "POST"):
+            return None
+        try:
+            data = self.parse_body(request)
+            if self.graphiql and self.can_display_graphiql(request, data):
+                return None
+            query, variables, operation_name, _ = self.get_graphql_params(request, data)
+            query, _ = persisted_queries.resolve_query(query, self.get_extensions(request, data))
+        except (HttpError, persisted_queries.PersistedQueryError):
+            return None
+        return response_cache.cache_key(query, variables, operation_name)
+
+    def execute_document(self, request, document: DocumentNode,
+                         operation_ast: Optional[OperationDefinitionNode],
+                         variables: Optional[dict], operation_name: Optional[str]):
+        """ Executes a parsed and validated GraphQL document with the context, root value
+        and middleware of the view (mutations are atomic if ``ATOMIC_MUTATIONS`` is set)
+
+        :type request: HttpRequest
+        :param request: GraphQL request
+
+        :type document: DocumentNode
+        :param document: Validated query document
+
+        :type operation_ast: Optional[OperationDefinitionNode]
+        :param operation_ast: Executed operation (``None`` if not found)
+
+        :type variables: Optional[dict]
+        :param variables: Query variables
+
+        :type operation_name: Optional[str]
+        :param operation_name: Executed operation name
+
+        :rtype: ExecutionResult
+        """
+        schema = self.schema.graphql_schema
+        try:
+            execute_options = {
+                "root_value": self.get_root_value(request),
+                "context_value": self.get_context(request),
+                "variable_values": variables,
+                "operation_name": operation_name,
+                "middleware": self.get_middleware(request),
+            }
+            if self.execution_context_class:
+                execute_options["execution_context_class"] = self.execution_context_class
+            if operation_ast is not None and operation_ast.operation == OperationType.MUTATION \
+                    and (graphene_settings.ATOMIC_MUTATIONS is True
+                         or connection.settings_dict.get("ATOMIC_MUTATIONS", False) is True):
+                with transaction.atomic():
+                    result = execute(schema, document, **execute_options)
+                    if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                        transaction.set_rollback(True)
+                return result
+            return execute(schema, document, **execute_options)
+        except Exception as error: # pylint: disable=broad-exception-caught
+            return ExecutionResult(errors=[error])
+
+    def execute_graphql_request(self, request, data, query, variables, operation_name,
+                                show_graphiql=False):
+        """ Executes a GraphQL query (see ``GraphQLView.execute_graphql_request``) once resolved
+        from its persisted hash and fitted in the budget. The cached document is executed
+        as is : a known query is neither parsed nor validated again.
+        """
+        try:
+            query, sha256_hash = persisted_queries.resolve_query(
+                query, self.get_extensions(request, data))
+        except persisted_queries.PersistedQueryError as error:
+            return ExecutionResult(data=None, errors=[error])
+        if not query:
+            return super().execute_graphql_request(
+                request, data, query, variables, operation_name, show_graphiql)
+
+        schema = self.schema.graphql_schema
+        schema_validation_errors = validate_schema(schema)
+        if schema_validation_errors:
+            return ExecutionResult(data=None, errors=schema_validation_errors)
+        document, validation_errors = persisted_queries.get_document(
+            query, sha256_hash, schema)
+        if document is None:
+            return ExecutionResult(errors=validation_errors)
+        operation_ast = get_operation_ast(document, operation_name)
+        if request.method.lower() == "get" and operation_ast is not None \
+                and operation_ast.operation != OperationType.QUERY:
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseNotAllowed(
+                ["POST"],
+                f"Can only perform a {operation_ast.operation.value} operation from a POST request."
+            ))
+        if validation_errors:
+            return ExecutionResult(data=None, errors=validation_errors)
+
+        cost_errors, root_costs = [], {}
+        if operation_ast is not None:
+            query_cost_analysis = query_cost.QueryCost(schema, document, variables)
+            root_costs = query_cost_analysis.root_costs(operation_ast)
+            document, cost_errors = query_cost.apply_budget(document, operation_ast, root_costs)
+            if document is None:
+                skipped = all(error.path for error in cost_errors)
+                return ExecutionResult(
+                    data={key: None for key in root_costs} if skipped else None,
+                    errors=cost_errors
+                )
+
+        start = time.perf_counter()
+        result = self.execute_document(request, document, operation_ast, variables, operation_name)
+        if operation_ast is None:
+            return result
+        query_cost.record_cost(
+            operation_name,
+            sha256_hash,
+            sum(root_costs.values()),
+            sum(query_cost_analysis.root_costs(operation_ast, result.data).values()),
+            time.perf_counter() - start
+        )
+        if cost_errors and result.data is not None:
+            result.data.update({error.path[0]: None for error in cost_errors})
+            result.errors = (result.errors or []) + cost_errors
+        return result
+
+    def dispatch(self, request, *args, **kwargs):
+        key = self.get_cache_key(request)
+        if key is None:
+            return super().dispatch(request, *args, **kwargs)
+
+        etag = quote_etag(key.rsplit(":", 1)[-1])
+        if etag in request.headers.get("If-None-Match", ""):
+            response = HttpResponseNotModified()
+        else:
+            content = response_cache.get_response(key)
+            if content is None:
+                response = super().dispatch(request, *args, **kwargs)
+                if response.status_code == 200 \
+                        and 'errors' not in json.loads(response.content):
+                    response_cache.set_response(key, response.content)
+            else:
+                response = HttpResponse(content=content, content_type="application/json")
+        response["ETag"] = etag
+        return response
+
@@ -13,12 +13,12 @@ import django
 
 from django.core.asgi import get_asgi_application
 from channels.security.websocket import AllowedHostsOriginValidator
-from channels.routing import ProtocolTypeRouter, URLRouter
+from channels.routing import ChannelNameRouter, ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
 
 from opensearchpy.exceptions import RequestError
 
-from .routing import websocket_urlpatterns
+from .routing import channel_routing, websocket_urlpatterns
 from .utils import get_embeddings_client, init_embedding_client
 
 # Logging object
@@ -35,7 +35,8 @@ application = ProtocolTypeRouter({
     "http": django_asgi_app,
     "websocket": AllowedHostsOriginValidator(
         AuthMiddlewareStack(URLRouter(websocket_urlpatterns))
-    )
+    ),
+    "channel": ChannelNameRouter(channel_routing)
 })
 
 # Append the sentences inside the database similarity with the ner model.
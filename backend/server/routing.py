@@ -1,9 +1,14 @@
 from django.urls import path
 
 from chatbot.consumers import ChatbotConsumer
-from data.consumers import BackupImportConsumer
+from data.consumers import AsyncBackupImportConsumer, BackupImportConsumer, SnapshotImportWorker
 
 websocket_urlpatterns = [
     path("backup/import", BackupImportConsumer.as_asgi()),
+    path("backup/import/async", AsyncBackupImportConsumer.as_asgi()),
     path("backup/chatbot", ChatbotConsumer.as_asgi())
 ]
+
+channel_routing = {
+    "snapshot-import": SnapshotImportWorker.as_asgi()
+}
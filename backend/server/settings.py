@@ -108,6 +108,108 @@ CHANNEL_LAYERS = {
     },
 }
 
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # GraphQL responses cache, shared by every server process
+    "graphql": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": f"redis://{os.environ.get('CHANNEL_URL', 'localhost')}:6379/1",
+        "OPTIONS": {
+            "socket_connect_timeout": 0.5,
+            "socket_timeout": 0.5,
+        },
+    },
+}
+
+GRAPHQL_CACHE = {
+    # Responses of the queries only reading complete snapshots are cached
+    "ENABLED": os.environ.get("GRAPHQL_CACHE_ENABLED", "true").lower() == "true",
+    "CACHE_ALIAS": "graphql",
+    # Entries of the in-process cache, in front of the shared one
+    "LOCAL_CACHE_SIZE": int(os.environ.get("GRAPHQL_LOCAL_CACHE_SIZE", 512)),
+    # Lifetime of the in-process request keys (the invalidations of the other processes
+    # are seen once they expire, in seconds)
+    "LOCAL_KEYS_TTL_SECONDS": float(os.environ.get("GRAPHQL_LOCAL_KEYS_TTL_SECONDS", 5)),
+    # Lifetime of the shared cache entries (in seconds)
+    "TIMEOUT": int(os.environ.get("GRAPHQL_CACHE_TIMEOUT", 7 * 24 * 3600)),
+}
+
+GRAPHQL_PERSISTED_QUERIES = {
+    # Parsed and validated GraphQL documents kept in memory (least recently used evicted)
+    "CACHE_SIZE": int(os.environ.get("GRAPHQL_DOCUMENTS_CACHE_SIZE", 256)),
+    # Persisted queries manifest (JSON) : {"operations": [{"id": <sha256>, "body": <query>}]}
+    "ALLOW_LIST": os.environ.get("GRAPHQL_ALLOW_LIST"),
+    # Only the queries of the allow-list are executed
+    "STRICT": os.environ.get("GRAPHQL_STRICT_ALLOW_LIST", "false").lower() == "true",
+}
+
+GRAPHQL_COST = {
+    # Maximum estimated cost of a query (a 100 snapshots timeline, ``snapshots(first: 100)``
+    # headers then ``snapshotInfosBatch`` with their versions, costs about 300 000)
+    "BUDGET": int(os.environ.get("GRAPHQL_COST_BUDGET", 400000)),
+    # 'reject' : the queries over budget are not executed
+    # 'truncate' : the last root fields are skipped until the query fits in the budget
+    "MODE": os.environ.get("GRAPHQL_COST_MODE", "reject"),
+    # Cost of the fields resolved with database queries (every object costs 1)
+    "FIELD_COSTS": {
+        "Query.deviceInfos": 5,
+        "Query.snapshotInfos": 5,
+        "Query.snapshotInfosBatch": 10,
+        "Query.snapshotDiff": 50,
+        "Query.packageDevices": 10,
+        "DeviceInfos.snapshots": 5,
+        "SnapshotData.versions": 5,
+        "SnapshotData.versionsConnection": 5,
+        "SnapshotData.repositories": 5,
+    },
+    # Estimated rows count of the list fields, without any list or page size argument
+    "LIST_SIZES": {
+        "Query.packageDevices": 1000,
+        "DeviceInfos.snapshots": 400,
+        "SnapshotData.versions": 3000,
+        "SnapshotData.repositories": 10,
+        "VersionConnection.edges": 100,
+        "SnapshotDiff.added": 100,
+        "SnapshotDiff.removed": 100,
+        "SnapshotDiff.upgraded": 100,
+        "SnapshotDiff.downgraded": 100,
+    },
+    "DEFAULT_LIST_SIZE": 10,
+}
+
+BACKUP_IMPORT = {
+    # 'inline' : the websocket consumer imports the snapshot itself
+    # 'worker' : the import is queued on the workers (``./manage.py runworker snapshot-import``)
+    "MODE": os.environ.get("BACKUP_IMPORT_MODE", "inline"),
+    "WORKER_CHANNEL": "snapshot-import",
+    # Progress bar updates throttling : an update is sent once either interval is elapsed
+    "PROGRESS_INTERVAL_SECONDS": float(os.environ.get("BACKUP_PROGRESS_INTERVAL_SECONDS", 0.5)),
+    "PROGRESS_INTERVAL_PERCENT": float(os.environ.get("BACKUP_PROGRESS_INTERVAL_PERCENT", 1)),
+    # Maximum size of a binary payload once decompressed (in bytes)
+    "MAX_PAYLOAD_SIZE": 256 * 1024 * 1024,
+    # Snapshot versions storage : 'full' (every version linked) or 'delta' (versions added and
+    # removed since the previous snapshot, with a full checkpoint every CHECKPOINT_INTERVAL)
+    "STORAGE_MODE": os.environ.get("BACKUP_STORAGE_MODE", "full"),
+    "CHECKPOINT_INTERVAL": int(os.environ.get("BACKUP_CHECKPOINT_INTERVAL", 10)),
+    # Chunked uploads left uncommitted are deleted after this many days
+    # (``./manage.py purge_stale_uploads``)
+    "UPLOAD_MAX_AGE_DAYS": int(os.environ.get("BACKUP_UPLOAD_MAX_AGE_DAYS", 2)),
+    # Snapshots with more packages commit them by batches instead of a single transaction
+    "ATOMIC_MAX_PACKAGES": int(os.environ.get("BACKUP_ATOMIC_MAX_PACKAGES", 50000)),
+    # 'orm' : rows inserted with the Django ORM bulk statements
+    # 'copy' : rows streamed into staging tables with COPY then merged in SQL (Postgres only)
+    "INGESTION_BACKEND": os.environ.get("BACKUP_INGESTION_BACKEND", "orm"),
+    "COPY_BATCH_SIZE": 20000,
+    # In-process cache of the imported devices primary keys (indexed by fingerprint)
+    "DEVICE_CACHE_SIZE": 1024,
+    "DEVICE_CACHE_TTL_SECONDS": float(os.environ.get("BACKUP_DEVICE_CACHE_TTL_SECONDS", 300)),
+    # In-process interning caches of the packages and chosen versions primary keys
+    "PACKAGE_CACHE_SIZE": int(os.environ.get("BACKUP_PACKAGE_CACHE_SIZE", 50000)),
+    "VERSION_CACHE_SIZE": int(os.environ.get("BACKUP_VERSION_CACHE_SIZE", 200000)),
+}
+
 ELASTICSEARCH_DSL = {
     'default': {
         'hosts': [ELASTICSEARCH_URL]
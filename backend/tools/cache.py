@@ -0,0 +1,103 @@
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Thread safe in-process cache. Entries expire ``ttl_seconds`` after being set,
+    the least recently used entry is evicted once the cache is full.
+    The hits and misses are counted to help sizing the cache.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: Optional[float] = None):
+        """ Cache initialisation
+
+        :type max_size: int
+        :param max_size: Maximum entries count
+
+        :type ttl_seconds: Optional[float]
+        :param ttl_seconds: Lifetime of an entry (in seconds, ``None`` to never expire)
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """ Returns the value cached for a key (``default`` if not set or expired)
+
+        :type key: Hashable
+        :param key: Cache key
+
+        :type default: Any
+        :param default: Value returned if the key is not cached
+
+        :rtype: Any
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        """ Caches a value
+
+        :type key: Hashable
+        :param key: Cache key
+
+        :type value: Any
+        :param value: Cached value
+        """
+        with self._lock:
+            expires_at = None if self.ttl_seconds is None else time.monotonic() + self.ttl_seconds
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        """ Removes a key from the cache (if set)
+
+        :type key: Hashable
+        :param key: Cache key
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """
+        Removes every entry of the cache
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """ Returns the cache usage counters (entries count, maximum size, hits and misses)
+
+        :rtype: Dict[str, int]
+        """
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,106 @@
+import re
+
+from typing import Tuple
+
+VERSION_PARTS = re.compile(r"(\D*)(\d*)")
+"""
+Non numeric run followed by a numeric run of a version string (dpkg ``verrevcmp`` parts)
+"""
+
+EPOCH = re.compile(r"(\d+):(.*)", re.DOTALL)
+"""
+Epoch of a Debian version (e.g. ``1:`` in ``1:2.4.1-3ubuntu1``)
+"""
+
+TILDE, END_OF_RUN = b"\x01", b"\x02"
+"""
+Weights of ``~`` (sorts before anything, even the end of a version) and of the end
+of a non numeric run
+"""
+
+LONG_NUMBER = b"\xff"
+"""
+Prefix of the digits count of the numeric runs longer than a single byte count
+"""
+
+
+def split_version(version: str) -> Tuple[str, str, str]:
+    """ Splits a Debian version into its epoch, upstream version and revision
+    (e.g. ``1:2.4.1-3ubuntu1`` is ``("1", "2.4.1", "3ubuntu1")``).
+    The epoch is ``0`` and the revision is empty when they are not set.
+
+    :type version: str
+    :param version: Package version
+
+    :rtype: Tuple[str, str, str]
+    """
+    epoch = EPOCH.fullmatch(version)
+    epoch, version = epoch.groups() if epoch else ("0", version)
+    upstream, _, revision = version.rpartition("-")
+    return (epoch, upstream, revision) if upstream else (epoch, version, "")
+
+
+def number_key(number: str) -> bytes:
+    """ Returns the key of a numeric run : its digits count, then its digits
+    (longer numbers are greater, an empty run is ``0``). The counts from 255 digits
+    are written as ``0xFF`` followed by 4 bytes (still sorted after the shorter ones).
+
+    :type number: str
+    :param number: Numeric run (e.g. ``010``)
+
+    :rtype: bytes
+    """
+    digits = number.lstrip("0").encode()
+    if len(digits) < LONG_NUMBER[0]:
+        return bytes([len(digits)]) + digits
+    return LONG_NUMBER + len(digits).to_bytes(4, "big") + digits
+
+
+def character_key(character: str) -> int:
+    """ Returns the weight of a non numeric character : ``~`` first, then the letters,
+    then the other characters (dpkg ``order``)
+
+    :type character: str
+    :param character: Non numeric character
+
+    :rtype: int
+    """
+    if character == "~":
+        return TILDE[0]
+    if character.isascii() and character.isalpha():
+        return ord(character)
+    return min(ord(character) + 0x80, 0xFF)
+
+
+def part_key(part: str) -> bytes:
+    """ Returns the key of an upstream version or revision : the key of every
+    non numeric and numeric runs, then the end of the part (sorted after ``~``)
+
+    :type part: str
+    :param part: Upstream version or revision (e.g. ``2.4.1``)
+
+    :rtype: bytes
+    """
+    key = bytearray()
+    for text, number in VERSION_PARTS.findall(part):
+        if key and not text and not number:
+            # Trailing empty match (an empty part is a single ``0`` numeric run)
+            continue
+        key += bytes(character_key(character) for character in text) + END_OF_RUN
+        key += number_key(number)
+    return bytes(key + END_OF_RUN)
+
+
+def version_key(version: str) -> bytes:
+    """ Returns a key sorting the versions as dpkg does when compared byte per byte :
+    epoch first, then upstream version, then revision. Numeric runs are compared
+    by value, ``~`` sorts before anything (e.g. ``1.0~rc1`` < ``1.0`` < ``1.0-1``
+    < ``1.0a`` < ``1:0.9``). Snap versions are sorted as upstream versions.
+
+    :type version: str
+    :param version: Package version (e.g. ``2.4.1-3ubuntu1``)
+
+    :rtype: bytes
+    """
+    epoch, upstream, revision = split_version(version)
+    return number_key(epoch) + part_key(upstream) + part_key(revision)
@@ -1,7 +1,10 @@
 import platform
 
+import gzip
 import json
 
+from typing import Optional
+
 from tqdm import tqdm
 
 from websocket import create_connection
@@ -10,6 +13,33 @@ from websocket._exceptions import WebSocketAddressException, WebSocketConnection
 
 from operating_system.linux.operating_system import Linux
 
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CHUNK_SIZE = 500
+"""
+Maximum packages count sent in a single upload chunk
+"""
+
+MAX_RECONNECTIONS = 5
+"""
+How many times the client reconnects to the server during a chunked upload
+"""
+
+ENCODINGS = (["msgpack+zstd"] if msgpack and zstandard else []) \
+    + (["msgpack+gzip"] if msgpack else []) \
+    + (["json+zstd"] if zstandard else []) + ["json+gzip"]
+"""
+Binary frames encodings supported by the client, sorted by preference
+"""
+
 
 def connect_to_server(address: str, port: int) -> WebSocket:
     """ 
@@ -36,27 +66,39 @@ def connect_to_server(address: str, port: int) -> WebSocket:
         raise error
 
 
-def progress_bar_managment(data: dict, progress_bar: tqdm):
+def progress_bar_managment(data: dict, progress_bar: tqdm) -> tqdm:
     """ Manages progress bar
     :type data: dict
     :param data: Progress data (stored in a dictionnary)
 
     :type progress_bar: tqdm
-    :param progress_bar: Progress bar object
+    :param progress_bar: Progress bar object (``None`` if not initialised yet)
+
+    :rtype: tqdm
     """
     progress_bar_info = data['infos']
-    progress_bar_info = json.loads(progress_bar_info)
-    progress_bar = tqdm(position=0, leave=True)
-    total = 0
+    # Older servers send the progress infos encoded as a JSON string
+    if isinstance(progress_bar_info, str):
+        progress_bar_info = json.loads(progress_bar_info)
     match progress_bar_info['state']:
         case 'init':
-            progress_bar.total = progress_bar_info['total']
-            progress_bar.desc = progress_bar_info['desc']
-            progress_bar.reset()
+            if progress_bar is not None:
+                progress_bar.close()
+            progress_bar = tqdm(
+                total=progress_bar_info['total'],
+                desc=progress_bar_info['desc'],
+                position=0,
+                leave=True
+            )
         case 'update':
-            progress_bar.update()
-            if progress_bar_info['index'] == total:
-                progress_bar.stop()
+            if 'total' in progress_bar_info:
+                # Throttled updates : the index is the processed elements count
+                progress_bar.update(progress_bar_info['index'] - progress_bar.n)
+            else:
+                progress_bar.update()
+            if progress_bar.n >= progress_bar.total:
+                progress_bar.close()
+    return progress_bar
 
 
 def send_data(data: dict, backup_client: WebSocket):
@@ -85,7 +127,7 @@ def send_data(data: dict, backup_client: WebSocket):
                     # Todo : change colors based on the result (red -> error ; yellow -> warning ; green : success ; white : information)
                     print(msg_data['message'])
                 case 'progress_bar':
-                    progress_bar_managment(msg_data, progress_bar)
+                    progress_bar = progress_bar_managment(msg_data, progress_bar)
                 case 'end':
                     print(msg_data['message'])
                     backup_client.close()
@@ -98,16 +140,173 @@ def send_data(data: dict, backup_client: WebSocket):
         raise e
 
 
+def encode_frame(data: dict, encoding: str) -> bytes:
+    """ Encodes an upload frame as a binary frame
+
+    :type data: dict
+    :param data: Frame to encode
+
+    :type encoding: str
+    :param encoding: Encoding negotiated with the server (``<serialisation>+<compression>``)
+
+    :rtype: bytes
+    """
+    serialisation, _, compression = encoding.partition("+")
+    raw = msgpack.packb(data) if serialisation == "msgpack" else json.dumps(data).encode()
+    match compression:
+        case "gzip":
+            return gzip.compress(raw)
+        case "zstd":
+            return zstandard.ZstdCompressor().compress(raw)
+    return raw
+
+
+def send_frame(data: dict, backup_client: WebSocket, encoding: Optional[str]):
+    """ Sends an upload frame to the server (as JSON text if no encoding has been negotiated)
+
+    :type data: dict
+    :param data: Frame to send
+
+    :type backup_client: WebSocket
+    :param backup_client: Backup socket client which manages send and receiving data
+
+    :type encoding: Optional[str]
+    :param encoding: Encoding negotiated with the server
+    """
+    if encoding is None:
+        backup_client.send(json.dumps(data))
+    else:
+        backup_client.send_binary(encode_frame(data, encoding))
+
+
+def negotiate_encoding(backup_client: WebSocket) -> Optional[str]:
+    """ Negotiates the binary frames encoding with the server.
+    Returns ``None`` if the server does not support binary frames (the connection is then closed)
+
+    :type backup_client: WebSocket
+    :param backup_client: Backup socket client which manages send and receiving data
+
+    :rtype: Optional[str]
+    """
+    backup_client.send(json.dumps({'action': 'negotiate', 'encodings': ENCODINGS}))
+    try:
+        answer = receive_answer(backup_client)
+    except (ConnectionError, WebSocketConnectionClosedException):
+        # Older servers reject the negotiation frame then close the connection
+        return None
+    return answer.get('encoding')
+
+
+def split_data(data: dict, chunk_size: int = CHUNK_SIZE) -> tuple[dict, list[dict]]:
+    """ Splits the snapshot data into the upload header and the libraries chunks
+
+    :type data: dict
+    :param data: Snapshot data to send
+
+    :type chunk_size: int
+    :param chunk_size: Maximum packages count in a chunk
+
+    :rtype: tuple[dict, list[dict]]
+    """
+    header = {key: value for key, value in data.items() if key != 'libraries'}
+    header['action'] = 'header'
+    chunks = []
+    for library_name, packages in data['libraries'].items():
+        package_items = list(packages.items())
+        for start in range(0, len(package_items), chunk_size):
+            chunks.append({
+                'action': 'chunk',
+                'index': len(chunks),
+                'library': library_name,
+                'packages': dict(package_items[start:start + chunk_size])
+            })
+    return header, chunks
+
+
+def receive_answer(backup_client: WebSocket) -> dict:
+    """ Waits for the server answer to an upload frame (informative messages are displayed)
+
+    :type backup_client: WebSocket
+    :param backup_client: Backup socket client which manages send and receiving data
+
+    :raises:
+        ConnectionError : The server sent an error
+
+    :rtype: dict
+    """
+    msg_data = json.loads(backup_client.recv())
+    while msg_data['type'] == 'message':
+        print(msg_data['message'])
+        msg_data = json.loads(backup_client.recv())
+    if msg_data['status'] == 'error':
+        raise ConnectionError(msg_data['message'])
+    return msg_data
+
+
+def send_chunked_data(data: dict, address: str, port: int):
+    """ Sends the snapshot data to the server by chunks.
+    If the connection is lost, the client reconnects and resumes the upload
+    from the last chunk acknowledged by the server. The servers without binary frames
+    (hence without chunked uploads) get the whole snapshot at once (see ``send_data``).
+
+    :type data: dict
+    :param data: Data to send
+
+    :type address: str
+    :param address: IP Adress of the server
+
+    :type port: int
+    :param port: Port of the remote device containing the server
+    """
+    header, chunks = split_data(data)
+    upload_id = None
+    next_chunk = 0
+    progress_bar = tqdm(total=len(chunks), desc='Snapshot upload', position=0, leave=True)
+    for _ in range(MAX_RECONNECTIONS):
+        try:
+            backup_client = connect_to_server(address, port)
+            encoding = negotiate_encoding(backup_client)
+            if encoding is None:
+                # Older servers : the whole snapshot is sent as a single JSON message
+                progress_bar.close()
+                send_data(data, connect_to_server(address, port))
+                return
+            if upload_id is None:
+                send_frame(header, backup_client, encoding)
+            else:
+                send_frame({'action': 'resume', 'upload_id': upload_id}, backup_client, encoding)
+            upload = receive_answer(backup_client)
+            upload_id = upload['upload_id']
+            next_chunk = upload['last_chunk'] + 1
+            progress_bar.update(next_chunk - progress_bar.n)
+            while next_chunk < len(chunks):
+                send_frame({**chunks[next_chunk], 'upload_id': upload_id},
+                           backup_client, encoding)
+                answer = receive_answer(backup_client)
+                # The server sends back the upload state when a chunk is not expected
+                next_chunk = answer['index'] + 1 if answer['type'] == 'ack' \
+                    else answer['last_chunk'] + 1
+                progress_bar.update(next_chunk - progress_bar.n)
+            send_frame({'action': 'commit', 'upload_id': upload_id, 'chunks': len(chunks)},
+                       backup_client, encoding)
+            print(receive_answer(backup_client)['message'])
+            progress_bar.close()
+            backup_client.close()
+            return
+        except (WebSocketConnectionClosedException, ConnectionResetError):
+            print("Connection lost with the server. Resuming the upload")
+    progress_bar.close()
+    raise ConnectionError("Unable to upload the snapshot to the server!")
+
+
 def main():
     os_type = platform.system()
     if os_type == 'Linux':
         print("Linux OS detected!")
         data = Linux()
         output = data.to_dict()
-        print(f"Connecting to the backup server")
-        socket_client = connect_to_server("0.0.0.0", 8000)
         print(f"Sending data to {output['os']}")
-        send_data(output, socket_client)
+        send_chunked_data(output, "0.0.0.0", 8000)
 
 
 if __name__ == '__main__':
@@ -1,3 +1,4 @@
+import hashlib
 import multiprocessing
 import cpuinfo
 
@@ -38,6 +39,16 @@ class BaseOS:
     def __init__(self) -> None:
         raise NotImplementedError("You cannot implement a virtual class!")
 
+    def get_fingerprint(self) -> str:
+        """
+        Returns the stable hardware fingerprint of the device (computed the same way
+        by the server : ``Device.compute_fingerprint``). The memory size is left out
+        as its reported value may slightly change between two snapshots.
+        """
+        return hashlib.sha256(
+            "\x1f".join([self.name, self.processor, str(self.cores)]).encode()
+        ).hexdigest()
+
     def to_dict(self) -> dict:
         """
         Generates a dictionnary for later usage in exporting to the server
@@ -48,7 +59,8 @@ class BaseOS:
                 {
                     'cores': self.cores,
                     'virtual_memory': self.virtual_memory,
-                    'processor': self.processor
+                    'processor': self.processor,
+                    'fingerprint': self.get_fingerprint()
                 }
         }
 
@@ -0,0 +1,39 @@
+import json
+
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from websocket._exceptions import WebSocketConnectionClosedException
+
+import main
+
+
+class TestSendChunkedData(TestCase):
+    """
+    Chunked snapshot upload test class
+    """
+
+    def test_older_server_single_message(self):
+        """
+        Check if the whole snapshot is sent as a single JSON message to a server
+        rejecting the encoding negotiation
+        """
+        # Given
+        data = {
+            'hostname': "Mon objet!",
+            'libraries': {'first_type': {'0': {'Package': "curl", 'Version': "1.0"}}}
+        }
+        rejecting_client, older_client = MagicMock(), MagicMock()
+        rejecting_client.recv.side_effect = [
+            "Connected", WebSocketConnectionClosedException("Connection closed")]
+        older_client.recv.side_effect = [
+            "Connected", json.dumps({'status': 'info', 'type': 'end', 'message': "Done"})]
+
+        # Acts
+        with patch.object(main, 'create_connection',
+                          side_effect=[rejecting_client, older_client]):
+            main.send_chunked_data(data, "0.0.0.0", 8000)
+
+        # Asserts
+        older_client.send.assert_called_once_with(json.dumps(data))
+        older_client.send_binary.assert_not_called()